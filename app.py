@@ -1,27 +1,61 @@
 # app.py
+from startup import STARTUP, PROCESS_T0  # paling awal: mulai hitung waktu import
+
+import datetime
+import importlib
 import os
 import re
+import time
 from decimal import Decimal
 from functools import wraps
 
 from flask import (
     Flask, render_template, jsonify, request,
-    redirect, url_for, session
+    redirect, url_for, session, Response, stream_with_context
 )
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
-from werkzeug.security import generate_password_hash, check_password_hash
-
-# --- satu-satunya instance SQLAlchemy ---
-db = SQLAlchemy()
+from sqlalchemy import text, bindparam
+
+from pagination import encode_cursor, decode_cursor, parse_limit, keyset_clause
+from barang_search import SEARCH_INDEX
+from gudang_stats import STATS
+from sql_trace import SQL_TRACE
+from metrics import METRICS
+from http_client import CLIENT as HTTP_CLIENT
+from db_routing import ROUTER as DB_ROUTER, RoutingSession, read_only
+from passwords import HASHER, HasherBusy
+from assets import ASSETS
+from http_cache import COMPRESSOR, conditional, watermark
+from json_fast import FastJSONProvider, rows_payload
+
+# --- satu-satunya instance SQLAlchemy (session bisa diarahkan ke replica, lihat db_routing.py) ---
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 USER_TABLE = "`user`"  # pakai backtick karena nama tabel 'user' bisa reserved
 
+# ================= REGISTRY BLUEPRINT =================
+# (modul, atribut blueprint, url_prefix). Gagal import = create_app gagal
+# (fail fast), bukan app yang jalan tanpa sebagian route.
+BLUEPRINTS = (
+    ("orders",      "orders_bp",    "/api/orders"),
+    ("cart",        "cart_bp",      "/api/cart"),
+    ("supplier",    "supplier_bp",  "/api/supplier"),
+    ("supplier2",   "supplier2_bp", "/api/supplier2"),
+    ("catalog",     "catalog_bp",   None),
+    ("transaksi",   "pos_bp",       None),
+    ("get_product", "receiver_bp",  None),
+)
+
+STARTUP.mark("import", PROCESS_T0)
+
 
 def create_app():
+    t_app = time.perf_counter()
+    t_phase = t_app
     app = Flask(__name__, template_folder="templates", static_folder="static")
     app.secret_key = os.getenv("FLASK_SECRET_KEY", "retail-secret-key")
+    app.json = FastJSONProvider(app)  # orjson + Decimal/datetime native (json_fast.py)
 
     # CORS
     CORS(app, supports_credentials=True)
@@ -32,9 +66,16 @@ def create_app():
         "mysql+pymysql://root:@127.0.0.1:3306/retail_db"
     )
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    DB_ROUTER.configure(app)  # pool (DB_POOL_*) + replica (FLASK_DB_REPLICAS)
 
     # Init DB
     db.init_app(app)
+    SQL_TRACE.init_app(app)  # jumlah/waktu SQL per request, lihat /__sql__
+    METRICS.init_app(app, http_client=HTTP_CLIENT, hasher=HASHER)  # /metrics (Prometheus)
+    STARTUP.hook_db()  # koneksi DB pertama baru terjadi saat request pertama
+    ASSETS.init_app(app)  # /static/dist + script fingerprint (build_assets.py)
+    COMPRESSOR.init_app(app)  # gzip/brotli untuk body JSON/HTML besar
+    STARTUP.mark("config", t_phase)
 
     # ================== UTIL DB: USER ==================
     def _row_to_dict(row) -> dict:
@@ -61,7 +102,7 @@ def create_app():
         if get_user_by_username(username):
             raise ValueError("username sudah terpakai")
 
-        pwd_hash = generate_password_hash(password_plain)
+        pwd_hash = HASHER.hash(password_plain)  # di pool hash (passwords.py), bukan CPU thread request
         sql = text(f"""
             INSERT INTO {USER_TABLE} (username, password, role)
             VALUES (:u, :p, :r)
@@ -69,16 +110,31 @@ def create_app():
         db.session.execute(sql, {"u": username, "p": pwd_hash, "r": role})
         db.session.commit()
 
-    # ================== SEED ADMIN OPSIONAL ==================
-    with app.app_context():
-        try:
-            if count_users() == 0:
-                seed_user = os.getenv("ADMIN_USER", "admin")
-                seed_pass = os.getenv("ADMIN_PASS", "admin123")
-                create_user(seed_user, seed_pass, "admin")
-                print(f"[SEED] admin default dibuat: {seed_user} / (hidden)")
-        except Exception as e:
-            print("[SEED] dilewati:", e)
+    # ================== SEED ADMIN (CLI) ==================
+    # Tidak lagi jalan saat create_app (tiap worker boot = query DB).
+    #   flask --app app seed-admin            -> buat admin bila tabel user kosong
+    # SEED_ADMIN_ON_START=1 mengembalikan perilaku lama (dev).
+    def seed_admin() -> bool:
+        if count_users() > 0:
+            return False
+        seed_user = os.getenv("ADMIN_USER", "admin")
+        seed_pass = os.getenv("ADMIN_PASS", "admin123")
+        create_user(seed_user, seed_pass, "admin")
+        print(f"[SEED] admin default dibuat: {seed_user} / (hidden)")
+        return True
+
+    @app.cli.command("seed-admin")
+    def seed_admin_command():
+        """Buat user admin default (ADMIN_USER/ADMIN_PASS) bila belum ada user."""
+        if not seed_admin():
+            print("[SEED] dilewati: tabel user sudah berisi")
+
+    if os.getenv("SEED_ADMIN_ON_START") == "1":
+        with app.app_context():
+            try:
+                seed_admin()
+            except Exception as e:
+                print("[SEED] dilewati:", e)
 
     # ================== AUTH GUARD ==================
     def login_required(view_func):
@@ -104,23 +160,45 @@ def create_app():
         username = (request.form.get("username") or "").strip()
         password = (request.form.get("password") or "").strip()
 
+        t0 = time.perf_counter()
+        outcome = "error"
         try:
             row = get_user_by_username(username)
             if not row:
                 # render kembali dengan error
+                outcome = "bad_user"
                 return render_template("login.html", error="User tidak ditemukan"), 401
 
-            if not check_password_hash(row["password"], password):
+            if not HASHER.verify(row["password"], password):
+                outcome = "bad_password"
                 return render_template("login.html", error="Password salah"), 401
 
+            if HASHER.needs_rehash(row["password"]):
+                # PASSWORD_HASH_METHOD berubah -> simpan ulang dengan cost baru (sekali per user)
+                try:
+                    db.session.execute(
+                        text(f"UPDATE {USER_TABLE} SET password = :p WHERE id_user = :id"),
+                        {"p": HASHER.hash(password), "id": row["id_user"]}
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print("[login] rehash dilewati:", e)
+
             session["user"] = {
                 "id_user": row["id_user"],
                 "username": row["username"],
                 "role": row["role"],
             }
+            outcome = "ok"
             return redirect(url_for("ui_home"))
+        except HasherBusy:
+            outcome = "busy"
+            return render_template("login.html", error="Server sedang sibuk, coba lagi sebentar"), 503, {"Retry-After": "2"}
         except Exception as e:
             return render_template("login.html", error=f"Gagal login: {e}"), 500
+        finally:
+            METRICS.observe_login(outcome, time.perf_counter() - t0)
 
     @app.post("/logout")
     def logout_submit():
@@ -146,53 +224,38 @@ def create_app():
         if password != confirm:
             return render_template("register.html", error="Konfirmasi password tidak cocok"), 400
 
+        t0 = time.perf_counter()
+        outcome = "register_error"
         try:
             create_user(username, password, "admin")
+            outcome = "register_ok"
             # setelah sukses, arahkan ke login
             return redirect(url_for("login_page"))
         except ValueError as ve:
+            outcome = "register_invalid"
             return render_template("register.html", error=str(ve)), 400
+        except HasherBusy:
+            outcome = "register_busy"
+            return render_template("register.html", error="Server sedang sibuk, coba lagi sebentar"), 503, {"Retry-After": "2"}
         except Exception as e:
             db.session.rollback()
             return render_template("register.html", error=f"Gagal register: {e}"), 500
+        finally:
+            METRICS.observe_login(outcome, time.perf_counter() - t0)
 
     # ================= REGISTER BLUEPRINTS =================
-    try:
-        from orders import orders_bp
-        app.register_blueprint(orders_bp, url_prefix="/api/orders")
-    except Exception as e:
-        print("WARN: gagal load orders_bp:", e)
-
-    try:
-        from cart import cart_bp
-        app.register_blueprint(cart_bp, url_prefix="/api/cart")
-    except Exception as e:
-        print("WARN: gagal load cart_bp:", e)
-
-    try:
-        from supplier import supplier_bp
-        app.register_blueprint(supplier_bp, url_prefix="/api/supplier")
-    except Exception as e:
-        print("WARN: gagal load supplier_bp:", e)
-
-    try:
-        from supplier2 import supplier2_bp
-        app.register_blueprint(supplier2_bp, url_prefix="/api/supplier2")
-    except Exception as e:
-        print("WARN: gagal load supplier2_bp:", e)
-
-    try:
-        from transaksi import pos_bp
-        app.register_blueprint(pos_bp)
-    except Exception as e:
-        print("WARN: gagal load pos_bp:", e)
-
-    try:
-        from get_product import receiver_bp
-        app.register_blueprint(receiver_bp)
-    except Exception as e:
-        print("WARN: gagal load receiver_bp:", e)
-
+    t_phase = time.perf_counter()
+    for module_name, attr, prefix in BLUEPRINTS:
+        with STARTUP.phase(f"blueprints.{module_name}"):
+            bp = getattr(importlib.import_module(module_name), attr)
+            app.register_blueprint(bp, url_prefix=prefix)
+    STARTUP.mark("blueprints", t_phase)
+
+    from orders import DRAFTS
+    from transaksi import METODE_BAYAR
+    METRICS.gauge_on_scrape("draft_store_drafts", "Jumlah draft order supplier", DRAFTS.count)
+
+    t_phase = time.perf_counter()
     # ========================= ROOT / =========================
     @app.get("/")
     def root():
@@ -237,74 +300,151 @@ def create_app():
     def ui_history():
         return render_template("history.html")
 
+    # index nama template yang boleh dibuka lewat /ui/<name>, dibangun sekali saat startup
+    # ("history" -> "history.html", "sub/x" -> "sub/x.html"): request tidak menyentuh filesystem
+    tpl_root = os.path.join(app.root_path, app.template_folder)
+    UI_TEMPLATES = {}
+    for dirpath, _, filenames in os.walk(tpl_root):
+        for fn in filenames:
+            if fn.endswith(".html"):
+                rel = os.path.relpath(os.path.join(dirpath, fn), tpl_root).replace(os.sep, "/")
+                UI_TEMPLATES[rel[:-5]] = rel
+
     @app.get("/ui/<path:name>")
     @login_required
     def ui_by_name(name: str):
         if not re.fullmatch(r"[a-zA-Z0-9_\-\/]+", name or ""):
             return jsonify({"error": "invalid template name"}), 400
 
-        tpl_name = name if name.endswith(".html") else f"{name}.html"
-
-        tpl_root = (
-            app.jinja_loader.searchpath[0]
-            if getattr(app, "jinja_loader", None) and app.jinja_loader.searchpath
-            else os.path.join(app.root_path, "templates")
-        )
-        tpl_root_abs = os.path.abspath(tpl_root)
-        full_path = os.path.normpath(os.path.join(tpl_root_abs, tpl_name))
-
-        if not full_path.startswith(tpl_root_abs + os.sep):
-            return jsonify({"error": "template out of scope"}), 400
-        if not os.path.exists(full_path):
-            return jsonify({"error": "template not found", "template": tpl_name}), 404
+        tpl_name = UI_TEMPLATES.get(name)
+        if tpl_name is None:
+            return jsonify({"error": "template not found", "template": f"{name}.html"}), 404
 
         return render_template(tpl_name)
 
     # ===================== API GUDANG =====================
     TABLE = "barang"
 
-    def _like(q: str) -> str:
-        return f"%{q.strip()}%" if q else "%"
-
-    @app.get("/api/gudang")
-    def api_gudang_list():
-        q = (request.args.get("q") or "").strip()
-        rows = db.session.execute(
+    GUDANG_COLUMNS = """
+        id_barang      AS sku,
+        nama_barang    AS nama_product,
+        id_supplier    AS id_supplier,
+        quantity       AS stok,
+        harga_jual     AS harga_jual,
+        harga_supplier AS harga_supplier,
+        berat          AS berat,
+        updated_at     AS last_restock
+    """
+    GUDANG_KEYSET = ("nama_barang", "id_barang")
+    GUDANG_EXPORT_BATCH = 1000
+
+    def _gudang_page(after, limit: int):
+        """Satu halaman keyset urut (nama_barang, id_barang). after=None -> halaman pertama."""
+        where, params = "", {"limit": limit}
+        if after is not None:
+            clause, cparams = keyset_clause(GUDANG_KEYSET, after)
+            where = f"WHERE {clause}"
+            params.update(cparams)
+        return db.session.execute(
             text(f"""
-                SELECT
-                    id_barang      AS sku,
-                    nama_barang    AS nama_product,
-                    id_supplier    AS id_supplier,
-                    quantity       AS stok,
-                    harga_jual     AS harga_jual,
-                    harga_supplier AS harga_supplier,
-                    berat          AS berat,
-                    updated_at     AS last_restock
+                SELECT {GUDANG_COLUMNS}
                 FROM {TABLE}
-                WHERE (:q = '' OR id_barang LIKE :q_like OR nama_barang LIKE :q_like)
-                ORDER BY nama_barang
+                {where}
+                ORDER BY nama_barang, id_barang
+                LIMIT :limit
             """),
-            {"q": q, "q_like": _like(q)}
+            params
         ).mappings().all()
-        items = [_row_to_dict(r) for r in rows]
-        return jsonify({"items": items})
 
-    @app.get("/api/gudang/stats")
-    def api_gudang_stats():
-        def scalar(sql, params=None):
-            res = db.session.execute(text(sql), params or {})
-            v = res.scalar()
-            return int(v or 0)
+    def _gudang_by_skus(skus):
+        """Ambil baris untuk daftar SKU hasil search index, urutan ranking dipertahankan."""
+        if not skus:
+            return []
+        rows = db.session.execute(
+            text(f"SELECT {GUDANG_COLUMNS} FROM {TABLE} WHERE id_barang IN :skus")
+            .bindparams(bindparam("skus", expanding=True)),
+            {"skus": list(skus)}
+        ).mappings().all()
+        by_sku = {r["sku"]: r for r in rows}
+        return [by_sku[s] for s in skus if s in by_sku]
 
-        total_produk = scalar(f"SELECT COUNT(*) FROM {TABLE}")
-        total_stok   = scalar(f"SELECT COALESCE(SUM(quantity),0) FROM {TABLE}")
-        low_stok     = scalar(f"SELECT COUNT(*) FROM {TABLE} WHERE quantity < 10")
+    SEARCH_INDEX.init_app(app, lambda: db.session.execute(
+        text(f"SELECT id_barang, nama_barang FROM {TABLE}")
+    ).all())
 
-        return jsonify({
-            "total_produk": total_produk,
-            "total_stok": total_stok,
-            "low_stok": low_stok,
-        })
+    @app.get("/api/gudang")
+    @read_only
+    @conditional(watermark(TABLE))
+    def api_gudang_list():
+        """
+        Query params (opsional):
+          - q: cari sku / nama (ranking dari search index, tanpa cursor)
+          - limit: default 100, max 500
+          - cursor: next_cursor dari halaman sebelumnya
+          - format=ndjson: stream SEMUA baris (export), satu JSON per baris;
+            dengan q: semua hasil search index, urut ranking (tanpa LIKE '%q%')
+        """
+        q = (request.args.get("q") or "").strip()
+        try:
+            limit = parse_limit(request.args.get("limit"))
+            cursor = request.args.get("cursor")
+            after = decode_cursor(cursor, len(GUDANG_KEYSET)) if cursor else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if request.args.get("format") == "ndjson":
+            if q:
+                SEARCH_INDEX.ensure_fresh()
+                skus = SEARCH_INDEX.search_all(q)
+
+                def generate_q():
+                    for start in range(0, len(skus), GUDANG_EXPORT_BATCH):
+                        for r in _gudang_by_skus(skus[start:start + GUDANG_EXPORT_BATCH]):
+                            yield app.json.dumps(dict(r)) + "\n"
+                return Response(stream_with_context(generate_q()), mimetype="application/x-ndjson")
+
+            def generate(after=after):
+                # keyset per batch -> memori tetap datar berapapun jumlah SKU
+                while True:
+                    rows = _gudang_page(after, GUDANG_EXPORT_BATCH)
+                    for r in rows:
+                        yield app.json.dumps(dict(r)) + "\n"
+                    if len(rows) < GUDANG_EXPORT_BATCH:
+                        break
+                    after = [rows[-1]["nama_product"], rows[-1]["sku"]]
+            return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+        if q:
+            # pencarian lewat index in-process (SKU persis > awalan > kata > substring)
+            SEARCH_INDEX.ensure_fresh()
+            rows = _gudang_by_skus(SEARCH_INDEX.search(q, limit))
+            return jsonify({**rows_payload(rows), "next_cursor": None})
+
+        rows = _gudang_page(after, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]["nama_product"], rows[-1]["sku"]]) if has_more else None
+        return jsonify({**rows_payload(rows), "next_cursor": next_cursor})
+
+    STATS.init_app(app, lambda: db.session.execute(
+        text(f"SELECT id_barang, quantity FROM {TABLE}")
+    ).all())
+
+    @app.get("/api/gudang/stats")
+    def api_gudang_stats():
+        """
+        Counter in-memory (lihat gudang_stats.py), bukan query agregat per request.
+        Query params (opsional):
+          - threshold: batas stok rendah selain default GUDANG_LOW_STOCK
+          - reconcile=1: paksa hitung ulang dari tabel
+        """
+        try:
+            threshold = int(request.args["threshold"]) if request.args.get("threshold") else None
+        except ValueError:
+            return jsonify({"error": "threshold harus angka"}), 400
+        if request.args.get("reconcile") == "1":
+            STATS.reconcile()
+        return jsonify(STATS.snapshot(threshold))
 
     @app.post("/api/gudang/restock")
     def api_gudang_restock():
@@ -350,6 +490,8 @@ def create_app():
                 """),
                 {"sku": sku}
             ).mappings().first()
+            SEARCH_INDEX.upsert(row["sku"], row["nama_product"])
+            STATS.set_quantity(row["sku"], row["stok"])
             return jsonify({"updated": _row_to_dict(row)}), 200
 
         except Exception as e:
@@ -409,6 +551,8 @@ def create_app():
                     WHERE id_barang = :sku
                 """), {"sku": sku}
             ).mappings().first()
+            SEARCH_INDEX.upsert(row["sku"], row["nama_product"])
+            STATS.set_quantity(row["sku"], row["stok"])
             return jsonify({"updated": _row_to_dict(row)}), 200
 
         except Exception as e:
@@ -416,33 +560,119 @@ def create_app():
             return jsonify({"error": "gagal update", "detail": str(e)}), 500
 
     # ===================== HISTORY =====================
+    # Keyset pagination urut terbaru dulu: (tanggal, id) DESC, cursor = next_cursor.
+    # Filter (opsional): from / to (YYYY-MM-DD, inklusif), plus
+    #   resi     : supplier (nama_supplier), distributor (nama_distributor)
+    #   transaksi: metode (CASH | QRIS | CARD)
+    # Index pendukung: migrations/006_history_keyset_index.sql
+    RESI_KEYSET = ("tanggal", "no_resi", "id_barang")
+    TRANSAKSI_KEYSET = ("tanggal", "id_transaksi")
+
+    def _date_range(conds: list, params: dict):
+        """from/to -> tanggal >= from 00:00 AND tanggal < (to + 1 hari). Raise ValueError."""
+        raw_from = (request.args.get("from") or "").strip()
+        raw_to = (request.args.get("to") or "").strip()
+        try:
+            if raw_from:
+                params["from_ts"] = datetime.date.fromisoformat(raw_from).isoformat()
+                conds.append("tanggal >= :from_ts")
+            if raw_to:
+                params["to_ts"] = (datetime.date.fromisoformat(raw_to) + datetime.timedelta(days=1)).isoformat()
+                conds.append("tanggal < :to_ts")
+        except ValueError:
+            raise ValueError("from/to harus format YYYY-MM-DD")
+
+    def _history_page(columns: str, table: str, keyset, conds: list, params: dict):
+        limit = parse_limit(request.args.get("limit"))
+        cursor = request.args.get("cursor")
+        if cursor:
+            clause, cparams = keyset_clause(keyset, decode_cursor(cursor, len(keyset)), descending=True)
+            conds.append(clause)
+            params.update(cparams)
+        params["limit"] = limit + 1
+        order = ", ".join(f"{c} DESC" for c in keyset)
+        rows = db.session.execute(
+            text(f"""
+                SELECT {columns}
+                FROM {table}
+                WHERE {" AND ".join(conds)}
+                ORDER BY {order}
+                LIMIT :limit
+            """),
+            params
+        ).mappings().all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][c] for c in keyset]) if has_more else None
+        return jsonify({**rows_payload(rows), "next_cursor": next_cursor})
+
     @app.get("/api/history/resi")
+    @read_only
+    @conditional(watermark("resi"))
     def api_history_resi():
-        rows = db.session.execute(text("""
-            SELECT no_resi, id_barang, nama_barang, quantity, nama_supplier, nama_distributor, status, tanggal
-            FROM resi
-            WHERE status = 'DELIVERED'
-            ORDER BY tanggal DESC
-            LIMIT 100
-        """)).mappings().all()
-        return jsonify({"items": [dict(r) for r in rows]})
+        conds, params = ["status = 'DELIVERED'"], {}
+        try:
+            _date_range(conds, params)
+            for arg, col in (("supplier", "nama_supplier"), ("distributor", "nama_distributor")):
+                val = (request.args.get(arg) or "").strip()
+                if val:
+                    conds.append(f"{col} = :{arg}")
+                    params[arg] = val
+            return _history_page(
+                "no_resi, id_barang, nama_barang, quantity, nama_supplier, nama_distributor, status, tanggal",
+                "resi", RESI_KEYSET, conds, params,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
     @app.get("/api/history/transaksi")
+    @read_only
+    @conditional(watermark("transaksi"))
     def api_history_transaksi():
-        rows = db.session.execute(text("""
-            SELECT id_transaksi, tanggal, customer_id, total_harga, metode_bayar, status, bayar, kembali
-            FROM transaksi
-            WHERE status = 'PAID'
-            ORDER BY tanggal DESC
-            LIMIT 100
-        """)).mappings().all()
-        return jsonify({"items": [dict(r) for r in rows]})
+        conds, params = ["status = 'PAID'"], {}
+        try:
+            _date_range(conds, params)
+            metode = (request.args.get("metode") or "").strip().upper()
+            if metode:
+                # nilai tersimpan lowercase (transaksi._map_metode); jangan andalkan collation
+                if metode not in METODE_BAYAR:
+                    raise ValueError(f"metode harus salah satu dari {', '.join(sorted(METODE_BAYAR.values()))}")
+                conds.append("metode_bayar = :metode")
+                params["metode"] = METODE_BAYAR[metode]
+            return _history_page(
+                "id_transaksi, tanggal, customer_id, total_harga, metode_bayar, status, bayar, kembali",
+                "transaksi", TRANSAKSI_KEYSET, conds, params,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
     # ===================== DEBUG =====================
     @app.get("/__routes__")
     def routes():
         return {"routes": sorted([str(r) for r in app.url_map.iter_rules()])}
 
+    @app.get("/__sql__")
+    def sql_stats():
+        if request.args.get("reset") == "1":
+            SQL_TRACE.reset()
+        return jsonify(SQL_TRACE.snapshot())
+
+    @app.get("/metrics")
+    def metrics():
+        return METRICS.render()
+
+    @app.get("/__http__")
+    def http_pools():
+        return jsonify(HTTP_CLIENT.stats())
+
+    @app.get("/__startup__")
+    def startup_report():
+        return jsonify(STARTUP.report())
+
+    @app.get("/__db__")
+    def db_pools():
+        return jsonify(DB_ROUTER.stats(db.engines))
+
     @app.get("/__db_ping__")
     def db_ping():
         try:
@@ -463,6 +693,9 @@ def create_app():
     def server_error(err):
         return jsonify({"error": "internal server error", "detail": str(err)}), 500
 
+    STARTUP.mark("routes", t_phase)
+    STARTUP.mark("create_app", t_app)
+    print(STARTUP.summary())
     return app
 
 
@@ -0,0 +1,122 @@
+# assets.py
+# Aset JS hasil build_assets.py: fingerprint + gzip/brotli, cache immutable.
+#
+#   - static/dist/manifest.json dibaca sekali saat create_app
+#   - loader Jinja mengganti <script> inline di template dengan
+#     <script src="/static/dist/<nama>.<hash>.js"> HANYA bila isi inline
+#     sekarang sama persis (sha256) dengan yang di-build -> template yang
+#     diedit tanpa build ulang tetap jalan dengan JS inline-nya sendiri
+#   - src="/static/transaksi.js" dan "/static/js/tracking.js" diganti versi
+#     dist dengan aturan yang sama (hash file sumber harus cocok)
+#   - GET /static/dist/<file>: pilih .br / .gz sesuai Accept-Encoding,
+#     Cache-Control: public, max-age=1 tahun, immutable (nama file berubah
+#     setiap isi berubah, jadi aman di-cache selamanya)
+#
+# Tanpa manifest (belum pernah build) semua template dikirim apa adanya.
+import hashlib
+import json
+import os
+import re
+
+from flask import request, send_from_directory, abort
+from jinja2 import FileSystemLoader
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+DIST_URL = "/static/dist/"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# <script> tanpa atribut = JS inline (yang pakai src tidak ikut)
+INLINE_SCRIPT_RE = re.compile(r"<script>(.*?)</script>", re.S)
+# file JS di static/ yang ikut di-build (path relatif static/)
+STATIC_SCRIPTS = ("transaksi.js", "js/tracking.js")
+
+_MIMETYPES = {".js": "text/javascript", ".css": "text/css"}
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class AssetLoader(FileSystemLoader):
+    """FileSystemLoader yang menukar script inline/static dengan versi dist dari manifest."""
+
+    def __init__(self, searchpath, assets):
+        super().__init__(searchpath)
+        self.assets = assets
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        return self.assets.rewrite(template, source), filename, uptodate
+
+
+class Assets:
+    def __init__(self):
+        self.manifest = {"inline": {}, "static": {}, "files": {}}
+        self._static_src = {}  # '/static/transaksi.js' -> '/static/dist/transaksi.<hash>.js'
+
+    # ---------- hook ----------
+    def init_app(self, app):
+        self.load()
+        app.jinja_loader = AssetLoader(os.path.join(app.root_path, app.template_folder), self)
+        app.add_url_rule(DIST_URL + "<path:filename>", "dist_asset", self.serve)
+
+    def load(self):
+        try:
+            with open(MANIFEST_PATH, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print("WARN: manifest aset tidak bisa dibaca:", e)
+            return
+        # static: hanya pakai versi dist bila file sumber belum berubah sejak build
+        for rel, entry in self.manifest.get("static", {}).items():
+            try:
+                with open(os.path.join(STATIC_DIR, rel), "rb") as f:
+                    current = digest(f.read())
+            except OSError:
+                continue
+            if current == entry["sha256"]:
+                self._static_src[f"/static/{rel}"] = DIST_URL + entry["file"]
+
+    # ---------- rewrite template ----------
+    def rewrite(self, template: str, source: str) -> str:
+        built = {e["sha256"]: e["file"] for e in self.manifest.get("inline", {}).get(template, [])}
+        if built:
+            def swap(m):
+                name = built.get(digest(m.group(1).encode("utf-8")))
+                return f'<script src="{DIST_URL}{name}"></script>' if name else m.group(0)
+            source = INLINE_SCRIPT_RE.sub(swap, source)
+        for src, dist in self._static_src.items():
+            source = source.replace(f'src="{src}"', f'src="{dist}"')
+        return source
+
+    # ---------- serve ----------
+    def serve(self, filename: str):
+        variants = self.manifest.get("files", {}).get(filename)
+        if variants is None:
+            abort(404)
+        encoding = None
+        accept = request.accept_encodings
+        for enc in ("br", "gzip"):
+            if enc in variants and accept[enc]:
+                encoding = enc
+                break
+        path = filename + {"br": ".br", "gzip": ".gz", None: ""}[encoding]
+        resp = send_from_directory(
+            DIST_DIR, path,
+            mimetype=_MIMETYPES.get(os.path.splitext(filename)[1], "application/octet-stream"),
+            max_age=31536000,
+        )
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        resp.headers["Vary"] = "Accept-Encoding"
+        resp.headers["Cache-Control"] = IMMUTABLE
+        return resp
+
+
+# instance bersama (dipasang di create_app)
+ASSETS = Assets()
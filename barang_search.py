@@ -0,0 +1,287 @@
+# barang_search.py
+# Index pencarian in-process untuk tabel barang (pengganti LIKE '%q%').
+#
+# Urutan ranking hasil:
+#   0. SKU persis sama
+#   1. SKU diawali q
+#   2. nama diawali q
+#   3. semua kata di q cocok sebagai awalan kata di nama ("bro 1k" -> "Broccoli 1kg")
+#   4. q muncul di tengah nama/SKU (semantik sama dengan LIKE '%q%' lama):
+#      q >= 3 huruf lewat irisan trigram, q 1-2 huruf lewat scan linear nama/SKU
+#
+# Index dibangun sekali dari DB (hanya id_barang + nama_barang), di-update saat
+# restock/patch, dan dibangun ulang di background tiap SEARCH_INDEX_TTL detik
+# supaya perubahan dari worker lain / langsung ke DB tetap ikut masuk.
+import bisect
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "300"))
+
+# huruf/angka Unicode (bukan hanya ASCII): "Kopi Gayo Kédé" -> ["kopi", "gayo", "kédé"]
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def _tokens(s: str):
+    return _TOKEN_RE.findall((s or "").lower())
+
+
+def _trigrams(s: str):
+    s = (s or "").lower()
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _prefix_range(sorted_list, prefix: str):
+    """Slice index [lo, hi) dari elemen sorted_list yang diawali prefix."""
+    lo = bisect.bisect_left(sorted_list, prefix)
+    hi = bisect.bisect_left(sorted_list, prefix + "\uffff")
+    return lo, hi
+
+
+class BarangSearchIndex:
+    def __init__(self, ttl: float = SEARCH_INDEX_TTL):
+        self.ttl = ttl
+        self._app = None
+        self._loader = None
+        self._lock = threading.RLock()
+        self._building = False
+        self._reset()
+        self._built_at = None
+        self._build_ms = None
+
+    def _reset(self):
+        self._names = {}        # sku -> nama asli
+        self._sku_lower = {}    # sku.lower() -> sku
+        self._sku_sorted = []   # sku.lower() terurut (prefix SKU)
+        self._name_sorted = []  # (nama.lower(), sku) terurut (prefix nama)
+        self._token_post = {}   # token -> set(sku)
+        self._token_sorted = [] # token terurut (prefix token)
+        self._tri_post = {}     # trigram -> set(sku)
+        self._order = {}        # sku -> posisi urut nama (kunci sort murah untuk ranking)
+
+    def init_app(self, app, loader):
+        """loader(): dipanggil di dalam app context, return iterable (sku, nama)."""
+        self._app = app
+        self._loader = loader
+
+    # ---------- build ----------
+    def _build_from(self, rows):
+        t0 = time.perf_counter()
+        names, sku_lower, token_post, tri_post, name_sorted = {}, {}, {}, {}, []
+        for sku, nama in rows:
+            sku = str(sku)
+            nama = nama or ""
+            names[sku] = nama
+            sku_lower[sku.lower()] = sku
+            name_sorted.append((nama.lower(), sku))
+            for tok in set(_tokens(nama)):
+                token_post.setdefault(tok, set()).add(sku)
+            for tri in _trigrams(nama) | _trigrams(sku):
+                tri_post.setdefault(tri, set()).add(sku)
+        name_sorted.sort()
+        order = {sku: float(i) for i, (_, sku) in enumerate(name_sorted)}
+        with self._lock:
+            self._names = names
+            self._sku_lower = sku_lower
+            self._sku_sorted = sorted(sku_lower)
+            self._name_sorted = name_sorted
+            self._token_post = token_post
+            self._token_sorted = sorted(token_post)
+            self._tri_post = tri_post
+            self._order = order
+            self._built_at = time.monotonic()
+            self._build_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    def rebuild(self):
+        """Bangun ulang dari DB. Harus dipanggil di dalam app context."""
+        self._build_from(self._loader())
+
+    def _rebuild_in_background(self):
+        app = self._app
+
+        def run():
+            try:
+                with app.app_context():
+                    self.rebuild()
+            except Exception as e:
+                print("[search-index] rebuild gagal:", e)
+            finally:
+                self._building = False
+
+        threading.Thread(target=run, name="barang-search-rebuild", daemon=True).start()
+
+    def ensure_fresh(self):
+        """Build pertama kali secara sinkron; setelah itu refresh di background kalau sudah lewat TTL."""
+        if self._built_at is None:
+            with self._lock:
+                if self._built_at is None:
+                    self.rebuild()
+            return
+        if time.monotonic() - self._built_at > self.ttl and not self._building:
+            with self._lock:
+                if self._building:
+                    return
+                self._building = True
+            self._rebuild_in_background()
+
+    # ---------- sinkronisasi incremental ----------
+    def _drop(self, sku: str):
+        old = self._names.pop(sku, None)
+        if old is None:
+            return
+        self._order.pop(sku, None)
+        self._sku_lower.pop(sku.lower(), None)
+        i = bisect.bisect_left(self._sku_sorted, sku.lower())
+        if i < len(self._sku_sorted) and self._sku_sorted[i] == sku.lower():
+            self._sku_sorted.pop(i)
+        i = bisect.bisect_left(self._name_sorted, (old.lower(), sku))
+        if i < len(self._name_sorted) and self._name_sorted[i] == (old.lower(), sku):
+            self._name_sorted.pop(i)
+        for tok in set(_tokens(old)):
+            post = self._token_post.get(tok)
+            if post is not None:
+                post.discard(sku)
+                if not post:
+                    del self._token_post[tok]
+                    j = bisect.bisect_left(self._token_sorted, tok)
+                    if j < len(self._token_sorted) and self._token_sorted[j] == tok:
+                        self._token_sorted.pop(j)
+        for tri in _trigrams(old) | _trigrams(sku):
+            post = self._tri_post.get(tri)
+            if post is not None:
+                post.discard(sku)
+                if not post:
+                    del self._tri_post[tri]
+
+    def upsert(self, sku: str, nama: str):
+        if self._built_at is None:
+            return  # belum pernah dibangun; build pertama akan membaca DB
+        sku = str(sku)
+        nama = nama or ""
+        with self._lock:
+            if self._names.get(sku) == nama:
+                return
+            self._drop(sku)
+            self._names[sku] = nama
+            self._sku_lower[sku.lower()] = sku
+            bisect.insort(self._sku_sorted, sku.lower())
+            i = bisect.bisect_left(self._name_sorted, (nama.lower(), sku))
+            self._name_sorted.insert(i, (nama.lower(), sku))
+            # posisi di antara tetangga -> urutan tetap benar tanpa renumber semua
+            prev_o = self._order[self._name_sorted[i - 1][1]] if i > 0 else -1.0
+            next_o = self._order[self._name_sorted[i + 1][1]] if i + 1 < len(self._name_sorted) else prev_o + 2.0
+            self._order[sku] = (prev_o + next_o) / 2
+            for tok in set(_tokens(nama)):
+                if tok not in self._token_post:
+                    self._token_post[tok] = set()
+                    bisect.insort(self._token_sorted, tok)
+                self._token_post[tok].add(sku)
+            for tri in _trigrams(nama) | _trigrams(sku):
+                self._tri_post.setdefault(tri, set()).add(sku)
+
+    def remove(self, sku: str):
+        with self._lock:
+            self._drop(str(sku))
+
+    # ---------- query ----------
+    def search(self, q: str, limit: int = 50) -> list:
+        """Return list SKU terurut berdasarkan ranking (maks limit)."""
+        ql = (q or "").strip().lower()
+        if not ql or limit <= 0:
+            return []
+        with self._lock:
+            names = self._names
+            out, seen = [], set()
+
+            def take(candidates, ordered=False):
+                """Ambil sisa slot dari satu tier; tier berikutnya tidak dihitung kalau sudah penuh."""
+                need = limit - len(out)
+                fresh = (s for s in candidates if s not in seen)
+                if ordered:
+                    picked = list(itertools.islice(fresh, need))
+                else:
+                    picked = heapq.nsmallest(need, fresh, key=self._order.__getitem__)
+                out.extend(picked)
+                seen.update(picked)
+                return len(out) >= limit
+
+            def take_set(cand: set, pred=None):
+                # set kandidat padat: jalan urut nama & berhenti begitu slot penuh
+                # (~need*N/|cand| langkah), lebih murah daripada sort |cand| kandidat
+                if len(cand) * len(cand) > (limit - len(out)) * len(names):
+                    ordered = (sku for _, sku in self._name_sorted
+                               if sku in cand and (pred is None or pred(sku)))
+                    return take(ordered, ordered=True)
+                return take(cand if pred is None else (x for x in cand if pred(x)))
+
+            # 0. SKU persis
+            exact = self._sku_lower.get(ql)
+            if exact and take([exact], ordered=True):
+                return out
+
+            # 1. awalan SKU (urut SKU)
+            lo, hi = _prefix_range(self._sku_sorted, ql)
+            if take((self._sku_lower[self._sku_sorted[i]] for i in range(lo, hi)), ordered=True):
+                return out
+
+            # 2. awalan nama (sudah urut nama)
+            lo = bisect.bisect_left(self._name_sorted, (ql,))
+            hi = bisect.bisect_left(self._name_sorted, (ql + "\uffff",))
+            if take((self._name_sorted[i][1] for i in range(lo, hi)), ordered=True):
+                return out
+
+            # 3. semua kata query = awalan kata di nama
+            q_tokens = _tokens(ql)
+            matched = None
+            for tok in q_tokens:
+                lo, hi = _prefix_range(self._token_sorted, tok)
+                hits = set()
+                for t in self._token_sorted[lo:hi]:
+                    hits |= self._token_post[t]
+                matched = hits if matched is None else (matched & hits)
+                if not matched:
+                    break
+            if matched and take_set(matched):
+                return out
+
+            # 4. substring di tengah nama/SKU
+            def contains(x):
+                return ql in names[x].lower() or ql in x.lower()
+
+            tris = _trigrams(ql)
+            if not tris:
+                # q 1-2 huruf tidak punya trigram -> scan linear urut nama
+                take((sku for nama, sku in self._name_sorted if ql in nama or ql in sku.lower()), ordered=True)
+            else:
+                posts = sorted((self._tri_post.get(t, set()) for t in tris), key=len)
+                cand = set(posts[0])
+                for p in posts[1:]:
+                    cand &= p
+                    if not cand:
+                        break
+                if cand:
+                    take_set(cand, contains)
+            return out
+
+    def search_all(self, q: str) -> list:
+        """Semua SKU yang cocok, urut ranking yang sama (export ?q=...&format=ndjson)."""
+        return self.search(q, limit=len(self._names))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "skus": len(self._names),
+                "tokens": len(self._token_post),
+                "trigrams": len(self._tri_post),
+                "age": round(time.monotonic() - self._built_at, 1) if self._built_at else None,
+                "build_ms": self._build_ms,
+                "ttl": self.ttl,
+            }
+
+
+# instance bersama untuk app.py & gudang.py
+SEARCH_INDEX = BarangSearchIndex()
@@ -0,0 +1,105 @@
+# bench/json_gudang.py
+# Microbenchmark serialisasi JSON payload /api/gudang (tanpa DB sungguhan):
+# baris dibuat di SQLite in-memory dengan tipe Numeric/DateTime supaya
+# SQLAlchemy mengembalikan Decimal & datetime seperti MySQL.
+#
+#   python bench/json_gudang.py --rows 10000 --repeat 20
+#
+# Membandingkan:
+#   stdlib+_row_to_dict : jalur lama (dict(r) + loop isinstance Decimal + DefaultJSONProvider)
+#   fast items          : FastJSONProvider + rows_payload (format default)
+#   fast columns        : FastJSONProvider + rows_payload(columns=True)  (?format=columns)
+import argparse
+import datetime
+import decimal
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy as sa
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_fast import FastJSONProvider, rows_payload, orjson
+
+
+def _make_rows(n: int):
+    engine = sa.create_engine("sqlite://")
+    meta = sa.MetaData()
+    barang = sa.Table(
+        "barang", meta,
+        sa.Column("sku", sa.String(20)),
+        sa.Column("nama_product", sa.String(100)),
+        sa.Column("id_supplier", sa.Integer),
+        sa.Column("stok", sa.Integer),
+        sa.Column("harga_jual", sa.Numeric(15, 2)),
+        sa.Column("harga_supplier", sa.Numeric(15, 2)),
+        sa.Column("berat", sa.Numeric(10, 2)),
+        sa.Column("last_restock", sa.DateTime),
+    )
+    meta.create_all(engine)
+    now = datetime.datetime(2025, 1, 1, 8, 0, 0)
+    with engine.begin() as conn:
+        conn.execute(barang.insert(), [
+            {
+                "sku": f"SY{i:05d}", "nama_product": f"Produk contoh nomor {i}", "id_supplier": 1 + i % 2,
+                "stok": i % 500, "harga_jual": decimal.Decimal("12500.00") + i,
+                "harga_supplier": decimal.Decimal("10000.50") + i, "berat": decimal.Decimal("0.25"),
+                "last_restock": now + datetime.timedelta(minutes=i),
+            }
+            for i in range(n)
+        ])
+    with engine.connect() as conn:
+        return conn.execute(sa.select(barang)).mappings().all()
+
+
+def _row_to_dict(row) -> dict:
+    # salinan jalur lama di app.py
+    d = dict(row)
+    for k, v in list(d.items()):
+        if isinstance(v, decimal.Decimal):
+            d[k] = float(v)
+    return d
+
+
+def _time(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), len(body)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark serialisasi JSON /api/gudang")
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    rows = _make_rows(args.rows)
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+
+    cases = {
+        "stdlib+_row_to_dict": lambda: stdlib.response(
+            {"items": [_row_to_dict(r) for r in rows], "next_cursor": None}).get_data(),
+        "fast items": lambda: fast.response({**rows_payload(rows, columns=False), "next_cursor": None}).get_data(),
+        "fast columns": lambda: fast.response({**rows_payload(rows, columns=True), "next_cursor": None}).get_data(),
+    }
+
+    print(f"rows={args.rows} repeat={args.repeat} orjson={'ya' if orjson is not None else 'tidak'}")
+    with app.app_context():
+        base = None
+        for name, fn in cases.items():
+            ms, size = _time(fn, args.repeat)
+            base = base or ms
+            print(f"{name:22s} p50={ms:8.2f} ms  body={size / 1024:8.1f} KiB  x{base / ms:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
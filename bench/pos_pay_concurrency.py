@@ -0,0 +1,105 @@
+# bench/pos_pay_concurrency.py
+# Benchmark konkurensi checkout POS: banyak "terminal" paralel menjual SKU yang
+# SAMA sampai stok habis, lalu cek tidak ada oversell.
+#
+# Jalankan terhadap server yang sedang hidup (DB MySQL sungguhan):
+#   python bench/pos_pay_concurrency.py --base-url http://127.0.0.1:5000 --sku SY001 \
+#       --stock 500 --terminals 50 --sales 20
+#
+# Hasil: jumlah penjualan sukses / ditolak (stok_kurang), sales-per-second,
+# latency p50/p99 endpoint /pay, dan stok akhir (harus = stok awal - sukses, >= 0).
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+
+def _terminal(base, sku, qty, sales, results, lock, start_evt):
+    s = requests.Session()
+    start_evt.wait()
+    for _ in range(sales):
+        r = s.post(f"{base}/api/pos/open", json={"pelanggan": "bench", "metode": "CASH"})
+        trx = r.json()["id_transaksi"]
+        s.post(f"{base}/api/pos/{trx}/items", json={"sku": sku, "qty": qty}).raise_for_status()
+
+        t0 = time.perf_counter()
+        r = s.post(f"{base}/api/pos/{trx}/pay", json={"metode": "CASH", "bayar": 10 ** 12})
+        dt = time.perf_counter() - t0
+
+        body = r.json() if r.headers.get("content-type", "").startswith("application/json") else {}
+        with lock:
+            results["latency"].append(dt)
+            if r.status_code == 200:
+                results["ok"] += 1
+            elif r.status_code == 409 and body.get("error") == "stok_kurang":
+                results["short"] += 1
+                s.post(f"{base}/api/pos/{trx}/void", json={})
+            else:
+                results["error"] += 1
+                results["errors"].append((r.status_code, body))
+
+
+def _stock(base, sku):
+    r = requests.get(f"{base}/api/gudang", params={"q": sku, "limit": 5})
+    r.raise_for_status()
+    for it in r.json()["items"]:
+        if it["sku"] == sku:
+            return int(it["stok"])
+    raise SystemExit(f"SKU {sku} tidak ditemukan di /api/gudang")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark konkurensi checkout POS")
+    ap.add_argument("--base-url", default="http://127.0.0.1:5000")
+    ap.add_argument("--sku", required=True)
+    ap.add_argument("--stock", type=int, default=500, help="stok awal yang di-set sebelum bench")
+    ap.add_argument("--terminals", type=int, default=50)
+    ap.add_argument("--sales", type=int, default=20, help="penjualan per terminal")
+    ap.add_argument("--qty", type=int, default=1, help="qty per penjualan")
+    args = ap.parse_args()
+    base = args.base_url.rstrip("/")
+
+    requests.patch(f"{base}/api/gudang/{args.sku}", json={"quantity": args.stock}).raise_for_status()
+    before = _stock(base, args.sku)
+
+    results = {"ok": 0, "short": 0, "error": 0, "latency": [], "errors": []}
+    lock = threading.Lock()
+    start_evt = threading.Event()
+    threads = [
+        threading.Thread(target=_terminal, args=(base, args.sku, args.qty, args.sales, results, lock, start_evt))
+        for _ in range(args.terminals)
+    ]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    start_evt.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    after = _stock(base, args.sku)
+    sold = results["ok"] * args.qty
+    lat = sorted(results["latency"])
+    p = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1000 if lat else 0.0
+
+    print(f"terminals        : {args.terminals}")
+    print(f"attempts         : {len(lat)}")
+    print(f"sold / short / err: {results['ok']} / {results['short']} / {results['error']}")
+    print(f"elapsed          : {elapsed:.2f} s")
+    print(f"sales/sec        : {results['ok'] / elapsed:.1f}")
+    print(f"pay p50 / p99    : {p(0.50):.1f} ms / {p(0.99):.1f} ms"
+          + (f"  (mean {statistics.mean(lat) * 1000:.1f} ms)" if lat else ""))
+    print(f"stock before/after: {before} -> {after} (expected {before - sold})")
+    for e in results["errors"][:5]:
+        print("  error:", e)
+
+    oversell = after < 0 or after != before - sold
+    print("RESULT           :", "OVERSELL / MISMATCH" if oversell else "OK, no oversell")
+    sys.exit(1 if oversell else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# build_assets.py
+# Build aset JS untuk produksi (lihat assets.py untuk sisi runtime).
+#
+#   python build_assets.py            # tulis static/dist/ + manifest.json
+#   python build_assets.py --clean    # hapus dulu isi static/dist/
+#
+# Yang di-build:
+#   - setiap <script> inline di templates/*.html -> <template>.<n>.<hash>.js
+#   - static/transaksi.js, static/js/tracking.js  -> <nama>.<hash>.js
+# Setiap file ditulis juga sebagai .gz (level 9) dan .br (kalau modul
+# brotli terpasang), jadi server tidak perlu kompres saat request.
+# Template di repo TIDAK diubah; penggantian script terjadi di loader Jinja
+# saat isi inline masih sama dengan yang di-build.
+import argparse
+import gzip
+import json
+import os
+import shutil
+import time
+
+try:
+    import brotli
+except ImportError:  # opsional: tanpa brotli hanya .gz
+    brotli = None
+
+from assets import DIST_DIR, INLINE_SCRIPT_RE, MANIFEST_PATH, STATIC_DIR, STATIC_SCRIPTS, digest
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+FINGERPRINT_LEN = 10
+
+
+def _write(name: str, data: bytes, files: dict) -> dict:
+    path = os.path.join(DIST_DIR, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    sizes = {"raw": len(data)}
+    with open(path + ".gz", "wb") as f:
+        # mtime=0 -> output sama untuk input sama (build reproducible)
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        f.write(gz)
+        sizes["gzip"] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        with open(path + ".br", "wb") as f:
+            f.write(br)
+        sizes["br"] = len(br)
+    files[name] = sorted(k for k in sizes if k != "raw")
+    return sizes
+
+
+def build(clean: bool = False) -> dict:
+    if clean and os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR, exist_ok=True)
+    manifest = {"built_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "inline": {}, "static": {}, "files": {}}
+    report = []
+
+    for tpl in sorted(os.listdir(TEMPLATES_DIR)):
+        if not tpl.endswith(".html"):
+            continue
+        with open(os.path.join(TEMPLATES_DIR, tpl), encoding="utf-8") as f:
+            source = f.read()
+        entries = []
+        for i, m in enumerate(INLINE_SCRIPT_RE.finditer(source)):
+            data = m.group(1).encode("utf-8")
+            sha = digest(data)
+            name = f"{tpl[:-5]}.{i}.{sha[:FINGERPRINT_LEN]}.js"
+            report.append((name, _write(name, data, manifest["files"])))
+            entries.append({"sha256": sha, "file": name})
+        if entries:
+            manifest["inline"][tpl] = entries
+
+    for rel in STATIC_SCRIPTS:
+        with open(os.path.join(STATIC_DIR, rel), "rb") as f:
+            data = f.read()
+        sha = digest(data)
+        stem = os.path.splitext(os.path.basename(rel))[0]
+        name = f"{stem}.{sha[:FINGERPRINT_LEN]}.js"
+        report.append((name, _write(name, data, manifest["files"])))
+        manifest["static"][rel] = {"sha256": sha, "file": name}
+
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_PATH)
+
+    for name, sizes in report:
+        extra = " ".join(f"{k}={v}" for k, v in sizes.items() if k != "raw")
+        print(f"{name:45s} raw={sizes['raw']:7d} {extra}")
+    if brotli is None:
+        print("INFO: modul brotli tidak terpasang, hanya .gz yang dibuat")
+    return manifest
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fingerprint + precompress JS untuk static/dist")
+    ap.add_argument("--clean", action="store_true", help="hapus static/dist sebelum build")
+    args = ap.parse_args()
+    build(clean=args.clean)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,122 @@
 # cart.py
+import secrets
+
+import requests
 from flask import Blueprint, request, jsonify, session
 
+from cart_store import make_cart_store, line_key
+from catalog import SOURCES, catalog_index, source_for_supplier
+
 cart_bp = Blueprint("cart", __name__)
 
-# gunakan session untuk simpan keranjang (per user)
-def _get_cart():
-    return session.setdefault("cart", [])
+# isi keranjang disimpan di server (lihat cart_store.py); cookie hanya bawa cart_id
+CARTS = make_cart_store()
+
+
+def _cart_id(create: bool = True):
+    cid = session.get("cart_id")
+    legacy = session.pop("cart", None)
+    if cid is None and (create or legacy):
+        cid = session["cart_id"] = secrets.token_urlsafe(16)
+        CARTS.evict_expired()  # sekalian bersihkan keranjang yang sudah lama ditinggal
+    if legacy:
+        # keranjang lama masih di cookie -> pindahkan sekali ke store
+        def migrate(lines):
+            for it in legacy:
+                lines.setdefault(line_key(it["id_product"]), it)
+        CARTS.update(cid, migrate)
+    return cid
+
+
+def _new_line(data: dict) -> dict:
+    return {
+        "id_product": data.get("id_product"),
+        "nama_product": data.get("nama_product"),
+        "harga": int(data.get("harga") or 0),
+        "stok": int(data.get("stok") or 0),
+        "qty": int(data.get("qty") or 1),
+        "_source": data.get("_source") or data.get("source"),
+    }
+
+
+def _add(lines: dict, data: dict):
+    key = line_key(data["id_product"])
+    line = lines.get(key)
+    if line is None:
+        lines[key] = _new_line(data)
+        return "added"
+    line["qty"] += int(data.get("qty", 1))
+    return "updated"
+
+
+class CatalogUnavailable(RuntimeError):
+    pass
+
+
+def validate_cart(source: str) -> dict:
+    """
+    Cek ulang seluruh keranjang terhadap katalog supplier yang di-cache
+    (satu lookup katalog untuk semua item). Per item:
+      ok | repriced (harga berubah, harga di keranjang diperbarui)
+      stok_kurang (qty > stok katalog) | unknown (tidak ada di katalog sumber ini)
+    Harga & stok baru ditulis ke keranjang dalam satu update atomik.
+    """
+    cid = _cart_id(create=False)
+    try:
+        index, cache_status = catalog_index(source)
+    except requests.exceptions.RequestException as e:
+        raise CatalogUnavailable(str(e))
+
+    report = []
+
+    def apply(lines):
+        report.clear()
+        for line in lines.values():
+            item = index.get(line_key(line["id_product"]))
+            row = {"id_product": line["id_product"], "nama_product": line.get("nama_product"), "qty": line["qty"]}
+            if item is None:
+                row["status"] = "unknown"
+            else:
+                harga, stok = int(item.get("harga") or 0), int(item.get("stok") or 0)
+                row.update(harga=harga, stok=stok)
+                if line["qty"] > stok:
+                    row["status"] = "stok_kurang"
+                elif line.get("harga") != harga:
+                    row.update(status="repriced", harga_lama=line.get("harga"))
+                else:
+                    row["status"] = "ok"
+                line.update(harga=harga, stok=stok, _source=source)
+            report.append(row)
+
+    if cid:
+        CARTS.update(cid, apply)
+    blocked = [r for r in report if r["status"] in ("stok_kurang", "unknown")]
+    return {
+        "ok": bool(report) and not blocked,
+        "source": source,
+        "catalog": cache_status,
+        "items": report,
+        "repriced": sum(1 for r in report if r["status"] == "repriced"),
+        "blocked": len(blocked),
+        "total": sum((r.get("harga") or 0) * r["qty"] for r in report),
+    }
+
+
+# dipakai orders.py (checkout)
+def load_cart() -> list:
+    cid = _cart_id(create=False)
+    return list(CARTS.get(cid).values()) if cid else []
+
+
+def clear_cart():
+    cid = _cart_id(create=False)
+    if cid:
+        CARTS.clear(cid)
 
-def _save_cart(cart):
-    session["cart"] = cart
-    session.modified = True
 
 @cart_bp.get("/")
 def cart_view():
-    cart = _get_cart()
+    cart = load_cart()
     total = sum((it.get("harga", 0) or 0) * (it.get("qty", 1) or 0) for it in cart)
     return jsonify({"items": cart, "total": total})
 
@@ -22,65 +125,73 @@ def cart_add():
     data = request.get_json(silent=True) or {}
     if not data.get("id_product"):
         return jsonify({"error": "id_product wajib"}), 400
-    cart = _get_cart()
 
-    # cek kalau barang sudah ada → update qty
-    for it in cart:
-        if str(it["id_product"]) == str(data["id_product"]):
-            it["qty"] += int(data.get("qty", 1))
-            _save_cart(cart)
-            return jsonify({"message": "updated"}), 200
-
-    cart.append({
-        "id_product": data["id_product"],
-        "nama_product": data.get("nama_product"),
-        "harga": int(data.get("harga") or 0),
-        "stok": int(data.get("stok") or 0),
-        "qty": int(data.get("qty") or 1),
-    })
-    _save_cart(cart)
-    return jsonify({"message": "added"}), 200
+    # barang sudah ada → update qty, belum ada → tambah baris
+    result = {}
+    CARTS.update(_cart_id(), lambda lines: result.update(message=_add(lines, data)))
+    return jsonify(result), 200
 
 @cart_bp.post("/bulk_add")
 def cart_bulk_add():
     data = request.get_json(silent=True) or {}
-    items = data.get("items", [])
-    cart = _get_cart()
-    for new_item in items:
-        found = False
-        for it in cart:
-            if str(it["id_product"]) == str(new_item["id_product"]):
-                it["qty"] += int(new_item.get("qty", 1))
-                found = True
-                break
-        if not found:
-            cart.append({
-                "id_product": new_item.get("id_product"),
-                "nama_product": new_item.get("nama_product"),
-                "harga": int(new_item.get("harga") or 0),
-                "stok": int(new_item.get("stok") or 0),
-                "qty": int(new_item.get("qty") or 1),
-            })
-    _save_cart(cart)
+    items = [it for it in data.get("items", []) if it.get("id_product")]
+
+    def apply(lines):
+        for new_item in items:
+            _add(lines, new_item)
+
+    CARTS.update(_cart_id(), apply)
     return jsonify({"message": "bulk added"}), 200
 
 @cart_bp.post("/update")
 def cart_update():
     data = request.get_json(silent=True) or {}
-    id_product = data.get("id_product")
+    key = line_key(data.get("id_product"))
     qty = int(data.get("qty", 0))
-    cart = _get_cart()
-    for it in cart:
-        if str(it["id_product"]) == str(id_product):
-            if qty <= 0:
-                cart.remove(it)
-            else:
-                it["qty"] = qty
-            break
-    _save_cart(cart)
+
+    def apply(lines):
+        if key not in lines:
+            return
+        if qty <= 0:
+            del lines[key]
+        else:
+            lines[key]["qty"] = qty
+
+    CARTS.update(_cart_id(), apply)
     return jsonify({"message": "updated"}), 200
 
+@cart_bp.post("/validate")
+def cart_validate():
+    """
+    Body: {"id_supplier": 1|2} atau {"source": "supplier"|"supplier2"}.
+    Tanpa keduanya, sumber diambil dari _source item di keranjang.
+    200 = semua item bisa dipesan (mungkin ada yang di-reprice), 409 = ada yang diblokir.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get("source"):
+            source = data["source"]
+            if source not in SOURCES:
+                raise KeyError(f"source {source} tidak dikenal")
+        elif data.get("id_supplier"):
+            source = source_for_supplier(data["id_supplier"])
+        else:
+            sources = {it.get("_source") for it in load_cart()} - {None}
+            if len(sources) != 1:
+                return jsonify({"error": "id_supplier wajib (sumber keranjang tidak bisa ditentukan)"}), 400
+            source = sources.pop()
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        result = validate_cart(source)
+    except CatalogUnavailable as e:
+        return jsonify({"error": "catalog_unavailable", "detail": str(e)}), 503
+    if not result["items"]:
+        return jsonify({"error": "Cart kosong"}), 400
+    return jsonify(result), (200 if result["ok"] else 409)
+
 @cart_bp.post("/clear")
 def cart_clear():
-    _save_cart([])
+    clear_cart()
     return jsonify({"message": "cleared"}), 200
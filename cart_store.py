@@ -0,0 +1,195 @@
+# cart_store.py
+# Penyimpanan keranjang di server (pengganti list session["cart"] di cookie).
+# Cookie session hanya membawa session["cart_id"]; isi keranjang ada di sini.
+#
+# Dua backend, dipilih lewat env CART_STORE (pola sama dengan draft_store.py):
+#   - "sqlite" (default): satu baris per item (cart_id, id_product) -> update
+#     satu item = satu UPSERT, dipakai bersama semua worker gunicorn
+#   - "memory": dict per proses (cukup untuk `python app.py` / dev)
+#
+# Isi keranjang = dict {str(id_product): line} (urutan = urutan masuk), jadi
+# cari/ubah satu item O(1). update(cart_id, fn) atomik untuk banyak item
+# sekaligus. Keranjang yang tidak disentuh selama CART_TTL detik dihapus.
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CART_TTL = float(os.getenv("CART_TTL", str(7 * 24 * 3600)))
+CART_DB_PATH = os.getenv("CART_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "carts.db"))
+
+
+def line_key(id_product) -> str:
+    return str(id_product)
+
+
+class MemoryCartStore:
+    backend = "memory"
+
+    def __init__(self, ttl: float = CART_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._carts = {}    # cart_id -> {key: line}
+        self._touched = {}  # cart_id -> epoch detik akses terakhir
+
+    def get(self, cart_id: str) -> dict:
+        with self._lock:
+            lines = self._carts.get(cart_id)
+            if lines is None or time.time() - self._touched[cart_id] > self.ttl:
+                return {}
+            return {k: dict(v) for k, v in lines.items()}
+
+    def update(self, cart_id: str, fn) -> dict:
+        """Read-modify-write atomik: fn(lines) mengubah dict {key: line} di tempat."""
+        with self._lock:
+            now = time.time()
+            cur = self._carts.get(cart_id)
+            if cur is None or now - self._touched.get(cart_id, now) > self.ttl:
+                cur = {}
+            lines = {k: dict(v) for k, v in cur.items()}
+            fn(lines)
+            self._carts[cart_id] = lines
+            self._touched[cart_id] = now
+            return {k: dict(v) for k, v in lines.items()}
+
+    def clear(self, cart_id: str):
+        with self._lock:
+            self._carts.pop(cart_id, None)
+            self._touched.pop(cart_id, None)
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            dead = [cid for cid, t in self._touched.items() if t < cutoff]
+            for cid in dead:
+                self._carts.pop(cid, None)
+                self._touched.pop(cid, None)
+            return len(dead)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._carts)
+
+
+class SQLiteCartStore:
+    backend = "sqlite"
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS carts (
+            cart_id    TEXT PRIMARY KEY,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_carts_updated ON carts (updated_at);
+        CREATE TABLE IF NOT EXISTS cart_lines (
+            cart_id    TEXT NOT NULL,
+            id_product TEXT NOT NULL,
+            data       TEXT NOT NULL,
+            PRIMARY KEY (cart_id, id_product)
+        );
+    """
+
+    def __init__(self, path: str = CART_DB_PATH, ttl: float = CART_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._conn().executescript(self._SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # satu koneksi per thread; WAL -> pembaca tidak menunggu penulis
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, conn, cart_id: str) -> dict:
+        row = conn.execute("SELECT updated_at FROM carts WHERE cart_id = ?", (cart_id,)).fetchone()
+        if row is None or time.time() - row[0] > self.ttl:
+            return {}
+        rows = conn.execute(
+            "SELECT id_product, data FROM cart_lines WHERE cart_id = ? ORDER BY rowid", (cart_id,)
+        ).fetchall()
+        return {k: json.loads(data) for k, data in rows}
+
+    def get(self, cart_id: str) -> dict:
+        return self._load(self._conn(), cart_id)
+
+    def update(self, cart_id: str, fn) -> dict:
+        """
+        Read-modify-write atomik lintas proses (BEGIN IMMEDIATE). Hanya item
+        yang berubah/terhapus yang ditulis ulang.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self._load(conn, cart_id)
+            if not before:
+                # keranjang kedaluwarsa: buang sisa item lama sebelum mulai baru
+                conn.execute("DELETE FROM cart_lines WHERE cart_id = ?", (cart_id,))
+            lines = {k: dict(v) for k, v in before.items()}
+            fn(lines)
+            gone = [(cart_id, k) for k in before if k not in lines]
+            if gone:
+                conn.executemany("DELETE FROM cart_lines WHERE cart_id = ? AND id_product = ?", gone)
+            changed = [(cart_id, k, json.dumps(v, default=str)) for k, v in lines.items() if before.get(k) != v]
+            if changed:
+                conn.executemany(
+                    """
+                    INSERT INTO cart_lines (cart_id, id_product, data) VALUES (?, ?, ?)
+                    ON CONFLICT(cart_id, id_product) DO UPDATE SET data = excluded.data
+                    """,
+                    changed,
+                )
+            conn.execute(
+                """
+                INSERT INTO carts (cart_id, updated_at) VALUES (?, ?)
+                ON CONFLICT(cart_id) DO UPDATE SET updated_at = excluded.updated_at
+                """,
+                (cart_id, time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return lines
+
+    def clear(self, cart_id: str):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cart_lines WHERE cart_id = ?", (cart_id,))
+            conn.execute("DELETE FROM carts WHERE cart_id = ?", (cart_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def evict_expired(self) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cutoff = time.time() - self.ttl
+            conn.execute(
+                "DELETE FROM cart_lines WHERE cart_id IN (SELECT cart_id FROM carts WHERE updated_at < ?)", (cutoff,)
+            )
+            cur = conn.execute("DELETE FROM carts WHERE updated_at < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount
+
+    def count(self) -> int:
+        return int(self._conn().execute("SELECT COUNT(*) FROM carts").fetchone()[0])
+
+
+def make_cart_store():
+    kind = (os.getenv("CART_STORE") or "sqlite").strip().lower()
+    if kind == "memory":
+        return MemoryCartStore()
+    if kind == "sqlite":
+        return SQLiteCartStore()
+    raise ValueError(f"CART_STORE tidak dikenal: {kind} (pakai 'sqlite' atau 'memory')")
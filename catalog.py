@@ -0,0 +1,114 @@
+# catalog.py
+# Katalog gabungan semua supplier dalam satu endpoint.
+# Semua supplier di-query BERSAMAAN (thread pool), masing-masing punya deadline.
+# Supplier yang lambat/mati tidak menahan yang lain: hasilnya tetap dikirim
+# (partial) dengan blok status per sumber.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import Blueprint, jsonify, request
+
+import supplier
+import supplier2
+
+catalog_bp = Blueprint("catalog", __name__)
+
+DEFAULT_DEADLINE = float(os.getenv("CATALOG_DEADLINE", "3"))
+
+# source (_source di _normalize_item) -> cache katalog + deadline (detik)
+SOURCES = {
+    "supplier":  {"cache": supplier.PRODUCTS_CACHE,  "deadline": DEFAULT_DEADLINE, "id_supplier": 1},
+    "supplier2": {"cache": supplier2.PRODUCTS_CACHE, "deadline": DEFAULT_DEADLINE, "id_supplier": 2},
+}
+
+# fetch yang lewat deadline tetap jalan sampai selesai di pool ini,
+# sehingga hasilnya masuk cache untuk request berikutnya
+_POOL = ThreadPoolExecutor(max_workers=max(4, 2 * len(SOURCES)), thread_name_prefix="catalog")
+
+
+SUPPLIER_SOURCES = {cfg["id_supplier"]: name for name, cfg in SOURCES.items()}
+
+_INDEX_LOCK = threading.Lock()
+_INDEX = {}  # source -> (versi cache, {str(id_product): item})
+
+
+def source_for_supplier(id_supplier) -> str:
+    try:
+        return SUPPLIER_SOURCES[int(id_supplier)]
+    except (KeyError, TypeError, ValueError):
+        raise KeyError(f"Supplier {id_supplier} tidak dikenal")
+
+
+def catalog_index(source: str):
+    """
+    Katalog satu sumber sebagai dict id_product -> item (lookup O(1)).
+    Dibangun ulang hanya kalau versi cache berubah. Return (index, cache_status).
+    """
+    cache = SOURCES[source]["cache"]
+    version = cache.version  # dibaca sebelum get(): paling buruk index dibangun sekali lagi
+    items, cache_status = cache.get()
+    with _INDEX_LOCK:
+        hit = _INDEX.get(source)
+        if hit is not None and hit[0] == version:
+            return hit[1], cache_status
+    index = {str(it.get("id_product")): it for it in items or []}
+    with _INDEX_LOCK:
+        _INDEX[source] = (version, index)
+    return index, cache_status
+
+
+def _load_source(name: str):
+    t0 = time.monotonic()
+    items, cache_status = SOURCES[name]["cache"].get()
+    return items, cache_status, time.monotonic() - t0
+
+
+@catalog_bp.get("/api/catalog")
+def unified_catalog():
+    """
+    Query params (opsional):
+      - source: filter satu/lebih sumber, dipisah koma (supplier,supplier2)
+      - deadline: override deadline per supplier (detik)
+    """
+    wanted = [s.strip() for s in (request.args.get("source") or "").split(",") if s.strip()]
+    names = [n for n in SOURCES if not wanted or n in wanted]
+    if not names:
+        return jsonify({"error": "source tidak dikenal", "available": list(SOURCES)}), 400
+
+    try:
+        override = float(request.args["deadline"]) if request.args.get("deadline") else None
+    except ValueError:
+        return jsonify({"error": "deadline harus angka"}), 400
+
+    start = time.monotonic()
+    futures = {n: _POOL.submit(_load_source, n) for n in names}
+
+    items, sources = [], {}
+    # tunggu sesuai deadline masing-masing; yang deadline-nya paling dekat duluan
+    for n in sorted(names, key=lambda x: override or SOURCES[x]["deadline"]):
+        deadline = override or SOURCES[n]["deadline"]
+        remaining = max(0.0, start + deadline - time.monotonic())
+        try:
+            rows, cache_status, elapsed = futures[n].result(timeout=remaining)
+            items.extend(rows or [])
+            sources[n] = {
+                "status": "ok",
+                "count": len(rows or []),
+                "cache": cache_status,
+                "elapsed_ms": round(elapsed * 1000, 1),
+            }
+        except FutureTimeout:
+            sources[n] = {"status": "timeout", "count": 0, "deadline_s": deadline}
+        except Exception as e:
+            sources[n] = {"status": "error", "count": 0, "detail": str(e)}
+
+    ok = [n for n, s in sources.items() if s["status"] == "ok"]
+    body = {
+        "items": items,
+        "sources": sources,
+        "partial": len(ok) < len(names),
+        "elapsed_ms": round((time.monotonic() - start) * 1000, 1),
+    }
+    return jsonify(body), (200 if ok else 502)
@@ -0,0 +1,142 @@
+# catalog_cache.py
+# Cache katalog supplier (stale-while-revalidate) dipakai bersama oleh
+# supplier.py & supplier2.py.
+#
+#  - umur < ttl          -> HIT, langsung dari memori
+#  - ttl <= umur < stale -> STALE, data lama dikirim + 1 refresh jalan di background
+#  - belum ada / terlalu basi -> MISS, fetch ke upstream; request yang datang
+#    bersamaan menunggu fetch yang sama (coalescing), bukan fetch sendiri-sendiri
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+DEFAULT_TTL = float(os.getenv("SUPPLIER_CACHE_TTL", "30"))
+DEFAULT_MAX_STALE = float(os.getenv("SUPPLIER_CACHE_MAX_STALE", "600"))
+
+HIT, STALE, MISS = "HIT", "STALE", "MISS"
+
+_REGISTRY = {}  # { name: CatalogCache }
+
+
+class CatalogCache:
+    def __init__(self, name: str, fetch, ttl: float = DEFAULT_TTL, max_stale: float = DEFAULT_MAX_STALE):
+        """
+        fetch     : callable tanpa argumen -> list item (boleh raise exception)
+        ttl       : detik data dianggap segar
+        max_stale : detik data lama masih boleh dikirim sambil refresh
+        """
+        self.name = name
+        self._fetch = fetch
+        self.ttl = float(ttl)
+        self.max_stale = max(float(max_stale), self.ttl)
+
+        self._lock = threading.Lock()
+        self._value = None
+        self._fetched_at = None     # time.monotonic() saat fetch sukses terakhir
+        self._inflight = None       # Future milik fetch yang sedang jalan
+        self._version = 0           # naik setiap fetch sukses
+
+        self._stats = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+            "refreshes": 0, "refresh_errors": 0,
+        }
+        self._last_error = None
+        _REGISTRY[name] = self
+
+    # ---------- util ----------
+    def _age(self, now=None):
+        if self._fetched_at is None:
+            return None
+        return (now or time.monotonic()) - self._fetched_at
+
+    def _run_fetch(self, fut: Future):
+        """Jalankan fetch & selesaikan future. Dipanggil tanpa memegang lock."""
+        try:
+            value = self._fetch()
+        except Exception as e:
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+                self._last_error = f"{type(e).__name__}: {e}"
+                self._inflight = None
+            fut.set_exception(e)
+            return
+        with self._lock:
+            self._value = value
+            self._fetched_at = time.monotonic()
+            self._version += 1
+            self._stats["refreshes"] += 1
+            self._last_error = None
+            self._inflight = None
+        fut.set_result(value)
+
+    def _start_background_refresh(self):
+        """Harus dipanggil sambil memegang lock."""
+        if self._inflight is not None:
+            return
+        fut = Future()
+        self._inflight = fut
+        t = threading.Thread(target=self._run_fetch, args=(fut,),
+                             name=f"catalog-refresh-{self.name}", daemon=True)
+        t.start()
+
+    # ---------- API ----------
+    def get(self):
+        """Return (items, status) dengan status HIT | STALE | MISS."""
+        now = time.monotonic()
+        with self._lock:
+            age = self._age(now)
+            if age is not None and age < self.ttl:
+                self._stats["hits"] += 1
+                return self._value, HIT
+            if age is not None and age < self.max_stale:
+                self._stats["stale_hits"] += 1
+                self._start_background_refresh()
+                return self._value, STALE
+
+            self._stats["misses"] += 1
+            fut = self._inflight
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight = fut
+            else:
+                self._stats["coalesced"] += 1
+            stale_value = self._value
+
+        if leader:
+            self._run_fetch(fut)
+        try:
+            return fut.result(), MISS
+        except Exception:
+            # upstream gagal tapi masih ada data lama -> lebih baik kirim yang lama
+            if stale_value is not None:
+                return stale_value, STALE
+            raise
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def stats(self) -> dict:
+        with self._lock:
+            age = self._age()
+            return {
+                "name": self.name,
+                "ttl": self.ttl,
+                "max_stale": self.max_stale,
+                "age": round(age, 3) if age is not None else None,
+                "items": len(self._value) if isinstance(self._value, list) else None,
+                "version": self._version,
+                "refreshing": self._inflight is not None,
+                "last_error": self._last_error,
+                **self._stats,
+            }
+
+
+def all_stats() -> dict:
+    return {name: c.stats() for name, c in _REGISTRY.items()}
@@ -0,0 +1,153 @@
+# db_routing.py
+# Pengaturan pool koneksi DB + routing endpoint read-only ke replica.
+#
+# Pool (berlaku untuk primary & semua replica):
+#   DB_POOL_SIZE=10  DB_MAX_OVERFLOW=20  DB_POOL_TIMEOUT=10
+#   DB_POOL_RECYCLE=1800 (detik, < wait_timeout MySQL)  DB_POOL_PRE_PING=1
+#
+# Replica:
+#   FLASK_DB_REPLICAS="mysql+pymysql://ro@10.0.0.2/retail_db,mysql+pymysql://ro@10.0.0.3/retail_db"
+#   -> bind "replica0", "replica1", ... di SQLALCHEMY_BINDS
+#
+# Endpoint yang diberi @read_only memakai replica (round-robin) untuk semua
+# db.session.execute di request itu; endpoint lain tetap ke primary. Replica
+# yang gagal konek ditandai down selama DB_REPLICA_RETRY detik dan request
+# diulang sekali ke primary (aman karena endpoint read-only). Tanpa
+# FLASK_DB_REPLICAS semuanya tetap ke primary seperti sebelumnya.
+#
+# Catatan: replica bisa tertinggal (replication lag) -> jangan pasang
+# @read_only di endpoint yang harus membaca tulisan barusan (mis. detail POS).
+import itertools
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.exc import OperationalError
+
+REPLICA_RETRY = float(os.getenv("DB_REPLICA_RETRY", "30"))
+
+
+def engine_options(uri: str) -> dict:
+    """Opsi create_engine dari env. SQLite (dev) tidak memakai QueuePool berukuran."""
+    opts = {
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") != "0",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+    if not uri.startswith("sqlite"):
+        opts.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        )
+    return opts
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.keys = []
+        self._rr = itertools.cycle([])
+        self._down_until = {}  # bind key -> epoch detik
+        self._served = {}      # bind key / "primary" -> jumlah request
+        self._fallbacks = 0
+
+    # ---------- hook ----------
+    def configure(self, app):
+        """Isi SQLALCHEMY_ENGINE_OPTIONS & SQLALCHEMY_BINDS. Panggil sebelum db.init_app."""
+        primary = app.config["SQLALCHEMY_DATABASE_URI"]
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(primary)
+
+        uris = [u.strip() for u in (os.getenv("FLASK_DB_REPLICAS") or "").split(",") if u.strip()]
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        keys = []
+        for i, uri in enumerate(uris):
+            key = f"replica{i}"
+            binds[key] = {"url": uri, **engine_options(uri)}
+            keys.append(key)
+        app.config["SQLALCHEMY_BINDS"] = binds
+        with self._lock:
+            self.keys = keys
+            self._rr = itertools.cycle(keys)
+            self._served = {k: 0 for k in ["primary", *keys]}
+
+    def pick(self):
+        """Replica sehat berikutnya (round-robin), atau None -> primary."""
+        with self._lock:
+            now = time.time()
+            for _ in range(len(self.keys)):
+                key = next(self._rr)
+                if self._down_until.get(key, 0) <= now:
+                    self._served[key] += 1
+                    return key
+            self._served["primary"] = self._served.get("primary", 0) + 1
+            return None
+
+    def mark_down(self, key: str):
+        with self._lock:
+            self._down_until[key] = time.time() + REPLICA_RETRY
+            self._fallbacks += 1
+        print(f"[db] replica {key} gagal, pakai primary selama {REPLICA_RETRY:.0f} detik")
+
+    def stats(self, engines: dict) -> dict:
+        def pool(engine):
+            p = engine.pool
+            out = {"class": type(p).__name__}
+            for name in ("size", "checkedin", "checkedout", "overflow"):
+                fn = getattr(p, name, None)
+                if callable(fn):
+                    out[name] = fn()
+            return out
+
+        with self._lock:
+            now = time.time()
+            return {
+                "primary": pool(engines[None]),
+                "replicas": {
+                    k: {
+                        **pool(engines[k]),
+                        "down_for": max(0.0, round(self._down_until.get(k, 0) - now, 1)),
+                    }
+                    for k in self.keys if k in engines
+                },
+                "served": dict(self._served),
+                "fallbacks": self._fallbacks,
+            }
+
+
+class RoutingSession(Session):
+    """Session Flask-SQLAlchemy yang mengarahkan query ke replica bila g._db_replica diset."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            key = g.get("_db_replica")
+            if key is not None:
+                engine = self._db.engines.get(key)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """Dekorator endpoint: query di dalamnya boleh dilayani replica."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        key = ROUTER.pick() if ROUTER.keys else None
+        if key is None:
+            return view(*args, **kwargs)
+        g._db_replica = key
+        try:
+            return view(*args, **kwargs)
+        except OperationalError:
+            # replica mati/tidak terjangkau/putus -> ulang sekali di primary
+            ROUTER.mark_down(key)
+            current_app.extensions["sqlalchemy"].session.rollback()
+            g._db_replica = None
+            return view(*args, **kwargs)
+    return wrapped
+
+
+# instance bersama (dikonfigurasi di create_app)
+ROUTER = ReplicaRouter()
@@ -0,0 +1,420 @@
+# draft_store.py
+# Penyimpanan draft order supplier (pengganti dict ORDER_DRAFTS di orders.py).
+#
+# Dua backend, dipilih lewat env DRAFT_STORE:
+#   - "sqlite" (default): file SQLite (WAL) yang dipakai bersama oleh semua worker
+#     gunicorn di host yang sama -> callback supplier di worker A langsung
+#     terlihat oleh polling UI di worker B, dan selamat dari restart
+#   - "memory": dict per proses (cukup untuk `python app.py` / dev)
+#
+# Keduanya punya index per supplier & id terbaru (latest() tidak scan semua
+# key), listing ber-cursor, dan TTL: draft yang sudah selesai (sudah ada
+# no_resi) dihapus setelah DRAFT_FINISHED_TTL detik oleh sweep background
+# (start_eviction, tiap DRAFT_EVICT_EVERY detik) -- bukan di jalur GET, supaya
+# polling UI tetap read-only.
+import atexit
+import bisect
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+DRAFT_FINISHED_TTL = float(os.getenv("DRAFT_FINISHED_TTL", str(7 * 24 * 3600)))
+DRAFT_EVICT_EVERY = float(os.getenv("DRAFT_EVICT_EVERY", "300"))
+DRAFT_DB_PATH = os.getenv("DRAFT_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "orders_drafts.db"))
+
+STATUSES = ("pending", "chosen", "finished")
+
+
+class DraftNotifier:
+    """
+    Sinyal "draft X berubah". Setiap write ke store memanggil publish(); stream
+    SSE menunggu di wait() sehingga update sampai ke browser tanpa polling.
+
+    attach(dir) (dipanggil backend sqlite) menyambungkan worker gunicorn di host
+    yang sama: tiap proses membuka socket datagram unix <dir>/<pid>.sock dan satu
+    thread pendengar; publish() mengirim id_order ke socket proses lain, yang
+    lalu membangunkan stream SSE-nya sendiri. Socket proses yang sudah mati
+    dihapus saat kirim gagal.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = {}  # id_order -> nomor urut publish
+        self._dir = None
+        self._sock = None
+        self._own = None
+        self._pid = None
+        self._attach_lock = threading.Lock()
+
+    # ---------- lintas proses ----------
+    def attach(self, directory: str):
+        if not hasattr(socket, "AF_UNIX"):
+            return  # Windows: tidak ada socket unix, cukup notifikasi dalam proses
+        with self._attach_lock:
+            if self._sock is not None and self._pid == os.getpid():
+                return
+            os.makedirs(directory, exist_ok=True)
+            own = os.path.join(directory, f"{os.getpid()}.sock")
+            if os.path.exists(own):
+                os.unlink(own)  # sisa proses lama dengan pid sama / fork
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(own)
+            self._dir, self._sock, self._own, self._pid = directory, sock, own, os.getpid()
+            threading.Thread(target=self._listen, args=(sock,), name="draft-notify", daemon=True).start()
+            atexit.register(self._detach, own)
+
+    @staticmethod
+    def _detach(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def _listen(self, sock):
+        while True:
+            try:
+                data = sock.recv(64)
+            except OSError:
+                return
+            try:
+                self._signal(int(data))
+            except ValueError:
+                pass
+
+    def _broadcast(self, oid: int):
+        if self._sock is None:
+            return
+        if self._pid != os.getpid():
+            self.attach(self._dir)  # di-fork setelah attach: buka socket sendiri
+        msg = str(oid).encode()
+        try:
+            names = os.listdir(self._dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self._dir, name)
+            if path == self._own or not name.endswith(".sock"):
+                continue
+            try:
+                self._sock.sendto(msg, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                self._detach(path)  # proses pemiliknya sudah mati
+            except OSError:
+                pass  # buffer penerima penuh: stream-nya tetap cek ulang berkala
+
+    # ---------- dalam proses ----------
+    def seq(self, oid: int) -> int:
+        with self._cond:
+            return self._seq.get(int(oid), 0)
+
+    def _signal(self, oid: int):
+        with self._cond:
+            self._seq[oid] = self._seq.get(oid, 0) + 1
+            self._cond.notify_all()
+
+    def publish(self, oid: int):
+        oid = int(oid)
+        self._signal(oid)
+        self._broadcast(oid)
+
+    def wait(self, oid: int, seen: int, timeout: float) -> int:
+        """Blok sampai ada publish baru untuk oid (seq != seen) atau timeout."""
+        oid = int(oid)
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq.get(oid, 0) != seen, timeout)
+            return self._seq.get(oid, 0)
+
+    def forget(self, oid: int):
+        with self._cond:
+            self._seq.pop(int(oid), None)
+
+
+# satu notifier per proses, dipakai semua backend
+NOTIFIER = DraftNotifier()
+
+
+def draft_status(d: dict) -> str:
+    """pending: menunggu pilihan distributor | chosen: distributor dipilih | finished: resi sudah ada."""
+    if d.get("no_resi"):
+        return "finished"
+    if d.get("chosen_distributor"):
+        return "chosen"
+    return "pending"
+
+
+def _supplier_of(d: dict):
+    try:
+        return int(d.get("id_supplier")) if d.get("id_supplier") is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class MemoryDraftStore:
+    backend = "memory"
+
+    def __init__(self, finished_ttl: float = DRAFT_FINISHED_TTL):
+        self.finished_ttl = finished_ttl
+        self._lock = threading.RLock()
+        self._drafts = {}        # id_order -> dict
+        self._updated = {}       # id_order -> epoch detik update terakhir
+        self._ids = []           # id_order terurut (latest & listing)
+        self._by_supplier = {}   # id_supplier -> set(id_order)
+        self._version = 0
+
+    # ---------- index ----------
+    def _index(self, oid: int, old: dict, new: dict):
+        if old is None:
+            bisect.insort(self._ids, oid)
+        old_sup = _supplier_of(old or {})
+        new_sup = _supplier_of(new)
+        if old_sup != new_sup:
+            if old_sup is not None:
+                self._by_supplier.get(old_sup, set()).discard(oid)
+            if new_sup is not None:
+                self._by_supplier.setdefault(new_sup, set()).add(oid)
+
+    def _drop(self, oid: int):
+        d = self._drafts.pop(oid, None)
+        self._updated.pop(oid, None)
+        if d is None:
+            return
+        i = bisect.bisect_left(self._ids, oid)
+        if i < len(self._ids) and self._ids[i] == oid:
+            self._ids.pop(i)
+        sup = _supplier_of(d)
+        if sup is not None:
+            self._by_supplier.get(sup, set()).discard(oid)
+
+    # ---------- API ----------
+    def get(self, oid: int):
+        with self._lock:
+            d = self._drafts.get(int(oid))
+            return dict(d) if d is not None else None
+
+    def update(self, oid: int, fn) -> dict:
+        """Read-modify-write atomik: fn(draft_dict) mengubah dict di tempat."""
+        oid = int(oid)
+        with self._lock:
+            old = self._drafts.get(oid)
+            d = dict(old) if old is not None else {}
+            fn(d)
+            self._index(oid, old, d)
+            self._drafts[oid] = d
+            self._updated[oid] = time.time()
+            self._version += 1
+        NOTIFIER.publish(oid)
+        return dict(d)
+
+    def put(self, oid: int, draft: dict) -> dict:
+        def replace(d):
+            d.clear()
+            d.update(draft)
+        return self.update(oid, replace)
+
+    def revision(self, oid: int):
+        """Penanda perubahan per draft (waktu update terakhir); None kalau tidak ada."""
+        with self._lock:
+            return self._updated.get(int(oid))
+
+    def latest(self):
+        with self._lock:
+            if not self._ids:
+                return None
+            oid = self._ids[-1]
+            return oid, dict(self._drafts[oid])
+
+    def list(self, supplier: int = None, status: str = None, limit: int = 50, before: int = None):
+        """Urut id_order DESC. Return (items, next_before)."""
+        with self._lock:
+            ids = self._ids if supplier is None else sorted(self._by_supplier.get(int(supplier), ()))
+            hi = len(ids) if before is None else bisect.bisect_left(ids, int(before))
+            out = []
+            i = hi - 1
+            while i >= 0 and len(out) <= limit:
+                d = self._drafts[ids[i]]
+                if status is None or draft_status(d) == status:
+                    out.append({"id_order": ids[i], **d})
+                i -= 1
+            has_more = len(out) > limit
+            out = out[:limit]
+            return out, (out[-1]["id_order"] if has_more else None)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._drafts)
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.finished_ttl
+        with self._lock:
+            dead = [oid for oid, d in self._drafts.items()
+                    if draft_status(d) == "finished" and self._updated.get(oid, 0) < cutoff]
+            for oid in dead:
+                self._drop(oid)
+                NOTIFIER.forget(oid)
+            if dead:
+                self._version += 1
+            return len(dead)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+
+class SQLiteDraftStore:
+    backend = "sqlite"
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS drafts (
+            id_order    INTEGER PRIMARY KEY,
+            id_supplier INTEGER,
+            status      TEXT NOT NULL,
+            updated_at  REAL NOT NULL,
+            data        TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_drafts_supplier ON drafts (id_supplier, id_order);
+        CREATE INDEX IF NOT EXISTS idx_drafts_status ON drafts (status, updated_at);
+        CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v INTEGER NOT NULL);
+        INSERT OR IGNORE INTO meta (k, v) VALUES ('version', 0);
+    """
+
+    def __init__(self, path: str = DRAFT_DB_PATH, finished_ttl: float = DRAFT_FINISHED_TTL):
+        self.path = path
+        self.finished_ttl = finished_ttl
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(self._SCHEMA)
+        NOTIFIER.attach(path + ".notify")
+
+    def _conn(self) -> sqlite3.Connection:
+        # satu koneksi per thread; WAL -> pembaca tidak menunggu penulis
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _load(row):
+        return json.loads(row[0]) if row else None
+
+    def _bump_version(self, conn):
+        conn.execute("UPDATE meta SET v = v + 1 WHERE k = 'version'")
+
+    # ---------- API ----------
+    def get(self, oid: int):
+        row = self._conn().execute("SELECT data FROM drafts WHERE id_order = ?", (int(oid),)).fetchone()
+        return self._load(row)
+
+    def update(self, oid: int, fn) -> dict:
+        """Read-modify-write atomik lintas proses (BEGIN IMMEDIATE)."""
+        oid = int(oid)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM drafts WHERE id_order = ?", (oid,)).fetchone()
+            d = self._load(row) or {}
+            fn(d)
+            conn.execute(
+                """
+                INSERT INTO drafts (id_order, id_supplier, status, updated_at, data)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(id_order) DO UPDATE SET
+                    id_supplier = excluded.id_supplier,
+                    status      = excluded.status,
+                    updated_at  = excluded.updated_at,
+                    data        = excluded.data
+                """,
+                (oid, _supplier_of(d), draft_status(d), time.time(), json.dumps(d, default=str)),
+            )
+            self._bump_version(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        NOTIFIER.publish(oid)
+        return d
+
+    def put(self, oid: int, draft: dict) -> dict:
+        def replace(d):
+            d.clear()
+            d.update(draft)
+        return self.update(oid, replace)
+
+    def revision(self, oid: int):
+        """Penanda perubahan per draft (updated_at); terlihat juga dari worker lain."""
+        row = self._conn().execute("SELECT updated_at FROM drafts WHERE id_order = ?", (int(oid),)).fetchone()
+        return row[0] if row else None
+
+    def latest(self):
+        row = self._conn().execute("SELECT id_order, data FROM drafts ORDER BY id_order DESC LIMIT 1").fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def list(self, supplier: int = None, status: str = None, limit: int = 50, before: int = None):
+        conds, params = [], []
+        if supplier is not None:
+            conds.append("id_supplier = ?")
+            params.append(int(supplier))
+        if status is not None:
+            conds.append("status = ?")
+            params.append(status)
+        if before is not None:
+            conds.append("id_order < ?")
+            params.append(int(before))
+        where = ("WHERE " + " AND ".join(conds)) if conds else ""
+        rows = self._conn().execute(
+            f"SELECT id_order, data FROM drafts {where} ORDER BY id_order DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+        has_more = len(rows) > limit
+        out = [{"id_order": oid, **json.loads(data)} for oid, data in rows[:limit]]
+        return out, (out[-1]["id_order"] if has_more else None)
+
+    def count(self) -> int:
+        return int(self._conn().execute("SELECT COUNT(*) FROM drafts").fetchone()[0])
+
+    def evict_expired(self) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "DELETE FROM drafts WHERE status = 'finished' AND updated_at < ?",
+                (time.time() - self.finished_ttl,),
+            )
+            if cur.rowcount:
+                self._bump_version(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount
+
+    @property
+    def version(self) -> int:
+        return int(self._conn().execute("SELECT v FROM meta WHERE k = 'version'").fetchone()[0])
+
+
+def start_eviction(store, every: float = DRAFT_EVICT_EVERY):
+    """Thread daemon yang menjalankan store.evict_expired() berkala; eviction menaikkan versi (ETag)."""
+    def run():
+        while True:
+            time.sleep(every)
+            try:
+                store.evict_expired()
+            except Exception as e:
+                print("[draft-store] evict gagal:", e)
+
+    threading.Thread(target=run, name="draft-evict", daemon=True).start()
+
+
+def make_draft_store():
+    kind = (os.getenv("DRAFT_STORE") or "sqlite").strip().lower()
+    if kind == "memory":
+        return MemoryDraftStore()
+    if kind == "sqlite":
+        return SQLiteDraftStore()
+    raise ValueError(f"DRAFT_STORE tidak dikenal: {kind} (pakai 'sqlite' atau 'memory')")
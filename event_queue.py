@@ -0,0 +1,440 @@
+# event_queue.py
+# Antrian durable untuk webhook distributor (mode DISTRIBUTOR_EVENTS_MODE=async).
+#
+#   POST /api/distributor-events
+#     -> event ditulis ke events.log (JSONL {"ts", "event"}, append-only)
+#     -> fsync per BATCH (group commit): semua request yang menunggu dalam
+#        jendela EVENT_FSYNC_MS dibayar satu fsync
+#     -> balas 202 begitu baris sudah durable di disk
+#   worker pool (DISTRIBUTOR_EVENT_WORKERS thread) menerapkan event ke DB lewat
+#   _apply_distributor_event; event di-shard berdasarkan hash(no_resi) sehingga
+#   event untuk resi yang sama selalu diterapkan berurutan oleh thread yang sama.
+#
+# Satu log untuk semua worker gunicorn:
+#   - setiap proses menulis ke events.log di bawah flock pendek per batch
+#     (baris dari proses mana pun tidak pernah saling menyela)
+#   - hanya SATU proses, pemegang flock events.log.owner, yang menerapkan event.
+#     Pemilik membaca baris yang ditulis proses lain (tail tiap EVENT_TAIL_MS)
+#     dan men-dispatch semuanya sesuai urutan di log. Proses lain tidak pernah
+#     menerapkan event sendiri; kalau pemilik mati, proses lain mengambil alih
+#     lock dan melanjutkan dari checkpoint.
+#
+# Checkpoint (events.log.offset) = offset byte terkecil yang BELUM selesai.
+# Saat start, baris setelah checkpoint dibaca ulang & diterapkan lagi; aman
+# karena apply idempotent (dedupe event_id di tabel distributor_event).
+#
+# Event yang tetap gagal setelah EVENT_APPLY_RETRIES percobaan dipindah ke
+# dead-letter (events.log.dead, fsync dulu baru checkpoint boleh lewat) dan
+# resinya DIBLOKIR: event berikutnya untuk resi yang sama ikut diparkir di
+# belakangnya supaya urutan tidak terbalik. Dead-letter dicoba ulang tiap
+# EVENT_DEAD_RETRY detik (urut per resi, berhenti di kegagalan pertama); resi
+# terbuka lagi begitu semua event parkirnya berhasil.
+import atexit
+import collections
+import contextlib
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: tidak ada flock, asumsikan satu proses
+    fcntl = None
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+EVENTS_LOG_PATH = os.getenv("DISTRIBUTOR_EVENTS_LOG", os.path.join(_HERE, "events.log"))
+EVENT_WORKERS = int(os.getenv("DISTRIBUTOR_EVENT_WORKERS", "4"))
+EVENT_FSYNC_MS = float(os.getenv("EVENT_FSYNC_MS", "5"))
+EVENT_TAIL_MS = float(os.getenv("EVENT_TAIL_MS", "20"))
+EVENT_APPLY_RETRIES = int(os.getenv("EVENT_APPLY_RETRIES", "5"))
+EVENT_DEAD_RETRY = float(os.getenv("EVENT_DEAD_RETRY", "30"))
+CHECKPOINT_SECONDS = float(os.getenv("EVENT_CHECKPOINT_SECONDS", "1"))
+
+
+def _no_resi(evt: dict) -> str:
+    return str(((evt.get("data") or {}).get("no_resi")) or "")
+
+
+class QueueUnavailable(RuntimeError):
+    """events.log tidak bisa dibuka -> pemanggil menolak event (503), bukan apply sendiri."""
+
+
+class DurableEventQueue:
+    def __init__(self, path: str = EVENTS_LOG_PATH, workers: int = EVENT_WORKERS,
+                 fsync_ms: float = EVENT_FSYNC_MS, retries: int = EVENT_APPLY_RETRIES):
+        self.path = path
+        self.checkpoint_path = path + ".offset"
+        self.owner_path = path + ".owner"
+        self.dead_path = path + ".dead"
+        self.workers = max(1, workers)
+        self.fsync_ms = fsync_ms
+        self.retries = retries
+        self._app = None
+        self._apply = None
+        self._lock = threading.Lock()
+        self._started = False
+        self._unavailable = None
+        self._owner_fh = None              # flock events.log.owner (hanya di proses pemilik)
+        self._own_checked = 0.0
+
+        self._pending = []                 # [(line_bytes, evt, ts, done_event)] menunggu fsync
+        self._pending_cv = threading.Condition(threading.Lock())
+        self._write_lock = threading.Lock()   # flusher vs flush terakhir saat exit
+        self._shards = []                  # queue.Queue per worker
+        self._inflight = {}                # offset awal baris -> ts terima (belum diterapkan)
+        self._inflight_lock = threading.Lock()
+        self._fh = None
+        self._end = 0                      # pemilik: offset akhir log yang sudah di-dispatch
+        self._checkpoint = 0
+        self._checkpoint_at = 0.0
+
+        self._dead_lock = threading.Lock()
+        self._blocked = collections.Counter()  # no_resi -> jumlah event di dead-letter
+
+        self.appended = self.applied = self.duplicates = self.failed = self.recovered = 0
+        self.foreign = self.parked = self.revived = 0
+        self.fsync_batches = 0
+        self._last_lag_ms = None
+        self._max_lag_ms = 0.0
+
+    def init_app(self, app, apply_fn):
+        """apply_fn(evt) -> dict: dipanggil di dalam app context oleh worker."""
+        self._app = app
+        self._apply = apply_fn
+
+    @property
+    def owner(self) -> bool:
+        return self._owner_fh is not None
+
+    # ---------- start / kepemilikan ----------
+    def _read_checkpoint(self, size: int) -> int:
+        try:
+            with open(self.checkpoint_path) as f:
+                return min(int(f.read().strip() or 0), size)
+        except FileNotFoundError:
+            # belum pernah jalan: isi log lama dianggap sudah diterapkan (mode sync)
+            return size
+
+    def _write_checkpoint(self, offset: int):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(offset))
+        os.replace(tmp, self.checkpoint_path)
+        self._checkpoint = offset
+        self._checkpoint_at = time.monotonic()
+
+    def start(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            if self._unavailable:
+                raise QueueUnavailable(self._unavailable)
+            try:
+                self._fh = open(self.path, "a+b")
+            except OSError as e:
+                self._unavailable = f"events.log tidak bisa dibuka: {e}"
+                raise QueueUnavailable(self._unavailable)
+            self._try_own()
+            threading.Thread(target=self._flusher, name="event-log-flush", daemon=True).start()
+            atexit.register(self._flush_pending)
+            self._started = True
+
+    def _try_own(self) -> bool:
+        """Ambil flock pemilik kalau bebas; pemilik menjalankan worker apply & recovery."""
+        if self._owner_fh is not None:
+            return True
+        self._own_checked = time.monotonic()
+        fh = open(self.owner_path, "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fh.close()
+                return False
+        with self._write_lock, self._appending():
+            size = self._seal()
+            start_at = self._read_checkpoint(size)
+            self._write_checkpoint(start_at)
+            self._load_dead()
+            self._shards = [queue.Queue() for _ in range(self.workers)]
+            for i, q in enumerate(self._shards):
+                threading.Thread(target=self._worker, args=(q,), name=f"event-apply-{i}", daemon=True).start()
+            # baris setelah checkpoint (belum sempat diterapkan sebelum restart / pemilik lama mati)
+            self._end = start_at
+            self.recovered += self._ingest(size)
+            self._owner_fh = fh  # dipegang seumur proses; lepas otomatis saat proses mati
+        threading.Thread(target=self._dead_retrier, name="event-dead-retry", daemon=True).start()
+        return True
+
+    @contextlib.contextmanager
+    def _appending(self):
+        """flock eksklusif events.log: satu penulis (dari proses mana pun) per saat."""
+        if fcntl is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+
+    def _seal(self) -> int:
+        """Ukuran log; baris terpotong di ujung (proses mati saat menulis) ditutup dulu dengan newline."""
+        fd = self._fh.fileno()
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            os.write(fd, b"\n")
+            size += 1
+        return size
+
+    def _ingest(self, size: int) -> int:
+        """Pemilik: dispatch baris antara _end dan size (ditulis proses lain / sebelum restart)."""
+        n = 0
+        with open(self.path, "rb") as f:
+            f.seek(self._end)
+            pos = self._end
+            for line in f:
+                if pos + len(line) > size:
+                    break
+                start, pos = pos, pos + len(line)
+                try:
+                    evt = json.loads(line)["event"]
+                except (ValueError, KeyError, TypeError):
+                    continue  # baris rusak/terpotong
+                self._dispatch(start, evt, time.time())
+                n += 1
+        self._end = pos
+        return n
+
+    # ---------- tulis (group commit) ----------
+    def append(self, evt: dict, timeout: float = 5.0) -> bool:
+        """Tulis event ke log; return True setelah baris ter-fsync (durable)."""
+        self.start()
+        line = json.dumps({"ts": datetime.utcnow().isoformat(), "event": evt},
+                          ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+        done = threading.Event()
+        with self._pending_cv:
+            self._pending.append((line, evt, time.time(), done))
+            self._pending_cv.notify()
+        return done.wait(timeout)
+
+    def _flush_pending(self):
+        with self._write_lock:
+            with self._pending_cv:
+                batch, self._pending = self._pending, []
+            owner = self._owner_fh is not None
+            if not batch and (not owner or os.fstat(self._fh.fileno()).st_size <= self._end):
+                return
+            offsets = []
+            with self._appending():
+                size = self._seal()
+                if owner and size > self._end:
+                    self.foreign += self._ingest(size)
+                if not batch:
+                    return
+                pos = size
+                for line, evt, ts, done in batch:
+                    offsets.append(pos)
+                    self._fh.write(line)
+                    pos += len(line)
+                self._fh.flush()
+                os.fsync(self._fh.fileno())
+                if owner:
+                    self._end = pos
+            self.fsync_batches += 1
+            self.appended += len(batch)
+            for (line, evt, ts, done), off in zip(batch, offsets):
+                if owner:
+                    self._dispatch(off, evt, ts)
+                done.set()
+
+    def _flusher(self):
+        while True:
+            owner = self._owner_fh is not None
+            with self._pending_cv:
+                if not self._pending:
+                    # pemilik juga bangun tiap EVENT_TAIL_MS untuk membaca baris proses lain
+                    self._pending_cv.wait(EVENT_TAIL_MS / 1000.0 if owner else CHECKPOINT_SECONDS)
+                has_pending = bool(self._pending)
+            if has_pending:
+                # beri jendela kecil supaya request yang datang bersamaan ikut satu fsync
+                time.sleep(self.fsync_ms / 1000.0)
+            try:
+                self._flush_pending()
+            except Exception as e:
+                print("[event-queue] gagal menulis log:", e)
+            if not owner:
+                if time.monotonic() - self._own_checked >= CHECKPOINT_SECONDS:
+                    try:
+                        self._try_own()
+                    except Exception as e:
+                        print("[event-queue] gagal mengambil alih log:", e)
+            elif time.monotonic() - self._checkpoint_at >= CHECKPOINT_SECONDS:
+                self._advance_checkpoint()
+
+    # ---------- apply ----------
+    def _dispatch(self, offset: int, evt: dict, ts: float):
+        with self._inflight_lock:
+            self._inflight[offset] = ts
+        shard = zlib.crc32(_no_resi(evt).encode("utf-8")) % len(self._shards)
+        self._shards[shard].put((offset, evt, ts))
+
+    def _worker(self, q: queue.Queue):
+        while True:
+            offset, evt, ts = q.get()
+            resi = _no_resi(evt)
+            result = None
+            with self._dead_lock:
+                blocked = resi in self._blocked
+                if blocked:
+                    # ada event lebih lama untuk resi ini di dead-letter: antre di belakangnya
+                    self._park(evt)
+                    self.parked += 1
+            if not blocked:
+                for attempt in range(self.retries):
+                    try:
+                        with self._app.app_context():
+                            result = self._apply(evt)
+                        break
+                    except Exception as e:
+                        # DB sedang bermasalah: tahan shard ini (urutan per resi tetap terjaga)
+                        print(f"[event-queue] apply {evt.get('id')} gagal (percobaan {attempt + 1}):", e)
+                        time.sleep(min(0.2 * 2 ** attempt, 5.0))
+                if result is None:
+                    with self._dead_lock:
+                        self._park(evt)
+                    self.failed += 1
+                elif result.get("status") == "duplicate":
+                    self.duplicates += 1
+                else:
+                    self.applied += 1
+            lag = (time.time() - ts) * 1000
+            self._last_lag_ms = round(lag, 1)
+            self._max_lag_ms = max(self._max_lag_ms, lag)
+            # offset baru dilepas setelah event diterapkan ATAU durable di dead-letter
+            with self._inflight_lock:
+                self._inflight.pop(offset, None)
+            q.task_done()
+
+    def _advance_checkpoint(self):
+        with self._inflight_lock:
+            low = min(self._inflight) if self._inflight else self._end
+        if low != self._checkpoint:
+            self._write_checkpoint(low)
+
+    # ---------- dead-letter ----------
+    def _park(self, evt: dict):
+        """Harus dipanggil sambil memegang _dead_lock."""
+        line = json.dumps({"ts": datetime.utcnow().isoformat(), "event": evt},
+                          ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+        with open(self.dead_path, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._blocked[_no_resi(evt)] += 1
+
+    def _read_dead(self) -> list:
+        try:
+            with open(self.dead_path, "rb") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        out = []
+        for line in lines:
+            try:
+                out.append(json.loads(line)["event"])
+            except (ValueError, KeyError, TypeError):
+                continue
+        return out
+
+    def _load_dead(self):
+        with self._dead_lock:
+            self._blocked = collections.Counter(_no_resi(evt) for evt in self._read_dead())
+
+    def retry_dead(self) -> int:
+        """Coba ulang dead-letter (urut per resi, berhenti di kegagalan pertama). Return jumlah yang berhasil."""
+        with self._dead_lock:
+            events = self._read_dead()
+            if not events:
+                return 0
+            keep, stuck, ok = [], set(), 0
+            for evt in events:
+                resi = _no_resi(evt)
+                if resi not in stuck:
+                    try:
+                        with self._app.app_context():
+                            self._apply(evt)
+                        ok += 1
+                        continue
+                    except Exception as e:
+                        print(f"[event-queue] dead-letter {evt.get('id')} masih gagal:", e)
+                        stuck.add(resi)
+                keep.append(evt)
+            if keep:
+                tmp = self.dead_path + ".tmp"
+                with open(tmp, "wb") as f:
+                    for evt in keep:
+                        f.write(json.dumps({"ts": datetime.utcnow().isoformat(), "event": evt},
+                                           ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.dead_path)
+            else:
+                os.remove(self.dead_path)
+            self._blocked = collections.Counter(_no_resi(evt) for evt in keep)
+            self.revived += ok
+            return ok
+
+    def _dead_retrier(self):
+        while True:
+            time.sleep(EVENT_DEAD_RETRY)
+            if not self._blocked:
+                continue
+            try:
+                self.retry_dead()
+            except Exception as e:
+                print("[event-queue] retry dead-letter gagal:", e)
+
+    # ---------- metrics ----------
+    def stats(self) -> dict:
+        now = time.time()
+        with self._inflight_lock:
+            depth = len(self._inflight)
+            oldest = min(self._inflight.values()) if self._inflight else None
+        with self._dead_lock:
+            dead = sum(self._blocked.values())
+            blocked = sorted(self._blocked)[:50]
+        return {
+            "mode": "async",
+            "started": self._started,
+            "owner": self.owner,
+            "unavailable": self._unavailable,
+            "workers": self.workers,
+            "depth": depth,
+            "shard_depth": [q.qsize() for q in self._shards],
+            "oldest_pending_ms": round((now - oldest) * 1000, 1) if oldest else 0.0,
+            "apply_lag_ms": {"last": self._last_lag_ms, "max": round(self._max_lag_ms, 1)},
+            "appended": self.appended,
+            "applied": self.applied,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "parked": self.parked,
+            "revived": self.revived,
+            "dead_letter": dead,
+            "blocked_resi": blocked,
+            "recovered": self.recovered,
+            "foreign": self.foreign,
+            "fsync_batches": self.fsync_batches,
+            "log_bytes": self._end if self.owner else None,
+            "checkpoint": self._checkpoint if self.owner else None,
+        }
+
+
+# instance bersama untuk get_product.py
+EVENT_QUEUE = DurableEventQueue()
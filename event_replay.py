@@ -0,0 +1,369 @@
+# event_replay.py
+# Replay & kompaksi events.log (webhook distributor, lihat event_queue.py).
+#
+#   python event_replay.py fold    [--since TS] [--until TS]      # ringkasan state dari log
+#   python event_replay.py verify  [--since TS] [--until TS]      # bandingkan dengan tabel resi
+#   python event_replay.py apply   [--until TS]                   # bangun ulang tabel resi dari log
+#   python event_replay.py apply   --with-stock --snapshot events.snapshot.json
+#   python event_replay.py compact [--until TS] --out-log events.compact.log --snapshot events.snapshot.json
+#
+# Log dibaca baris per baris (memori sebanding jumlah resi, bukan panjang log).
+# Filter --since/--until dicek langsung dari potongan string "ts" sebelum JSON
+# di-parse, jadi baris di luar jendela hampir gratis. Pakai orjson kalau
+# terpasang.
+#
+# Offset: --until berhenti di baris pertama dengan ts >= until (log urut
+# waktu tulis) dan offset tidak melewati baris itu, jadi snapshot dari
+# `compact --until X` melanjutkan tepat dari X. --since membuang event lama
+# sehingga state-nya tidak lengkap: ditolak untuk apply/compact/--snapshot.
+# verify dengan jendela waktu tetap fold seluruh log (status akhir resi bisa
+# berubah setelah jendela), tapi hanya membandingkan resi yang punya event di
+# dalam jendela.
+#
+# Kompaksi menghasilkan:
+#   - snapshot  : state akhir per resi + total stok dari DELIVERED + offset log
+#                 + stok yang SUDAH ditambahkan ke tabel barang (stock_applied)
+#   - log ringkas: satu event per resi (event terakhir, item digabung)
+# Pemulihan: `apply --snapshot events.snapshot.json` memuat snapshot lalu hanya
+# me-replay bagian log setelah offset snapshot. Dengan --with-stock hanya
+# selisih stock_added - stock_applied yang ditambahkan, lalu snapshot ditulis
+# ulang -> menjalankan apply dua kali tidak menambah stok dua kali.
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = lambda obj: orjson.dumps(obj)  # noqa: E731
+except ImportError:
+    _loads = json.loads
+    _dumps = lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")  # noqa: E731
+
+from event_queue import EVENTS_LOG_PATH
+
+_TS_PREFIX = b'{"ts": "'
+APPLY_BATCH = 500
+# redelivery datang berdekatan -> cukup ingat N event_id terakhir (memori tetap)
+DEDUPE_WINDOW = int(os.getenv("EVENT_REPLAY_DEDUPE_WINDOW", "100000"))
+
+
+# =========================
+# Fold: state akhir dari stream event
+# =========================
+class ResiState:
+    """
+    State hasil replay. Aturan sama dengan _apply_distributor_event:
+      - status resi = status_now event terakhir
+      - item digabung per id_barang (event terakhir menang)
+      - stok bertambah SEKALI per (resi, id_barang) saat transisi ke DELIVERED
+    """
+
+    def __init__(self):
+        self.resi = {}          # no_resi -> {status, supplier, distributor, ts, event, items{id: {nama_barang, qty, status}}}
+        self.stock_added = {}   # id_barang -> qty
+        self.stock_applied = {} # id_barang -> qty yang sudah ditambahkan ke tabel barang (apply --with-stock)
+        self.seen_ids = collections.OrderedDict()  # event_id terakhir (maks DEDUPE_WINDOW)
+        self.events = self.duplicates = self.ignored = 0
+        self.offset = 0         # offset byte log yang sudah di-fold
+        self.window = None      # (since, until): catat resi yang punya event di jendela ini (verify)
+        self.touched = set()
+
+    def feed(self, ts: str, evt: dict):
+        event_id = evt.get("id")
+        if event_id:
+            if event_id in self.seen_ids:
+                self.duplicates += 1
+                return
+            self.seen_ids[event_id] = None
+            if len(self.seen_ids) > DEDUPE_WINDOW:
+                self.seen_ids.popitem(last=False)
+        data = evt.get("data") or {}
+        no_resi = (data.get("no_resi") or "").strip()
+        if not no_resi:
+            self.ignored += 1
+            return
+        self.events += 1
+        if self.window is not None and _in_window(ts, *self.window):
+            self.touched.add(no_resi)
+        status_now = (data.get("status_now") or "").upper().strip()
+        order = data.get("order") or {}
+        st = self.resi.get(no_resi)
+        if st is None:
+            st = self.resi[no_resi] = {"items": {}}
+        st["status"] = status_now
+        st["supplier"] = order.get("supplier") or st.get("supplier") or ""
+        st["distributor"] = order.get("distributor") or st.get("distributor") or ""
+        st["ts"] = ts
+        st["event"] = evt
+
+        # hanya item yang ada di event ini yang berubah (sama seperti UPSERT per event)
+        for it in data.get("items") or []:
+            b = it["id_barang"]
+            row = st["items"].get(b)
+            prev = row["status"] if row else None
+            st["items"][b] = {"nama_barang": it["nama_barang"], "qty": int(it["kuantitas"]), "status": status_now}
+            if status_now == "DELIVERED" and prev != "DELIVERED":
+                self.stock_added[b] = self.stock_added.get(b, 0) + int(it["kuantitas"])
+
+    # ---------- snapshot ----------
+    def to_snapshot(self, log_path: str) -> dict:
+        return {
+            "log": os.path.abspath(log_path),
+            "offset": self.offset,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "resi": {k: {kk: vv for kk, vv in v.items() if kk != "event"} for k, v in self.resi.items()},
+            "stock_added": self.stock_added,
+            "stock_applied": self.stock_applied,
+            "event_ids": list(self.seen_ids),
+        }
+
+    @classmethod
+    def from_snapshot(cls, snap: dict) -> "ResiState":
+        st = cls()
+        st.resi = {k: dict(v, items=dict(v.get("items") or {})) for k, v in snap["resi"].items()}
+        st.stock_added = dict(snap.get("stock_added") or {})
+        st.stock_applied = dict(snap.get("stock_applied") or {})
+        st.seen_ids = collections.OrderedDict.fromkeys(snap.get("event_ids") or ())
+        st.offset = int(snap.get("offset") or 0)
+        return st
+
+
+def _in_window(ts: str, since: str = None, until: str = None) -> bool:
+    return not ((since and ts < since) or (until and ts >= until))
+
+
+def iter_log(path: str, offset: int = 0, since: str = None, until: str = None, state: ResiState = None):
+    """
+    Yield (ts, event) dari log mulai offset. Baris sebelum since dilewati tanpa
+    parse JSON; berhenti di baris pertama dengan ts >= until. Kalau state
+    diberikan, state.offset = akhir baris terakhir yang sudah dikonsumsi
+    (baris >= until dan baris yang belum selesai ditulis tidak termasuk).
+    """
+    lo = since.encode() if since else None
+    hi = until.encode() if until else None
+    n = len(_TS_PREFIX)
+    with open(path, "rb", buffering=1 << 20) as f:
+        f.seek(offset)
+        pos = offset
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # baris terakhir belum selesai ditulis
+            fast = line.startswith(_TS_PREFIX)
+            evt = None
+            if fast:
+                ts = line[n:line.index(b'"', n)]
+                if hi is not None and ts >= hi:
+                    return
+                skip = lo is not None and ts < lo
+            else:
+                # format lain (mis. log ringkas hasil compact): cek jendela setelah parse
+                try:
+                    rec = _loads(line)
+                    evt = rec["event"]
+                except (ValueError, KeyError, TypeError):
+                    rec = None
+                ts = (rec.get("ts") or "") if isinstance(rec, dict) else ""
+                if until and rec is not None and ts >= until:
+                    return
+                skip = rec is None or bool(since and ts < since)
+            if not skip and evt is None:
+                try:
+                    rec = _loads(line)
+                    evt = rec["event"]
+                    ts = rec.get("ts") or ""
+                except (ValueError, KeyError, TypeError):
+                    skip = True
+            pos += len(line)
+            if not skip:
+                yield ts, evt
+            if state is not None:
+                state.offset = pos
+
+
+def fold(path: str, state: ResiState = None, since: str = None, until: str = None) -> ResiState:
+    state = state or ResiState()
+    for ts, evt in iter_log(path, state.offset, since, until, state):
+        state.feed(ts, evt)
+    return state
+
+
+# =========================
+# DB: verify / apply (butuh app context)
+# =========================
+def _app_context():
+    from app import create_app
+    return create_app().app_context()
+
+
+def verify(state: ResiState, only: set = None) -> int:
+    """Bandingkan state dengan tabel resi; only: batasi ke resi ini (verify dengan jendela waktu)."""
+    from sqlalchemy import bindparam, text
+    from app import db
+
+    mismatches = 0
+    with _app_context():
+        if only is None:
+            rows = db.session.execute(text("SELECT no_resi, id_barang, status, quantity FROM resi")).all()
+        else:
+            rows, ids = [], sorted(only)
+            q = text("SELECT no_resi, id_barang, status, quantity FROM resi WHERE no_resi IN :ids") \
+                .bindparams(bindparam("ids", expanding=True))
+            for start in range(0, len(ids), APPLY_BATCH):
+                rows += db.session.execute(q, {"ids": ids[start:start + APPLY_BATCH]}).all()
+        in_db = {(r[0], r[1]): (r[2], int(r[3] or 0)) for r in rows}
+        for no_resi, st in state.resi.items():
+            if only is not None and no_resi not in only:
+                continue
+            for b, it in st["items"].items():
+                got = in_db.pop((no_resi, b), None)
+                want = (it["status"], it["qty"])
+                if got != want:
+                    mismatches += 1
+                    print(f"  MISMATCH {no_resi} {b}: db={got} log={want}")
+    if in_db:
+        print(f"  {len(in_db)} baris resi di DB tidak ada di log (mis. dibuat manual / log sudah dirotasi)")
+    return mismatches
+
+
+def apply(state: ResiState, with_stock: bool = False):
+    """UPSERT semua baris resi hasil fold (multi-row per APPLY_BATCH); opsional tambah stok DELIVERED."""
+    from sqlalchemy import text
+    from app import db
+
+    rows = [
+        (no_resi, b, it, st)
+        for no_resi, st in state.resi.items()
+        for b, it in st["items"].items()
+    ]
+    with _app_context():
+        for start in range(0, len(rows), APPLY_BATCH):
+            values, params = [], {}
+            for i, (no_resi, b, it, st) in enumerate(rows[start:start + APPLY_BATCH]):
+                values.append(f"(:r{i}, :b{i}, :n{i}, :q{i}, :s{i}, :d{i}, :st{i}, :t{i})")
+                params.update({
+                    f"r{i}": no_resi, f"b{i}": b, f"n{i}": it["nama_barang"], f"q{i}": it["qty"],
+                    f"s{i}": st.get("supplier", ""), f"d{i}": st.get("distributor", ""),
+                    f"st{i}": it["status"], f"t{i}": (st.get("ts") or "").replace("T", " ")[:19] or None,
+                })
+            db.session.execute(text(f"""
+                INSERT INTO resi (
+                    no_resi, id_barang, nama_barang, quantity, nama_supplier, nama_distributor, status, tanggal
+                ) VALUES {", ".join(values)}
+                ON DUPLICATE KEY UPDATE
+                    nama_barang      = VALUES(nama_barang),
+                    quantity         = VALUES(quantity),
+                    nama_supplier    = VALUES(nama_supplier),
+                    nama_distributor = VALUES(nama_distributor),
+                    status           = VALUES(status),
+                    tanggal          = VALUES(tanggal)
+            """), params)
+        if with_stock:
+            # hanya selisih yang belum pernah ditambahkan (stock_applied dari snapshot)
+            for b, qty in state.stock_added.items():
+                todo = qty - state.stock_applied.get(b, 0)
+                if todo:
+                    db.session.execute(text("""
+                        UPDATE barang SET quantity = quantity + :q, updated_at = NOW() WHERE id_barang = :b
+                    """), {"q": todo, "b": b})
+        db.session.commit()
+    if with_stock:
+        state.stock_applied = dict(state.stock_added)
+    return len(rows)
+
+
+# =========================
+# Kompaksi
+# =========================
+def compact(state: ResiState, log_path: str, out_log: str, snapshot_path: str):
+    """Tulis snapshot + log ringkas (satu event per resi, urut ts) secara atomik."""
+    tmp = out_log + ".tmp"
+    with open(tmp, "wb") as f:
+        for no_resi, st in sorted(state.resi.items(), key=lambda kv: kv[1].get("ts") or ""):
+            evt = dict(st["event"])
+            data = dict(evt.get("data") or {})
+            data["items"] = [
+                {"id_barang": b, "nama_barang": it["nama_barang"], "kuantitas": it["qty"]}
+                for b, it in st["items"].items()
+            ]
+            evt["data"] = data
+            f.write(_dumps({"ts": st.get("ts"), "event": evt}) + b"\n")
+    os.replace(tmp, out_log)
+    write_snapshot(state, log_path, snapshot_path)
+
+
+def write_snapshot(state: ResiState, log_path: str, snapshot_path: str):
+    tmp = snapshot_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_dumps(state.to_snapshot(log_path)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, snapshot_path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay / verifikasi / kompaksi events.log distributor")
+    ap.add_argument("mode", choices=("fold", "verify", "apply", "compact"))
+    ap.add_argument("--log", default=EVENTS_LOG_PATH)
+    ap.add_argument("--since", help="ts awal (ISO, inklusif), mis. 2025-10-05T12:00")
+    ap.add_argument("--until", help="ts akhir (ISO, eksklusif)")
+    ap.add_argument("--snapshot", help="mulai dari snapshot ini (mode compact: file snapshot keluaran)")
+    ap.add_argument("--out-log", default=None, help="log ringkas keluaran (mode compact)")
+    ap.add_argument("--with-stock", action="store_true", help="apply: tambahkan juga stok dari DELIVERED")
+    args = ap.parse_args()
+
+    if args.since and (args.mode in ("apply", "compact") or args.snapshot):
+        # state tanpa event sebelum --since tidak boleh jadi snapshot / ditulis ke DB
+        ap.error("--since hanya untuk fold/verify tanpa --snapshot")
+    if args.with_stock and not args.snapshot:
+        ap.error("apply --with-stock butuh --snapshot (mencatat stok yang sudah ditambahkan)")
+
+    state = None
+    if args.snapshot and args.mode != "compact" and os.path.exists(args.snapshot):
+        with open(args.snapshot, "rb") as f:
+            state = ResiState.from_snapshot(_loads(f.read()))
+        if state.offset > os.path.getsize(args.log):
+            sys.exit(f"offset snapshot ({state.offset}) melewati ukuran {args.log}; log sudah dirotasi?")
+        print(f"snapshot: {len(state.resi)} resi, lanjut dari offset {state.offset}")
+
+    t0 = time.perf_counter()
+    if args.mode == "verify" and (args.since or args.until):
+        # status akhir di DB = seluruh log; jendela hanya memilih resi yang dicek
+        state = state or ResiState()
+        state.window = (args.since, args.until)
+        state = fold(args.log, state)
+    else:
+        state = fold(args.log, state, args.since, args.until)
+    dt = time.perf_counter() - t0
+    rate = state.events / dt if dt > 0 else 0.0
+    print(f"events   : {state.events} (duplikat {state.duplicates}, tanpa resi {state.ignored})")
+    print(f"resi     : {len(state.resi)}")
+    print(f"stok     : {sum(state.stock_added.values())} unit dari DELIVERED ({len(state.stock_added)} barang)")
+    print(f"waktu    : {dt:.3f} s ({rate:,.0f} event/s)")
+
+    if args.mode == "verify":
+        only = state.touched if state.window is not None else None
+        if only is not None:
+            print(f"jendela  : {len(only)} resi punya event di [{args.since or '-'}, {args.until or '-'})")
+        bad = verify(state, only)
+        print("RESULT   :", f"{bad} mismatch" if bad else "OK, tabel resi cocok dengan log")
+        sys.exit(1 if bad else 0)
+    elif args.mode == "apply":
+        n = apply(state, with_stock=args.with_stock)
+        print(f"apply    : {n} baris resi di-upsert" + (" + stok" if args.with_stock else ""))
+        if args.with_stock:
+            write_snapshot(state, args.log, args.snapshot)
+            print(f"snapshot : {args.snapshot} (stock_applied diperbarui, offset {state.offset})")
+    elif args.mode == "compact":
+        out_log = args.out_log or args.log + ".compact"
+        snapshot = args.snapshot or args.log + ".snapshot.json"
+        compact(state, args.log, out_log, snapshot)
+        print(f"compact  : {out_log} ({len(state.resi)} event), snapshot {snapshot}")
+
+
+if __name__ == "__main__":
+    main()
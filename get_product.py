@@ -1,64 +1,94 @@
 # get_product.py
 from flask import Blueprint, request, jsonify
-import json
+import os
 from datetime import datetime
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from app import db
+from gudang_stats import STATS
+from event_queue import EVENT_QUEUE, QueueUnavailable
+from db_routing import read_only
+from http_cache import conditional, watermark
+from json_fast import rows_payload
 
 receiver_bp = Blueprint("receiver", __name__)
 
+# sync  : event diterapkan ke DB di dalam request (perilaku lama)
+# async : event ditulis ke events.log (durable), balas 202, diterapkan worker
+#         di background oleh SATU proses pemilik log (lihat event_queue.py)
+EVENTS_MODE = (os.getenv("DISTRIBUTOR_EVENTS_MODE") or "sync").strip().lower()
+
 # =========================
 #  A. Webhook dari distributor (event status pengiriman)
-#  - Mencatat SEMUA status ke tabel `resi` (UPSERT berdasarkan no_resi+id_barang)
+#  - Event yang sama (id evt_...) hanya diproses SEKALI: id dicatat di tabel
+#    `distributor_event` (INSERT IGNORE, PK event_id) dalam transaksi yang sama
+#  - Mencatat SEMUA status ke tabel `resi` (UPSERT multi-row berdasarkan no_resi+id_barang)
 #  - Menambah stok barang HANYA saat status berubah menjadi DELIVERED
+#    (satu UPDATE untuk semua item per event)
 # =========================
-@receiver_bp.route("/api/distributor-events", methods=["POST"])
-def distributor_events():
-    try:
-        evt = request.get_json(force=True)
-    except Exception:
-        return jsonify({"status": "error", "message": "invalid json"}), 400
-
-    print("\n=== [EVENT RECEIVED] ===")
-    try:
-        print(json.dumps(evt, indent=2, ensure_ascii=False))
-    except Exception:
-        print(evt)
-    print("========================\n")
-
+def _apply_distributor_event(evt: dict) -> dict:
+    """
+    Terapkan satu event ke DB (commit di dalam). Jumlah query tetap per event,
+    tidak bertambah dengan jumlah item. Return ringkasan hasil.
+    """
+    event_id = str(evt.get("id") or "").strip()
     data = evt.get("data") or {}
     no_resi = (data.get("no_resi") or "").strip()
     status_now = (data.get("status_now") or "").upper().strip()
     order = data.get("order") or {}
-    items = data.get("items") or []
 
     nama_supplier = order.get("supplier") or ""
     nama_distributor = order.get("distributor") or ""
 
     # safety: tanpa no_resi, kita tidak bisa tracking
     if not no_resi:
-        return jsonify({"status": "ignored", "reason": "no_resi empty"}), 200
-
-    # Proses setiap item di resi
-    for it in items:
-        id_barang = it["id_barang"]
-        nama_barang = it["nama_barang"]
-        qty = int(it["kuantitas"])
-
-        # Ambil status sebelumnya (kalau ada) untuk deteksi transisi -> DELIVERED
-        prev_status = db.session.execute(text("""
-            SELECT status FROM resi
-            WHERE no_resi = :no_resi AND id_barang = :id_barang
-            LIMIT 1
-        """), {"no_resi": no_resi, "id_barang": id_barang}).scalar()
-
-        # UPSERT catatan tracking ke tabel resi
-        db.session.execute(text("""
+        return {"status": "ignored", "reason": "no_resi empty"}
+
+    # gabungkan item dengan id_barang sama (yang terakhir menang)
+    items = {}
+    for it in data.get("items") or []:
+        items[it["id_barang"]] = {"nama_barang": it["nama_barang"], "qty": int(it["kuantitas"])}
+
+    try:
+        # Dedupe: event yang di-redeliver berhenti di sini tanpa kerja DB lain
+        if event_id:
+            res = db.session.execute(text("""
+                INSERT IGNORE INTO distributor_event (event_id, no_resi, status)
+                VALUES (:event_id, :no_resi, :status)
+            """), {"event_id": event_id, "no_resi": no_resi, "status": status_now})
+            if res.rowcount == 0:
+                db.session.rollback()
+                return {"status": "duplicate", "event_id": event_id, "no_resi": no_resi}
+
+        if not items:
+            db.session.commit()
+            return {"status": "ok", "no_resi": no_resi, "status_now": status_now, "items": 0}
+
+        ids = list(items)
+
+        # Status sebelumnya untuk SEMUA item sekaligus (dikunci -> transisi ke
+        # DELIVERED tidak bisa dihitung dua kali oleh event yang datang bersamaan)
+        prev = dict(db.session.execute(text("""
+            SELECT id_barang, status FROM resi
+            WHERE no_resi = :no_resi AND id_barang IN :ids
+            FOR UPDATE
+        """).bindparams(bindparam("ids", expanding=True)), {"no_resi": no_resi, "ids": ids}).all())
+
+        # UPSERT multi-row catatan tracking ke tabel resi
+        values, params = [], {
+            "no_resi": no_resi,
+            "nama_supplier": nama_supplier,
+            "nama_distributor": nama_distributor,
+            "status": status_now,
+        }
+        for i, id_barang in enumerate(ids):
+            values.append(f"(:no_resi, :b{i}, :n{i}, :q{i}, :nama_supplier, :nama_distributor, :status, NOW())")
+            params[f"b{i}"] = id_barang
+            params[f"n{i}"] = items[id_barang]["nama_barang"]
+            params[f"q{i}"] = items[id_barang]["qty"]
+        db.session.execute(text(f"""
             INSERT INTO resi (
                 no_resi, id_barang, nama_barang, quantity, nama_supplier, nama_distributor, status, tanggal
-            ) VALUES (
-                :no_resi, :id_barang, :nama_barang, :quantity, :nama_supplier, :nama_distributor, :status, NOW()
-            )
+            ) VALUES {", ".join(values)}
             ON DUPLICATE KEY UPDATE
                 nama_barang      = VALUES(nama_barang),
                 quantity         = VALUES(quantity),
@@ -66,41 +96,106 @@ def distributor_events():
                 nama_distributor = VALUES(nama_distributor),
                 status           = VALUES(status),
                 tanggal          = NOW()
-        """), {
-            "no_resi": no_resi,
-            "id_barang": id_barang,
-            "nama_barang": nama_barang,
-            "quantity": qty,
-            "nama_supplier": nama_supplier,
-            "nama_distributor": nama_distributor,
-            "status": status_now
-        })
+        """), params)
 
-        # Tambah stok hanya sekali saat transisi ke DELIVERED
-        if status_now == "DELIVERED" and (prev_status is None or prev_status != "DELIVERED"):
-            db.session.execute(text("""
+        # Tambah stok hanya sekali saat transisi ke DELIVERED, satu UPDATE untuk semua item
+        delivered = []
+        if status_now == "DELIVERED":
+            delivered = [(b, items[b]["qty"]) for b in ids if prev.get(b) != "DELIVERED"]
+        if delivered:
+            cases, sparams = [], {}
+            for i, (id_barang, qty) in enumerate(delivered):
+                cases.append(f"WHEN :d{i} THEN :dq{i}")
+                sparams[f"d{i}"] = id_barang
+                sparams[f"dq{i}"] = qty
+            sparams["dids"] = [b for b, _ in delivered]
+            db.session.execute(text(f"""
                 UPDATE barang
-                SET quantity = quantity + :q, updated_at = NOW()
-                WHERE id_barang = :id_barang
-            """), {"q": qty, "id_barang": id_barang})
+                SET quantity = quantity + CASE id_barang {" ".join(cases)} ELSE 0 END,
+                    updated_at = NOW()
+                WHERE id_barang IN :dids
+            """).bindparams(bindparam("dids", expanding=True)), sparams)
 
-    db.session.commit()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for id_barang, qty in delivered:
+        STATS.apply_delta(id_barang, qty)
+    return {"status": "ok", "no_resi": no_resi, "status_now": status_now, "items": len(ids),
+            "stock_added": len(delivered)}
+
+
+@receiver_bp.record_once
+def _init_event_queue(state):
+    EVENT_QUEUE.init_app(state.app, _apply_distributor_event)
+    if EVENTS_MODE == "async":
+        # start sekarang supaya event yang belum sempat diterapkan sebelum restart langsung diproses
+        try:
+            EVENT_QUEUE.start()
+        except QueueUnavailable as e:
+            print("WARN: events.log tidak tersedia, event distributor akan ditolak (503):", e)
+
+
+@receiver_bp.route("/api/distributor-events", methods=["POST"])
+def distributor_events():
+    try:
+        evt = request.get_json(force=True)
+    except Exception:
+        return jsonify({"status": "error", "message": "invalid json"}), 400
+
+    if not isinstance(evt, dict):
+        return jsonify({"status": "error", "message": "invalid json"}), 400
+
+    data = evt.get("data") or {}
+    print(f"[EVENT RECEIVED] {evt.get('id')} resi={data.get('no_resi')} status={data.get('status_now')}")
+
+    if EVENTS_MODE == "async":
+        # selalu lewat log bersama: apply langsung di sini bisa mendahului event
+        # lebih lama untuk resi yang sama yang masih antre di proses pemilik
+        try:
+            durable = EVENT_QUEUE.append(evt)
+        except QueueUnavailable:
+            durable = False
+        if not durable:
+            return jsonify({"status": "error", "message": "event log tidak tersedia"}), 503
+        return jsonify({
+            "status": "accepted",
+            "received_at": datetime.utcnow().isoformat(),
+            "event_id": evt.get("id"),
+            "no_resi": data.get("no_resi"),
+        }), 202
+
+    result = _apply_distributor_event(evt)
+    if result["status"] != "ok":
+        return jsonify(result), 200
 
     ts = datetime.utcnow().isoformat()
     return jsonify({
         "status": "ok",
         "received_at": ts,
-        "no_resi": no_resi,
-        "status_now": status_now
+        "no_resi": result["no_resi"],
+        "status_now": result["status_now"]
     }), 200
 
 
+# Kedalaman antrian & lag apply (mode async)
+@receiver_bp.get("/api/distributor-events/queue")
+def distributor_events_queue():
+    if EVENTS_MODE != "async":
+        return jsonify({"mode": "sync"}), 200
+    return jsonify(EVENT_QUEUE.stats()), 200
+
+
 # =========================
 #  B. API untuk halaman Tracking (UI)
 # =========================
 
 # List resi aktif (semua yang belum DELIVERED)
 @receiver_bp.get("/api/tracking/active")
+@read_only
+@conditional(watermark("resi"))
 def tracking_active():
     rows = db.session.execute(text("""
         SELECT no_resi, id_barang, nama_barang, quantity, nama_supplier, nama_distributor, status, tanggal
@@ -108,11 +203,13 @@ def tracking_active():
         WHERE status <> 'DELIVERED'
         ORDER BY tanggal DESC
     """)).mappings().all()
-    return jsonify({"items": [dict(r) for r in rows]}), 200
+    return jsonify(rows_payload(rows)), 200
 
 
 # Detail satu resi (untuk tombol "Cek Status")
 @receiver_bp.get("/api/tracking/<string:no_resi>")
+@read_only
+@conditional(watermark("resi"))
 def tracking_detail(no_resi: str):
     rows = db.session.execute(text("""
         SELECT no_resi, id_barang, nama_barang, quantity, nama_supplier, nama_distributor, status, tanggal
@@ -120,7 +217,7 @@ def tracking_detail(no_resi: str):
         WHERE no_resi = :no_resi
         ORDER BY tanggal DESC
     """), {"no_resi": no_resi}).mappings().all()
-    return jsonify({"items": [dict(r) for r in rows]}), 200
+    return jsonify(rows_payload(rows)), 200
 
 
 # Tandai DELIVERED secara manual (untuk tombol "Tandai DELIVERED" / "Terima Barang")
@@ -141,6 +238,7 @@ def tracking_mark_delivered():
         return jsonify({"error": "resi tidak ditemukan"}), 404
 
     # Update ke DELIVERED; tambah stok hanya untuk yang belum delivered
+    delivered = []
     for r in items:
         if r["status"] != "DELIVERED":
             db.session.execute(text("""
@@ -154,6 +252,9 @@ def tracking_mark_delivered():
                 SET quantity = quantity + :q, updated_at = NOW()
                 WHERE id_barang = :id_barang
             """), {"q": int(r["quantity"]), "id_barang": r["id_barang"]})
+            delivered.append((r["id_barang"], int(r["quantity"])))
 
     db.session.commit()
+    for id_barang, qty in delivered:
+        STATS.apply_delta(id_barang, qty)
     return jsonify({"status": "ok", "no_resi": no_resi}), 200
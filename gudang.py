@@ -1,14 +1,17 @@
 # gudang.py
-from flask import Blueprint, request, jsonify
-from sqlalchemy import text
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from sqlalchemy import text, bindparam
 from app import db  # memakai instance db dari app.py
+from pagination import encode_cursor, decode_cursor, parse_limit, keyset_clause
+from barang_search import SEARCH_INDEX  # di-init oleh create_app()
+from gudang_stats import STATS          # di-init oleh create_app()
+from db_routing import read_only
+from http_cache import conditional, watermark
+from json_fast import rows_payload
 
 gudang_bp = Blueprint("gudang", __name__)
 TABLE = "barang"  # <- tabel rujukan
 
-def _like(q: str) -> str:
-    return f"%{q.strip()}%" if q else "%"
-
 def _row_to_dict(row) -> dict:
     # row: sqlalchemy RowMapping -> dict + cast Decimal ke float/int
     d = dict(row)
@@ -23,48 +26,110 @@ def _row_to_dict(row) -> dict:
     return d
 
 # =================== LIST + SEARCH ===================
-# GET /api/gudang?q=ikan
-@gudang_bp.get("/api/gudang")
-def list_gudang():
-    q = (request.args.get("q") or "").strip()
-    rows = db.session.execute(
+COLUMNS = """
+    id_barang      AS sku,
+    nama_barang    AS nama_product,
+    id_supplier    AS id_supplier,
+    quantity       AS stok,
+    harga_jual     AS harga_jual,
+    harga_supplier AS harga_supplier,
+    berat          AS berat,
+    updated_at     AS last_restock
+"""
+KEYSET = ("nama_barang", "id_barang")
+EXPORT_BATCH = 1000
+
+def _page(after, limit: int):
+    # satu halaman keyset urut (nama_barang, id_barang); after=None -> halaman pertama
+    where, params = "", {"limit": limit}
+    if after is not None:
+        clause, cparams = keyset_clause(KEYSET, after)
+        where = f"WHERE {clause}"
+        params.update(cparams)
+    return db.session.execute(
         text(f"""
-            SELECT
-                id_barang      AS sku,
-                nama_barang    AS nama_product,
-                id_supplier    AS id_supplier,
-                quantity       AS stok,
-                harga_jual     AS harga_jual,
-                harga_supplier AS harga_supplier,
-                berat          AS berat,
-                updated_at     AS last_restock
+            SELECT {COLUMNS}
             FROM {TABLE}
-            WHERE (:q = '' OR id_barang LIKE :q_like OR nama_barang LIKE :q_like)
-            ORDER BY nama_barang
+            {where}
+            ORDER BY nama_barang, id_barang
+            LIMIT :limit
         """),
-        {"q": q, "q_like": _like(q)}
+        params
+    ).mappings().all()
+
+def _by_skus(skus):
+    # baris untuk SKU hasil search index, urutan ranking dipertahankan
+    if not skus:
+        return []
+    rows = db.session.execute(
+        text(f"SELECT {COLUMNS} FROM {TABLE} WHERE id_barang IN :skus")
+        .bindparams(bindparam("skus", expanding=True)),
+        {"skus": list(skus)}
     ).mappings().all()
-    items = [_row_to_dict(r) for r in rows]
-    return jsonify({"items": items})
+    by_sku = {r["sku"]: r for r in rows}
+    return [by_sku[s] for s in skus if s in by_sku]
+
+# GET /api/gudang?q=ikan&limit=100     (ranking search index, tanpa cursor)
+# GET /api/gudang?limit=100&cursor=<next_cursor>
+# GET /api/gudang?format=ndjson   (export semua baris, di-stream)
+# GET /api/gudang?q=ikan&format=ndjson   (export semua hasil search index, urut ranking)
+@gudang_bp.get("/api/gudang")
+@read_only
+@conditional(watermark("barang"))
+def list_gudang():
+    q = (request.args.get("q") or "").strip()
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        cursor = request.args.get("cursor")
+        after = decode_cursor(cursor, len(KEYSET)) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if request.args.get("format") == "ndjson":
+        dumps = current_app.json.dumps
+        if q:
+            SEARCH_INDEX.ensure_fresh()
+            skus = SEARCH_INDEX.search_all(q)
+
+            def generate_q():
+                for start in range(0, len(skus), EXPORT_BATCH):
+                    for r in _by_skus(skus[start:start + EXPORT_BATCH]):
+                        yield dumps(dict(r)) + "\n"
+            return Response(stream_with_context(generate_q()), mimetype="application/x-ndjson")
+
+        def generate(after=after):
+            while True:
+                rows = _page(after, EXPORT_BATCH)
+                for r in rows:
+                    yield dumps(dict(r)) + "\n"
+                if len(rows) < EXPORT_BATCH:
+                    break
+                after = [rows[-1]["nama_product"], rows[-1]["sku"]]
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    if q:
+        SEARCH_INDEX.ensure_fresh()
+        rows = _by_skus(SEARCH_INDEX.search(q, limit))
+        return jsonify({**rows_payload(rows), "next_cursor": None})
+
+    rows = _page(after, limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor([rows[-1]["nama_product"], rows[-1]["sku"]]) if has_more else None
+    return jsonify({**rows_payload(rows), "next_cursor": next_cursor})
 
 # =================== SUMMARY ===================
 # GET /api/gudang/stats
 @gudang_bp.get("/api/gudang/stats")
 def gudang_stats():
-    def scalar(sql, params=None):
-        res = db.session.execute(text(sql), params or {})
-        val = res.scalar()
-        return int(val or 0)
-
-    total_produk = scalar(f"SELECT COUNT(*) FROM {TABLE}")
-    total_stok   = scalar(f"SELECT COALESCE(SUM(quantity),0) FROM {TABLE}")
-    low_stok     = scalar(f"SELECT COUNT(*) FROM {TABLE} WHERE quantity < 10")
-
-    return jsonify({
-        "total_produk": total_produk,
-        "total_stok": total_stok,
-        "low_stok": low_stok,
-    })
+    # counter in-memory (gudang_stats.py); ?threshold=N untuk batas stok rendah lain
+    try:
+        threshold = int(request.args["threshold"]) if request.args.get("threshold") else None
+    except ValueError:
+        return jsonify({"error": "threshold harus angka"}), 400
+    if request.args.get("reconcile") == "1":
+        STATS.reconcile()
+    return jsonify(STATS.snapshot(threshold))
 
 # =================== RESTOCK ===================
 # POST /api/gudang/restock
@@ -114,6 +179,8 @@ def restock_gudang():
             """),
             {"sku": sku}
         ).mappings().first()
+        SEARCH_INDEX.upsert(row["sku"], row["nama_product"])
+        STATS.set_quantity(row["sku"], row["stok"])
         return jsonify({"updated": _row_to_dict(row)}), 200
 
     except Exception as e:
@@ -176,6 +243,8 @@ def patch_gudang(sku: str):
                 WHERE id_barang = :sku
             """), {"sku": sku}
         ).mappings().first()
+        SEARCH_INDEX.upsert(row["sku"], row["nama_product"])
+        STATS.set_quantity(row["sku"], row["stok"])
         return jsonify({"updated": _row_to_dict(row)}), 200
 
     except Exception as e:
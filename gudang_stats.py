@@ -0,0 +1,206 @@
+# gudang_stats.py
+# Ringkasan gudang (total produk, total stok, stok rendah) sebagai counter
+# in-memory, supaya /api/gudang/stats cukup baca angka (O(1)) tanpa query.
+#
+#  - restock / patch / bayar POS / resi DELIVERED memanggil apply_delta() atau
+#    set_quantity() setelah commit
+#  - reconcile() membaca ulang tabel dalam SATU pass dan mengganti counter.
+#    Perubahan yang masuk selama reconcile berjalan dicatat di journal dan
+#    diterapkan ulang di atas hasil baca tabel (tidak tertimpa snapshot).
+#  - reconcile periodik (tiap GUDANG_STATS_RECONCILE detik) hanya jalan di
+#    SATU proses: pemegang flock GUDANG_STATS_LOCK. Hasilnya ditulis ke
+#    GUDANG_STATS_FILE; worker gunicorn lain cukup memuat file itu (tanpa
+#    query), sekaligus menyerap perubahan dari worker lain. Kalau pemegang
+#    lock mati, worker lain mengambil alih di siklus berikutnya.
+#  - threshold stok rendah bisa diganti tanpa scan DB (dihitung dari peta
+#    sku -> qty yang sudah di memori)
+import collections
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: tidak ada flock, asumsikan satu proses
+    fcntl = None
+
+LOW_STOCK_THRESHOLD = int(os.getenv("GUDANG_LOW_STOCK", "10"))
+RECONCILE_SECONDS = float(os.getenv("GUDANG_STATS_RECONCILE", "30"))
+STATS_FILE = os.getenv("GUDANG_STATS_FILE", os.path.join(tempfile.gettempdir(), "retail_gudang_stats.json"))
+STATS_LOCK = os.getenv("GUDANG_STATS_LOCK", STATS_FILE + ".lock")
+
+
+class WarehouseStats:
+    def __init__(self, threshold: int = LOW_STOCK_THRESHOLD, reconcile_every: float = RECONCILE_SECONDS,
+                 shared_path: str = STATS_FILE, lock_path: str = STATS_LOCK):
+        self.threshold = threshold
+        self.reconcile_every = reconcile_every
+        self.shared_path = shared_path
+        self.lock_path = lock_path
+        self._app = None
+        self._loader = None
+        self._lock = threading.Lock()
+        self._qty = {}            # sku -> quantity
+        self._total_stok = 0
+        self._low = 0
+        self._reconciled_at = None  # monotonic: terakhir counter diganti / dicek
+        self._data_ts = None        # wall clock: kapan tabel dibaca untuk counter sekarang
+        self._reconciling = False
+        self._stale = False
+        # (ts, sku, delta, qty): perubahan lokal, diterapkan ulang di atas snapshot
+        # yang dibaca SETELAH ts (delta=None -> set_quantity)
+        self._journal = collections.deque(maxlen=100_000)
+        self._leader_fh = None
+
+    def init_app(self, app, loader):
+        """loader(): dipanggil di dalam app context, return iterable (sku, quantity)."""
+        self._app = app
+        self._loader = loader
+
+    # ---------- reconcile ----------
+    def _replace(self, qty: dict, read_at: float):
+        """Ganti counter dengan snapshot qty (tabel dibaca mulai read_at), lalu replay journal."""
+        t = self.threshold
+        with self._lock:
+            self._qty = qty
+            self._total_stok = sum(qty.values())
+            self._low = sum(1 for q in qty.values() if q < t)
+            self._stale = False
+            horizon = time.time() - 3 * self.reconcile_every
+            while self._journal and self._journal[0][0] < horizon:
+                self._journal.popleft()
+            for ts, sku, delta, q in self._journal:
+                if ts >= read_at:
+                    self._set(sku, self._qty.get(sku, 0) + delta if delta is not None else q)
+            self._reconciled_at = time.monotonic()
+            self._data_ts = read_at
+
+    def reconcile(self):
+        """Hitung ulang dari tabel (satu pass). Harus dipanggil di dalam app context."""
+        read_at = time.time()
+        qty = {str(sku): int(q or 0) for sku, q in self._loader()}
+        self._replace(qty, read_at)
+        if self._is_leader():
+            self._publish(qty, read_at)
+
+    # ---------- satu proses pemegang reconcile periodik ----------
+    def _is_leader(self) -> bool:
+        if self._leader_fh is not None or fcntl is None:
+            return True
+        fh = open(self.lock_path, "a")
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        self._leader_fh = fh  # dipegang seumur proses; lepas otomatis saat proses mati
+        return True
+
+    def _publish(self, qty: dict, read_at: float):
+        tmp = f"{self.shared_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"read_at": read_at, "qty": qty}, f, separators=(",", ":"))
+        os.replace(tmp, self.shared_path)
+
+    def _adopt(self):
+        """Worker non-pemegang lock: muat snapshot terbaru dari pemegang lock (tanpa query)."""
+        try:
+            with open(self.shared_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if data is None or (self._data_ts is not None and data["read_at"] <= self._data_ts):
+            # belum ada snapshot yang lebih baru: cek lagi di siklus berikutnya
+            self._reconciled_at = time.monotonic()
+            return
+        self._replace({str(k): int(v) for k, v in data["qty"].items()}, data["read_at"])
+
+    def _refresh(self):
+        if self._is_leader():
+            self.reconcile()
+        else:
+            self._adopt()
+
+    def _reconcile_in_background(self):
+        app = self._app
+
+        def run():
+            try:
+                with app.app_context():
+                    self._refresh()
+            except Exception as e:
+                print("[gudang-stats] reconcile gagal:", e)
+            finally:
+                self._reconciling = False
+
+        threading.Thread(target=run, name="gudang-stats-reconcile", daemon=True).start()
+
+    def ensure_fresh(self):
+        if self._reconciled_at is None:
+            self.reconcile()
+            return
+        expired = self._stale or time.monotonic() - self._reconciled_at > self.reconcile_every
+        if expired and not self._reconciling:
+            with self._lock:
+                if self._reconciling:
+                    return
+                self._reconciling = True
+            self._reconcile_in_background()
+
+    # ---------- update incremental ----------
+    def _set(self, sku: str, new_q: int):
+        """Harus dipanggil sambil memegang lock."""
+        old_q = self._qty.get(sku)
+        if old_q is None:
+            # SKU belum dikenal (mis. ditambah langsung ke DB) -> percepat reconcile berikutnya
+            self._stale = True
+            return
+        self._qty[sku] = new_q
+        self._total_stok += new_q - old_q
+        self._low += (new_q < self.threshold) - (old_q < self.threshold)
+
+    def apply_delta(self, sku, delta: int):
+        if self._reconciled_at is None:
+            return  # belum pernah di-load; load pertama akan membaca nilai terbaru
+        with self._lock:
+            sku, delta = str(sku), int(delta)
+            self._journal.append((time.time(), sku, delta, None))
+            self._set(sku, self._qty.get(sku, 0) + delta)
+
+    def set_quantity(self, sku, qty: int):
+        if self._reconciled_at is None:
+            return
+        with self._lock:
+            sku, qty = str(sku), int(qty or 0)
+            self._journal.append((time.time(), sku, None, qty))
+            self._set(sku, qty)
+
+    def set_threshold(self, threshold: int):
+        """Ganti threshold default; dihitung dari memori, tanpa query."""
+        with self._lock:
+            self.threshold = int(threshold)
+            self._low = sum(1 for q in self._qty.values() if q < self.threshold)
+
+    # ---------- read ----------
+    def snapshot(self, threshold: int = None) -> dict:
+        self.ensure_fresh()
+        with self._lock:
+            if threshold is None or int(threshold) == self.threshold:
+                t, low = self.threshold, self._low
+            else:
+                t = int(threshold)
+                low = sum(1 for q in self._qty.values() if q < t)
+            return {
+                "total_produk": len(self._qty),
+                "total_stok": self._total_stok,
+                "low_stok": low,
+                "threshold": t,
+                "age": round(time.time() - self._data_ts, 1) if self._data_ts else None,
+                "reconciler": self._leader_fh is not None or fcntl is None,
+            }
+
+
+# instance bersama (app.py, gudang.py, transaksi.py, get_product.py)
+STATS = WarehouseStats()
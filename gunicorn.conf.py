@@ -0,0 +1,35 @@
+# gunicorn.conf.py
+# Jalankan:  gunicorn -c gunicorn.conf.py
+#
+# - worker gthread: stream SSE (/api/orders/drafts/<id>/events) & NDJSON
+#   memegang satu thread, bukan satu proses worker
+# - PROMETHEUS_MULTIPROC_DIR: metrics semua worker digabung di /metrics
+#   (lihat metrics.py); direktori dikosongkan saat master start dan file
+#   worker yang mati dibersihkan di child_exit
+import os
+import shutil
+import tempfile
+
+PROMETHEUS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "retail_prometheus")
+)
+
+wsgi_app = "app:create_app()"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+
+
+def on_starting(server):
+    shutil.rmtree(PROMETHEUS_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,145 @@
+# http_cache.py
+# Conditional GET (ETag / If-None-Match) + kompresi response.
+#
+# @conditional(validator): validator() murah (watermark tabel = MAX(changed_at)
+# + counter DELETE, versi draft store) dihitung dulu; ETag = hash(path+query,
+# validator). Kalau sama dengan If-None-Match -> 304 tanpa menjalankan query
+# list sama sekali. Kalau validator gagal (mis. migrasi 005 belum dijalankan)
+# endpoint jalan biasa tanpa ETag.
+#
+# COMPRESSOR: gzip (atau brotli kalau terpasang & diminta klien) untuk body
+# >= COMPRESS_MIN_BYTES dengan mimetype teks/JSON. Response streaming
+# (NDJSON export, SSE), file (send_file) dan yang sudah ter-encode
+# (/static/dist) dilewati.
+import gzip
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import text
+
+try:
+    import brotli
+except ImportError:  # opsional: tanpa brotli hanya gzip
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "5"))
+COMPRESSIBLE = {
+    "application/json", "text/html", "text/plain", "text/css", "text/javascript", "application/javascript",
+}
+
+_warned = set()
+
+
+# ===================== VALIDATOR =====================
+_legacy_watermark = set()  # tabel tanpa list_watermark (migrasi 007 belum dijalankan)
+
+
+def watermark(table: str):
+    """
+    Validator tabel: (MAX(changed_at), jumlah DELETE). Berubah setiap
+    INSERT/UPDATE/DELETE; dua lookup index, tanpa COUNT(*) yang membaca
+    seluruh tabel. Sebelum migrasi 007: (MAX(changed_at), COUNT(*)).
+    """
+    def validator():
+        session = current_app.extensions["sqlalchemy"].session
+        if table not in _legacy_watermark:
+            try:
+                row = session.execute(text(f"""
+                    SELECT (SELECT MAX(changed_at) FROM {table}),
+                           (SELECT deletes FROM list_watermark WHERE tbl = :tbl)
+                """), {"tbl": table}).first()
+                if row[1] is not None:
+                    return tuple(row)
+            except Exception as e:
+                if "list_watermark" not in str(e):
+                    raise  # mis. migrasi 005 pun belum / DB bermasalah: conditional() yang menangani
+                session.rollback()
+            _legacy_watermark.add(table)
+            print(f"WARN: list_watermark untuk {table} tidak ada (migrasi 007?), ETag pakai COUNT(*)")
+        row = session.execute(text(f"SELECT MAX(changed_at), COUNT(*) FROM {table}")).first()
+        return tuple(row)
+    return validator
+
+
+def _etag(validator) -> str:
+    raw = f"{request.full_path}|{validator!r}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+
+def conditional(validator):
+    """Dekorator GET: jawab 304 bila validator() tidak berubah sejak ETag klien."""
+    def deco(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            try:
+                etag = _etag(validator())
+            except Exception as e:
+                current_app.extensions["sqlalchemy"].session.rollback()
+                if view.__name__ not in _warned:
+                    _warned.add(view.__name__)
+                    print(f"WARN: ETag {view.__name__} nonaktif:", str(e).splitlines()[0])
+                return view(*args, **kwargs)
+
+            # weak ETag: body gzip/brotli/identity dianggap setara
+            if request.if_none_match.contains_weak(etag):
+                resp = current_app.response_class(status=304)
+            else:
+                resp = current_app.make_response(view(*args, **kwargs))
+                if resp.status_code != 200 or resp.is_streamed:
+                    return resp
+            resp.set_etag(etag, weak=True)
+            # boleh disimpan browser, tapi selalu divalidasi ulang (murah: 304)
+            resp.headers["Cache-Control"] = "no-cache"
+            return resp
+        return wrapped
+    return deco
+
+
+# ===================== KOMPRESI =====================
+class Compressor:
+    def __init__(self, min_bytes: int = COMPRESS_MIN_BYTES, level: int = COMPRESS_LEVEL):
+        self.min_bytes = min_bytes
+        self.level = level
+
+    def init_app(self, app):
+        app.after_request(self._compress)
+
+    def _encoding(self):
+        accept = request.accept_encodings
+        if brotli is not None and accept["br"]:
+            return "br"
+        if accept["gzip"]:
+            return "gzip"
+        return None
+
+    def _compress(self, resp):
+        if (
+            resp.status_code != 200
+            or resp.is_streamed
+            or resp.direct_passthrough
+            or "Content-Encoding" in resp.headers
+            or resp.mimetype not in COMPRESSIBLE
+        ):
+            return resp
+        encoding = self._encoding()
+        if encoding is None:
+            return resp
+        data = resp.get_data()
+        if len(data) < self.min_bytes:
+            return resp
+        if encoding == "br":
+            # quality rendah: cepat, rasio tetap jauh lebih baik dari tanpa kompresi
+            body = brotli.compress(data, quality=min(self.level, 11))
+        else:
+            body = gzip.compress(data, compresslevel=self.level)
+        resp.set_data(body)
+        resp.headers["Content-Encoding"] = encoding
+        resp.vary.add("Accept-Encoding")
+        return resp
+
+
+# instance bersama (dipasang di create_app)
+COMPRESSOR = Compressor()
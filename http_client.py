@@ -0,0 +1,234 @@
+# http_client.py
+# Satu klien HTTP keluar (outbound) untuk semua panggilan ke supplier.
+#  - koneksi keep-alive di-pool per host (tidak handshake TCP+TLS ulang tiap call)
+#  - retry terbatas dengan backoff + jitter (POST hanya di-retry kalau koneksi
+#    belum pernah terbentuk, supaya order tidak terkirim dua kali)
+#  - circuit breaker per supplier/host: kalau supplier sedang mati, request
+#    langsung gagal cepat alih-alih menahan worker sampai timeout
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))   # jumlah host yang di-pool
+POOL_MAXSIZE     = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))       # koneksi per host
+CONNECT_TIMEOUT  = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+MAX_RETRIES      = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+BACKOFF_BASE     = float(os.getenv("HTTP_BACKOFF_BASE", "0.2"))
+BACKOFF_MAX      = float(os.getenv("HTTP_BACKOFF_MAX", "2"))
+
+BREAKER_FAILURES = int(os.getenv("HTTP_BREAKER_FAILURES", "5"))
+BREAKER_RESET    = float(os.getenv("HTTP_BREAKER_RESET", "30"))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUS = {502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Breaker sedang OPEN: request tidak dikirim sama sekali."""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_inflight = False
+        self._counts = {"success": 0, "failure": 0, "rejected": 0, "opened": 0}
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self._counts["rejected"] += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_inflight = False
+            if self._state == self.HALF_OPEN:
+                # hanya satu request percobaan yang boleh lewat
+                if self._trial_inflight:
+                    self._counts["rejected"] += 1
+                    return False
+                self._trial_inflight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._counts["success"] += 1
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_inflight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._counts["failure"] += 1
+            self._failures += 1
+            self._trial_inflight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._counts["opened"] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """Call selesai tanpa hasil yang bisa dinilai (exception non-HTTP): lepas slot percobaan HALF_OPEN."""
+        with self._lock:
+            self._trial_inflight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_in = None
+            if self._state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 2)
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_in": retry_in,
+                **self._counts,
+            }
+
+
+def _is_connect_failure(exc) -> bool:
+    """True kalau request dipastikan belum terkirim (gagal konek / DNS)."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError) and not isinstance(exc, CircuitOpenError):
+        reason = getattr(exc.args[0], "reason", None) if exc.args else None
+        return type(reason).__name__ in ("NewConnectionError", "NameResolutionError")
+    return False
+
+
+class HttpClient:
+    def __init__(self):
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._observers = []
+
+    def observe(self, fn):
+        """fn(host, method, outcome, seconds) dipanggil setelah setiap percobaan request (mis. metrics.py)."""
+        if fn not in self._observers:
+            self._observers.append(fn)
+
+    def _notify(self, host, method, outcome, seconds):
+        for fn in self._observers:
+            try:
+                fn(host, method, outcome, seconds)
+            except Exception as e:
+                print("[http-client] observer gagal:", e)
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            b = self._breakers.get(name)
+            if b is None:
+                b = self._breakers[name] = CircuitBreaker(name)
+            return b
+
+    def request(self, method: str, url: str, breaker: str = None, retries: int = MAX_RETRIES, **kwargs):
+        """
+        Seperti requests.request(), plus pool/retry/breaker.
+        breaker: nama breaker (default: host tujuan)
+        timeout angka tunggal dianggap read-timeout; connect-timeout dibatasi CONNECT_TIMEOUT.
+        """
+        method = method.upper()
+        host = urlparse(url).netloc
+        cb = self.breaker(breaker or host)
+
+        timeout = kwargs.pop("timeout", 15)
+        if not isinstance(timeout, tuple):
+            timeout = (min(CONNECT_TIMEOUT, timeout), timeout)
+
+        # breaker dinilai per call logis (bukan per percobaan retry): satu call
+        # yang gagal setelah semua retry = satu failure
+        if not cb.allow():
+            self._notify(host, method, "circuit_open", 0.0)
+            raise CircuitOpenError(f"circuit open untuk {cb.name}")
+        outcome = None  # "success" | "failure" | None (exception lain)
+        try:
+            attempt = 0
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    resp = self.session.request(method, url, timeout=timeout, **kwargs)
+                except requests.exceptions.RequestException as e:
+                    self._notify(host, method, type(e).__name__, time.perf_counter() - t0)
+                    retryable = _is_connect_failure(e) or (
+                        method in IDEMPOTENT_METHODS and isinstance(e, (requests.exceptions.ConnectionError,
+                                                                         requests.exceptions.Timeout))
+                    )
+                    if not retryable or attempt >= retries:
+                        outcome = "failure"
+                        raise
+                else:
+                    self._notify(host, method, f"{resp.status_code // 100}xx", time.perf_counter() - t0)
+                    if resp.status_code < 500:
+                        outcome = "success"
+                        return resp
+                    if method in IDEMPOTENT_METHODS and resp.status_code in RETRY_STATUS and attempt < retries:
+                        resp.close()
+                    else:
+                        outcome = "failure"
+                        return resp
+
+                # full jitter: sleep acak 0..min(max, base*2^attempt)
+                time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))))
+                attempt += 1
+        finally:
+            # selalu dijalankan -> slot percobaan HALF_OPEN tidak pernah tertinggal
+            if outcome == "success":
+                cb.record_success()
+            elif outcome == "failure":
+                cb.record_failure()
+            else:
+                cb.release()
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        pools = {}
+        pm = self.adapter.poolmanager
+        for key in list(pm.pools.keys()):
+            pool = pm.pools.get(key)
+            if pool is None:
+                continue
+            pools[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+                "maxsize": pool.pool.maxsize if pool.pool is not None else POOL_MAXSIZE,
+            }
+        with self._lock:
+            breakers = {name: b.snapshot() for name, b in self._breakers.items()}
+        return {
+            "config": {
+                "pool_connections": POOL_CONNECTIONS,
+                "pool_maxsize": POOL_MAXSIZE,
+                "connect_timeout": CONNECT_TIMEOUT,
+                "max_retries": MAX_RETRIES,
+                "breaker_failures": BREAKER_FAILURES,
+                "breaker_reset": BREAKER_RESET,
+            },
+            "pools": pools,
+            "breakers": breakers,
+        }
+
+
+# instance bersama untuk seluruh proses
+CLIENT = HttpClient()
@@ -0,0 +1,91 @@
+# json_fast.py
+# JSON provider Flask yang cepat + helper list baris DB.
+#
+#   - pakai orjson kalau terpasang (fallback stdlib json, hasil sama)
+#   - Decimal -> float, datetime/date/time -> ISO 8601 ("2025-01-31T10:15:00"),
+#     langsung di encoder: tidak perlu loop isinstance per kolom (_row_to_dict)
+#   - response() membuat bytes sekali, tanpa str perantara
+#   - rows_payload(rows): RowMapping -> list dict / format kolom tanpa
+#     dict(r) per baris (tuple nilai diambil langsung dari row)
+#
+# ?format=columns di endpoint list besar:
+#   {"columns": ["sku", "nama_product", ...], "rows": [["SY001", "Sabun", ...], ...], ...}
+# (nama kolom tidak diulang per baris -> body lebih kecil & encode lebih cepat).
+# Benchmark: python bench/json_gudang.py
+import datetime
+import decimal
+import json
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # opsional: tanpa orjson pakai stdlib json
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if isinstance(o, bytes):
+        return o.decode("utf-8", "replace")
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTS)
+
+    _loads = orjson.loads
+else:
+    def dumps_bytes(obj) -> bytes:
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    _loads = json.loads
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """app.json_provider_class: jsonify/app.json.dumps memakai encoder di atas."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # opsi khusus (indent, sort_keys, ...) -> stdlib dengan default yang sama
+            kwargs.setdefault("default", _default)
+            return json.dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return _loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+
+# ===================== BARIS DB =====================
+def _values(row):
+    # RowMapping/Row menyimpan nilai sebagai tuple (_data); fallback lewat API publik
+    data = getattr(row, "_data", None)
+    return data if data is not None else tuple(row.values())
+
+
+def rows_payload(rows, columns: bool = None) -> dict:
+    """
+    rows: hasil .mappings().all(). columns=None -> ikuti ?format=columns.
+    Return {"items": [...]} atau {"columns": [...], "rows": [[...]]}.
+    """
+    if columns is None:
+        columns = request.args.get("format") == "columns"
+    keys = list(rows[0].keys()) if rows else []
+    if columns:
+        return {"columns": keys, "rows": [_values(r) for r in rows]}
+    return {"items": [dict(zip(keys, _values(r))) for r in rows]}
@@ -0,0 +1,147 @@
+# metrics.py
+# Endpoint /metrics format Prometheus (prometheus_client).
+#
+#   http_requests_total{blueprint,route,method,status}
+#   http_request_duration_seconds{blueprint,route,method}          (histogram)
+#   upstream_request_duration_seconds{host,method,outcome}         (histogram, dari http_client)
+#   login_duration_seconds{outcome}                                (histogram, login/register)
+#   password_hash_seconds{op} / password_hash_wait_seconds{op}     (histogram, dari passwords.py)
+#   password_hash_total{op,outcome}                                (ok | busy | timeout)
+#   db_pool_checked_out / db_pool_connections                      (gauge per proses, dijumlah)
+#   draft_store_drafts                                             (dibaca saat scrape)
+#
+# Label route = pola URL rule (/api/pos/<int:trx_id>), bukan path asli, jadi
+# jumlah seri tetap kecil. Biaya per request: satu observe + satu inc.
+#
+# Multi-worker gunicorn: set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py sudah
+# mengaturnya) -> tiap worker menulis ke file mmap, /metrics menggabungkan
+# semua worker; worker yang mati dibersihkan lewat hook child_exit.
+import os
+import time
+
+from flask import g, request, Response
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess,
+    )
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:  # opsional: tanpa prometheus_client, /metrics menjawab 503
+    CollectorRegistry = None
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+SKIP_PATHS = {"/metrics"}
+
+
+class _ScrapeCollector:
+    """Nilai yang dibaca saat scrape (sudah bersama antar worker, mis. draft di SQLite)."""
+
+    def __init__(self, gauges):
+        self.gauges = gauges  # nama -> (help, fn)
+
+    def collect(self):
+        for name, (doc, fn) in self.gauges.items():
+            try:
+                value = float(fn())
+            except Exception:
+                continue
+            yield GaugeMetricFamily(name, doc, value=value)
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = CollectorRegistry is not None
+        self._scrape = {}
+        self._pool_hooked = False
+        if not self.enabled:
+            return
+        self.requests = Counter(
+            "http_requests_total", "Jumlah request HTTP", ["blueprint", "route", "method", "status"])
+        self.latency = Histogram(
+            "http_request_duration_seconds", "Latency request HTTP", ["blueprint", "route", "method"])
+        self.upstream = Histogram(
+            "upstream_request_duration_seconds", "Latency call ke supplier/upstream", ["host", "method", "outcome"])
+        self.login_latency = Histogram(
+            "login_duration_seconds", "Latency login/register end-to-end", ["outcome"])
+        self.hash_seconds = Histogram(
+            "password_hash_seconds", "Waktu CPU hash/verify password", ["op"])
+        self.hash_wait = Histogram(
+            "password_hash_wait_seconds", "Waktu antre di pool hash password", ["op"])
+        self.hash_total = Counter(
+            "password_hash_total", "Jumlah hash/verify password", ["op", "outcome"])
+        self.pool_checked_out = Gauge(
+            "db_pool_checked_out", "Koneksi DB yang sedang dipakai", multiprocess_mode="livesum")
+        self.pool_connections = Gauge(
+            "db_pool_connections", "Koneksi DB yang terbuka", multiprocess_mode="livesum")
+        self._collector = _ScrapeCollector(self._scrape)
+        if not MULTIPROC_DIR:
+            REGISTRY.register(self._collector)
+
+    # ---------- hook ----------
+    def init_app(self, app, http_client=None, hasher=None):
+        if not self.enabled:
+            print("WARN: prometheus_client tidak terpasang, /metrics nonaktif")
+            return
+        app.before_request(self._start)
+        app.after_request(self._record)
+        if http_client is not None:
+            http_client.observe(self._observe_upstream)
+        if hasher is not None:
+            hasher.observe(self._observe_hash)
+        if not self._pool_hooked:
+            # dipasang di kelas Pool -> berlaku untuk semua engine/bind
+            event.listen(Pool, "checkout", lambda *a: self.pool_checked_out.inc())
+            event.listen(Pool, "checkin", lambda *a: self.pool_checked_out.dec())
+            event.listen(Pool, "connect", lambda *a: self.pool_connections.inc())
+            event.listen(Pool, "close", lambda *a: self.pool_connections.dec())
+            self._pool_hooked = True
+
+    def gauge_on_scrape(self, name: str, doc: str, fn):
+        """Gauge yang nilainya dihitung fn() setiap /metrics di-scrape."""
+        self._scrape[name] = (doc, fn)
+
+    @staticmethod
+    def _start():
+        g._metrics_t0 = time.perf_counter()
+
+    def _record(self, resp):
+        t0 = g.pop("_metrics_t0", None)
+        if t0 is None or request.path in SKIP_PATHS:
+            return resp
+        blueprint = request.blueprint or "app"
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        self.latency.labels(blueprint, route, request.method).observe(time.perf_counter() - t0)
+        self.requests.labels(blueprint, route, request.method, str(resp.status_code)).inc()
+        return resp
+
+    def _observe_upstream(self, host, method, outcome, seconds):
+        self.upstream.labels(host, method, outcome).observe(seconds)
+
+    def _observe_hash(self, op, outcome, wait_s, hash_s):
+        self.hash_total.labels(op, outcome).inc()
+        if outcome == "ok":
+            self.hash_wait.labels(op).observe(wait_s)
+            self.hash_seconds.labels(op).observe(hash_s)
+
+    def observe_login(self, outcome: str, seconds: float):
+        """outcome login: ok | bad_user | bad_password | busy | error; register: register_*."""
+        if self.enabled:
+            self.login_latency.labels(outcome).observe(seconds)
+
+    # ---------- export ----------
+    def render(self) -> Response:
+        if not self.enabled:
+            return Response("prometheus_client tidak terpasang\n", status=503, mimetype="text/plain")
+        if MULTIPROC_DIR:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            registry.register(self._collector)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+# instance bersama (dipasang di create_app)
+METRICS = Metrics()
@@ -0,0 +1,6 @@
+-- 001_barang_keyset_index.sql
+-- Index komposit untuk keyset pagination /api/gudang
+-- (ORDER BY nama_barang, id_barang + WHERE setelah cursor).
+-- Jalankan sekali:  mysql -u root retail_db < migrations/001_barang_keyset_index.sql
+
+CREATE INDEX idx_barang_nama_id ON barang (nama_barang, id_barang);
@@ -0,0 +1,14 @@
+-- 002_distributor_event_dedupe.sql
+-- Index event yang sudah diproses oleh /api/distributor-events.
+-- event_id (evt_...) jadi PRIMARY KEY -> webhook yang dikirim ulang oleh
+-- distributor langsung dikenali sebagai duplikat (INSERT IGNORE rowcount = 0).
+-- Jalankan sekali:  mysql -u root retail_db < migrations/002_distributor_event_dedupe.sql
+
+CREATE TABLE IF NOT EXISTS distributor_event (
+    event_id    VARCHAR(64)  NOT NULL,
+    no_resi     VARCHAR(64)  NOT NULL,
+    status      VARCHAR(64)  NULL,
+    received_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (event_id),
+    KEY idx_distributor_event_resi (no_resi, received_at)
+);
@@ -0,0 +1,20 @@
+-- 003_transaksi_running_totals.sql
+-- Subtotal, PPN & total disimpan di header transaksi dan di-update bersama
+-- setiap perubahan keranjang (lihat _apply_total_delta di transaksi.py),
+-- jadi layar kasir & /api/pos cukup membaca satu baris header.
+-- Jalankan sekali:  mysql -u root retail_db < migrations/003_transaksi_running_totals.sql
+
+ALTER TABLE transaksi
+    ADD COLUMN subtotal DECIMAL(15,2) NOT NULL DEFAULT 0 AFTER customer_id,
+    ADD COLUMN ppn      DECIMAL(15,2) NOT NULL DEFAULT 0 AFTER subtotal;
+
+-- Isi dari keranjang yang sudah ada. Transaksi PAID/VOID: total_harga tidak diubah.
+UPDATE transaksi t
+LEFT JOIN (
+    SELECT id_transaksi, SUM(jumlah * harga_satuan) AS s
+    FROM keranjang
+    GROUP BY id_transaksi
+) k ON k.id_transaksi = t.id_transaksi
+SET t.subtotal    = COALESCE(k.s, 0),
+    t.ppn         = ROUND(COALESCE(k.s, 0) * 0.10),
+    t.total_harga = IF(t.status = 'OPEN', COALESCE(k.s, 0) + ROUND(COALESCE(k.s, 0) * 0.10), t.total_harga);
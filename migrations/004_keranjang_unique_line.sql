@@ -0,0 +1,34 @@
+-- 004_keranjang_unique_line.sql
+-- Satu baris keranjang per (transaksi, barang) supaya tambah item bisa
+-- memakai INSERT ... ON DUPLICATE KEY UPDATE (lihat pos_add_item).
+-- Baris duplikat yang sudah ada digabung dulu ke baris dengan id terkecil.
+-- Jalankan sekali (setelah 003):  mysql -u root retail_db < migrations/004_keranjang_unique_line.sql
+
+CREATE TEMPORARY TABLE keranjang_dupe AS
+SELECT id_transaksi, id_barang, MIN(id_keranjang) AS keep_id, SUM(jumlah) AS q
+FROM keranjang
+GROUP BY id_transaksi, id_barang
+HAVING COUNT(*) > 1;
+
+UPDATE keranjang k
+JOIN keranjang_dupe d ON d.keep_id = k.id_keranjang
+SET k.jumlah = d.q, k.total_harga = d.q * k.harga_satuan;
+
+DELETE k FROM keranjang k
+JOIN keranjang_dupe d
+  ON d.id_transaksi = k.id_transaksi AND d.id_barang = k.id_barang AND k.id_keranjang <> d.keep_id;
+
+-- subtotal header transaksi OPEN yang barisnya digabung dihitung ulang
+UPDATE transaksi t
+JOIN (
+    SELECT k.id_transaksi, SUM(k.jumlah * k.harga_satuan) AS s
+    FROM keranjang k
+    JOIN (SELECT DISTINCT id_transaksi FROM keranjang_dupe) d ON d.id_transaksi = k.id_transaksi
+    GROUP BY k.id_transaksi
+) x ON x.id_transaksi = t.id_transaksi
+SET t.subtotal = x.s, t.ppn = ROUND(x.s * 0.10), t.total_harga = x.s + ROUND(x.s * 0.10)
+WHERE t.status = 'OPEN';
+
+DROP TEMPORARY TABLE keranjang_dupe;
+
+ALTER TABLE keranjang ADD UNIQUE KEY uq_keranjang_trx_barang (id_transaksi, id_barang);
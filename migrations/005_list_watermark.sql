@@ -0,0 +1,20 @@
+-- 005_list_watermark.sql
+-- Kolom changed_at (mikrodetik, diisi otomatis oleh MySQL setiap INSERT/UPDATE)
+-- untuk validator ETag endpoint list (lihat http_cache.py):
+--   SELECT MAX(changed_at), COUNT(*) FROM <tabel>   -> MAX pakai index
+--   (COUNT(*) tetap membaca seluruh index; diganti counter DELETE di migrasi 007)
+-- Sengaja kolom baru, bukan barang.updated_at: kolom itu = waktu restock
+-- terakhir dan diisi NOW() (presisi detik) oleh kode aplikasi.
+-- Jalankan sekali:  mysql -u root retail_db < migrations/005_list_watermark.sql
+
+ALTER TABLE barang
+    ADD COLUMN changed_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_barang_changed (changed_at);
+
+ALTER TABLE resi
+    ADD COLUMN changed_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_resi_changed (changed_at);
+
+ALTER TABLE transaksi
+    ADD COLUMN changed_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_transaksi_changed (changed_at);
@@ -0,0 +1,15 @@
+-- 006_history_keyset_index.sql
+-- Index komposit untuk keyset pagination /api/history/* (urut terbaru dulu,
+-- WHERE status + filter opsional + kondisi "setelah cursor").
+-- Kolom filter kesamaan di depan, lalu kolom urut (tanggal, id), jadi MySQL
+-- langsung seek ke posisi cursor: halaman ke-N semurah halaman pertama.
+-- Jalankan sekali:  mysql -u root retail_db < migrations/006_history_keyset_index.sql
+
+-- resi: status = 'DELIVERED' [+ nama_supplier | nama_distributor], ORDER BY tanggal, no_resi, id_barang
+CREATE INDEX idx_resi_hist             ON resi (status, tanggal, no_resi, id_barang);
+CREATE INDEX idx_resi_hist_supplier    ON resi (status, nama_supplier, tanggal, no_resi, id_barang);
+CREATE INDEX idx_resi_hist_distributor ON resi (status, nama_distributor, tanggal, no_resi, id_barang);
+
+-- transaksi: status = 'PAID' [+ metode_bayar], ORDER BY tanggal, id_transaksi
+CREATE INDEX idx_transaksi_hist        ON transaksi (status, tanggal, id_transaksi);
+CREATE INDEX idx_transaksi_hist_metode ON transaksi (status, metode_bayar, tanggal, id_transaksi);
@@ -0,0 +1,24 @@
+-- 007_list_watermark_deletes.sql
+-- Validator ETag list tanpa COUNT(*) (lihat http_cache.watermark):
+--   MAX(changed_at)  -> INSERT/UPDATE, dibaca dari ujung index idx_*_changed
+--   list_watermark.deletes -> DELETE, counter yang dinaikkan trigger
+-- COUNT(*) di InnoDB membaca seluruh index setiap request; counter ini cukup
+-- satu lookup primary key. Hanya DELETE yang menyentuh baris counter (jarang),
+-- jadi INSERT/UPDATE tidak antre di satu baris panas.
+-- Jalankan sekali (setelah 005):  mysql -u root retail_db < migrations/007_list_watermark_deletes.sql
+
+CREATE TABLE IF NOT EXISTS list_watermark (
+    tbl     VARCHAR(32) NOT NULL PRIMARY KEY,
+    deletes BIGINT UNSIGNED NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO list_watermark (tbl) VALUES ('barang'), ('resi'), ('transaksi');
+
+CREATE TRIGGER trg_barang_watermark_del AFTER DELETE ON barang
+    FOR EACH ROW UPDATE list_watermark SET deletes = deletes + 1 WHERE tbl = 'barang';
+
+CREATE TRIGGER trg_resi_watermark_del AFTER DELETE ON resi
+    FOR EACH ROW UPDATE list_watermark SET deletes = deletes + 1 WHERE tbl = 'resi';
+
+CREATE TRIGGER trg_transaksi_watermark_del AFTER DELETE ON transaksi
+    FOR EACH ROW UPDATE list_watermark SET deletes = deletes + 1 WHERE tbl = 'transaksi';
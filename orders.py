@@ -1,7 +1,17 @@
 # orders.py
+import json
+import os
+import threading
+import time
 import requests
 from urllib.parse import urljoin
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, Response
+
+from cart import load_cart, clear_cart, validate_cart, CatalogUnavailable
+from catalog import source_for_supplier
+from draft_store import make_draft_store, start_eviction, draft_status, NOTIFIER, STATUSES
+from http_client import CLIENT as http, CircuitOpenError
+from http_cache import conditional
 
 orders_bp = Blueprint("orders", __name__)
 
@@ -43,8 +53,21 @@ SUPPLIERS = {
     },
 }
 
-# state sederhana untuk simpan draft callback supplier
-ORDER_DRAFTS = {}  # { id_order: normalized_callback_dict }
+# penyimpanan draft callback supplier (bersama antar worker, lihat draft_store.py)
+DRAFTS = make_draft_store()  # { id_order: normalized_callback_dict }
+start_eviction(DRAFTS)       # TTL draft selesai di background, bukan per GET
+
+# SSE draft: stream dibangunkan NOTIFIER (write di worker mana pun, lihat
+# draft_store.py); revision() hanya dicek ulang tiap SSE_CHECK detik sebagai
+# jaring pengaman kalau notifikasi hilang. Heartbeat tiap SSE_HEARTBEAT detik,
+# stream ditutup setelah SSE_MAX_SECONDS (EventSource otomatis menyambung lagi).
+# Tiap stream memegang satu thread gthread -> maksimal SSE_MAX_STREAMS stream
+# per worker; sisanya dapat 503 dan UI fallback ke polling biasa.
+SSE_CHECK = float(os.getenv("DRAFT_SSE_CHECK", "5"))
+SSE_HEARTBEAT = float(os.getenv("DRAFT_SSE_HEARTBEAT", "15"))
+SSE_MAX_SECONDS = float(os.getenv("DRAFT_SSE_MAX_SECONDS", "300"))
+SSE_MAX_STREAMS = int(os.getenv("DRAFT_SSE_MAX_STREAMS", "4"))
+_SSE_SLOTS = threading.BoundedSemaphore(SSE_MAX_STREAMS)
 
 
 def _get_supplier_cfg(id_supplier: int):
@@ -105,13 +128,11 @@ def _extract_distributor_options_from_payload(data: dict):
     return options
 
 
-def _merge_resi_into_draft(id_order: int, upstream: dict):
+def _merge_resi_into_draft(d: dict, upstream: dict):
     """
-    Ambil info resi/total/ETA dari response supplier dan simpan ke draft.
+    Ambil info resi/total/ETA dari response supplier dan simpan ke draft d (di tempat).
     Dipakai saat choose_distributor (dan bisa dipakai saat checkout bila perlu).
     """
-    oid = int(id_order)
-    d = ORDER_DRAFTS.setdefault(oid, {})
     if not isinstance(upstream, dict):
         upstream = {}
 
@@ -157,7 +178,7 @@ def checkout_order():
         "id_retail": 1,          # default 1
         "id_supplier": 1 atau 2  # WAJIB
       }
-    Keranjang diambil dari session["cart"] berupa list dict:
+    Keranjang diambil dari cart store (session["cart_id"]) berupa list dict:
       [{"id_product": <str/int>, "qty": <int>}, ...]
     """
     data = request.get_json(silent=True) or {}
@@ -166,15 +187,27 @@ def checkout_order():
     if not id_supplier:
         return jsonify({"error": "id_supplier wajib"}), 400
 
-    cart = session.get("cart", [])
+    cart = load_cart()
     if not cart:
         return jsonify({"error": "Cart kosong"}), 400
 
     try:
         cfg = _get_supplier_cfg(id_supplier)
+        source = source_for_supplier(id_supplier)
     except KeyError as e:
         return jsonify({"error": str(e)}), 400
 
+    # ---- Cek harga & stok ke katalog (cache lokal) SEBELUM kirim ke supplier:
+    #      item tidak dikenal / stok kurang -> 409, tidak ada request ke supplier
+    try:
+        validation = validate_cart(source)
+    except CatalogUnavailable as e:
+        return jsonify({"error": "catalog_unavailable", "detail": str(e)}), 503
+    if not validation["ok"]:
+        return jsonify({"error": "cart_invalid", "validation": validation}), 409
+    if validation["repriced"]:
+        cart = load_cart()  # harga sudah diperbarui oleh validate_cart
+
     # ---- Validasi khusus Supplier 1: id_product harus numerik
     if id_supplier == 1:
         for it in cart:
@@ -202,7 +235,7 @@ def checkout_order():
     upstream_resp = {}
     upstream_id = None
     try:
-        r = requests.post(cfg["checkout_url"], json=payload, timeout=15)
+        r = http.post(cfg["checkout_url"], json=payload, timeout=15)
         print("[checkout] upstream status:", r.status_code)
         print("[checkout] upstream body:", (r.text or "")[:1000])
         r.raise_for_status()
@@ -215,6 +248,9 @@ def checkout_order():
         body = e.response.text[:1000] if (e.response and e.response.text) else ""
         print("[checkout][HTTPError]", status, body)
         return jsonify({"error": "upstream_http_error", "status": status, "body": body}), 502
+    except CircuitOpenError as e:
+        print("[checkout][CircuitOpen]", repr(e))
+        return jsonify({"error": "supplier_unavailable", "detail": str(e)}), 503
     except requests.exceptions.ConnectionError as e:
         print("[checkout][ConnectionError]", repr(e))
         return jsonify({"error": "connection_error", "detail": str(e)}), 502
@@ -235,52 +271,50 @@ def checkout_order():
         if upstream_id:
             upstream_id = int(upstream_id)
 
-            # Ambil jika sudah ada (mis. sudah diisi callback sebelumnya)
-            existing = ORDER_DRAFTS.get(upstream_id) or {}
-
             # Extract opsi distributor dari RESPON checkout (format lama/baru)
             extracted_opts = _extract_distributor_options_from_payload(upstream_resp)
 
-            # Jika existing sudah punya opsi, merge tanpa duplikat
-            existing_opts = existing.get("distributor_options") if isinstance(existing.get("distributor_options"), list) else []
-            merged_opts = []
-            seen = set()
-            for opt in (existing_opts + extracted_opts):
-                key = (opt.get("id_distributor"), opt.get("harga_pengiriman"), opt.get("estimasi"))
-                if key in seen:
-                    continue
-                seen.add(key)
-                merged_opts.append(opt)
-
-            ORDER_DRAFTS[upstream_id] = {
-                # preserve existing fields
-                **existing,
-                "id_order": upstream_id,
-                "id_retail": existing.get("id_retail", id_retail),
-                "id_supplier": existing.get("id_supplier", id_supplier),
-                "message": existing.get("message", upstream_resp.get("message") or "Menunggu opsi distributor dari supplier…"),
-                "jumlah_item": existing.get("jumlah_item", upstream_resp.get("jumlah_item")),
-                "total_kuantitas": existing.get("total_kuantitas", upstream_resp.get("total_kuantitas")),
-                "total_order": existing.get("total_order", upstream_resp.get("total_order")),
-                "distributor_options": merged_opts,
-                "_raw": {**existing.get("_raw", {}), "upstream_resp": upstream_resp, "source": "local_stub_after_checkout"},
-            }
-
-            # Kalau supplier mengembalikan resi sejak checkout (jarang), simpan juga
-            _merge_resi_into_draft(upstream_id, upstream_resp)
-
-            print(f"[checkout] local draft merged for order #{upstream_id} | opsi: {len(merged_opts)}")
+            def merge(existing):
+                # existing = draft yang mungkin sudah diisi callback sebelumnya
+                # Jika existing sudah punya opsi, merge tanpa duplikat
+                existing_opts = existing.get("distributor_options") if isinstance(existing.get("distributor_options"), list) else []
+                merged_opts = []
+                seen = set()
+                for opt in (existing_opts + extracted_opts):
+                    key = (opt.get("id_distributor"), opt.get("harga_pengiriman"), opt.get("estimasi"))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    merged_opts.append(opt)
+
+                existing.update({
+                    "id_order": upstream_id,
+                    "id_retail": existing.get("id_retail", id_retail),
+                    "id_supplier": existing.get("id_supplier", id_supplier),
+                    "message": existing.get("message", upstream_resp.get("message") or "Menunggu opsi distributor dari supplier…"),
+                    "jumlah_item": existing.get("jumlah_item", upstream_resp.get("jumlah_item")),
+                    "total_kuantitas": existing.get("total_kuantitas", upstream_resp.get("total_kuantitas")),
+                    "total_order": existing.get("total_order", upstream_resp.get("total_order")),
+                    "distributor_options": merged_opts,
+                    "_raw": {**existing.get("_raw", {}), "upstream_resp": upstream_resp, "source": "local_stub_after_checkout"},
+                })
+
+                # Kalau supplier mengembalikan resi sejak checkout (jarang), simpan juga
+                _merge_resi_into_draft(existing, upstream_resp)
+
+            saved = DRAFTS.update(upstream_id, merge)
+            print(f"[checkout] local draft merged for order #{upstream_id} | opsi: {len(saved.get('distributor_options') or [])}")
     except Exception as e:
         print("[checkout] failed to create/merge local draft:", repr(e))
 
     # bersihkan keranjang bila sukses
-    session["cart"] = []
-    session.modified = True
+    clear_cart()
 
     return jsonify({
         "message": "Pesanan dikirim ke supplier",
         "id_order": int(upstream_id) if upstream_id else None,
-        "order": upstream_resp
+        "order": upstream_resp,
+        "validation": validation,
     }), 200
 
 
@@ -299,23 +333,25 @@ def order_callback():
         return jsonify({"error": "Callback tanpa id_order"}), 400
     id_order = int(id_order)
 
-    # Ambil draft lama kalau ada (supaya bisa fallback id_supplier)
-    prev = ORDER_DRAFTS.get(id_order) or {}
-
     distributor_options = _extract_distributor_options_from_payload(data)
 
-    normalized = {
-        "id_order": id_order,
-        "id_retail": data.get("id_retail") if data.get("id_retail") is not None else prev.get("id_retail"),
-        "id_supplier": data.get("id_supplier") if data.get("id_supplier") is not None else prev.get("id_supplier"),
-        "jumlah_item": data.get("jumlah_item") if data.get("jumlah_item") is not None else prev.get("jumlah_item"),
-        "total_kuantitas": data.get("total_kuantitas") if data.get("total_kuantitas") is not None else prev.get("total_kuantitas"),
-        "total_order": data.get("total_order") if data.get("total_order") is not None else prev.get("total_order"),
-        "message": data.get("message") or prev.get("message"),
-        "distributor_options": distributor_options if distributor_options else prev.get("distributor_options", []),
-        "_raw": data,
-    }
-    ORDER_DRAFTS[id_order] = normalized
+    def apply(prev):
+        # prev = draft lama kalau ada (supaya bisa fallback id_supplier)
+        normalized = {
+            "id_order": id_order,
+            "id_retail": data.get("id_retail") if data.get("id_retail") is not None else prev.get("id_retail"),
+            "id_supplier": data.get("id_supplier") if data.get("id_supplier") is not None else prev.get("id_supplier"),
+            "jumlah_item": data.get("jumlah_item") if data.get("jumlah_item") is not None else prev.get("jumlah_item"),
+            "total_kuantitas": data.get("total_kuantitas") if data.get("total_kuantitas") is not None else prev.get("total_kuantitas"),
+            "total_order": data.get("total_order") if data.get("total_order") is not None else prev.get("total_order"),
+            "message": data.get("message") or prev.get("message"),
+            "distributor_options": distributor_options if distributor_options else prev.get("distributor_options", []),
+            "_raw": data,
+        }
+        prev.clear()
+        prev.update(normalized)
+
+    normalized = DRAFTS.update(id_order, apply)
 
     print("\n=== CALLBACK NORMALIZED ===")
     print(f"Order: {id_order} | opsi: {len(normalized.get('distributor_options') or [])} | supplier: {normalized.get('id_supplier')}")
@@ -330,28 +366,101 @@ def order_callback():
 # =========================
 # C) ENDPOINT buat UI: ambil draft
 # =========================
+def _drafts_version():
+    # read-only: eviction jalan di background dan menaikkan versi store -> ETag ikut berubah.
+    # Store memory: versi per proses, jadi pid ikut masuk supaya ETag antar worker tidak bentrok.
+    return DRAFTS.backend, (os.getpid() if DRAFTS.backend == "memory" else None), DRAFTS.version
+
+
 @orders_bp.get("/drafts")
+@conditional(_drafts_version)
 def list_drafts():
-    return jsonify(list(ORDER_DRAFTS.values())), 200
+    """
+    Query params (opsional):
+      - supplier: id_supplier
+      - status: pending | chosen | finished
+      - limit: default 50, max 200
+      - cursor: next_cursor dari halaman sebelumnya (urut id_order DESC)
+    """
+    try:
+        supplier = int(request.args["supplier"]) if request.args.get("supplier") else None
+        limit = max(1, min(int(request.args.get("limit") or 50), 200))
+        before = int(request.args["cursor"]) if request.args.get("cursor") else None
+    except ValueError:
+        return jsonify({"error": "supplier/limit/cursor harus angka"}), 400
+    status = (request.args.get("status") or "").strip().lower() or None
+    if status is not None and status not in STATUSES:
+        return jsonify({"error": f"status harus salah satu dari {', '.join(STATUSES)}"}), 400
+
+    items, next_cursor = DRAFTS.list(supplier=supplier, status=status, limit=limit, before=before)
+    return jsonify({"items": items, "next_cursor": next_cursor}), 200
 
 
 @orders_bp.get("/drafts/latest")
 def latest_draft():
-    if not ORDER_DRAFTS:
+    found = DRAFTS.latest()
+    if not found:
         return jsonify({"error": "belum ada draft"}), 404
-    latest_id = max(ORDER_DRAFTS.keys())
-    d = ORDER_DRAFTS[latest_id]
+    latest_id, d = found
     return jsonify({"id_order": latest_id, **d}), 200
 
 
 @orders_bp.get("/drafts/<int:id_order>")
 def get_draft(id_order: int):
-    d = ORDER_DRAFTS.get(id_order)
+    d = DRAFTS.get(id_order)
     if not d:
         return jsonify({"error": "draft tidak ditemukan"}), 404
     return jsonify({"id_order": id_order, **d}), 200
 
 
+@orders_bp.get("/drafts/<int:id_order>/events")
+def draft_events(id_order: int):
+    """
+    Server-Sent Events untuk satu draft, pengganti polling dari UI.
+      event: draft  -> isi draft terbaru (dikirim saat connect & setiap berubah)
+      event: done   -> draft sudah punya no_resi, stream selesai
+    Write dari worker mana pun membangunkan stream lewat NOTIFIER; revision()
+    hanya dibaca saat dibangunkan atau tiap SSE_CHECK detik.
+    Lebih dari SSE_MAX_STREAMS stream di worker ini -> 503 (UI polling biasa).
+    """
+    if not _SSE_SLOTS.acquire(blocking=False):
+        resp = jsonify({"error": "terlalu banyak stream SSE, pakai polling GET /drafts/<id>"})
+        resp.headers["Retry-After"] = "5"
+        return resp, 503
+
+    def stream():
+        started = last_beat = time.monotonic()
+        last_rev = None
+        seen = NOTIFIER.seq(id_order)
+        yield "retry: 2000\n\n"
+        while time.monotonic() - started < SSE_MAX_SECONDS:
+            rev = DRAFTS.revision(id_order)
+            if rev is not None and rev != last_rev:
+                last_rev = rev
+                d = DRAFTS.get(id_order) or {}
+                payload = json.dumps({"id_order": id_order, **d}, default=str)
+                yield f"event: draft\nid: {rev}\ndata: {payload}\n\n"
+                last_beat = time.monotonic()
+                if draft_status(d) == "finished":
+                    yield "event: done\ndata: {}\n\n"
+                    return
+            # tunggu notifikasi, tapi bangun untuk heartbeat tepat waktu
+            timeout = min(SSE_CHECK, max(0.0, SSE_HEARTBEAT - (time.monotonic() - last_beat)))
+            new_seen = NOTIFIER.wait(id_order, seen, timeout)
+            if new_seen == seen and time.monotonic() - last_beat >= SSE_HEARTBEAT:
+                yield ": ping\n\n"
+                last_beat = time.monotonic()
+            seen = new_seen
+
+    resp = Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx: jangan buffer stream
+    })
+    # dipanggil server WSGI saat response ditutup (selesai / klien putus) -> slot kembali
+    resp.call_on_close(_SSE_SLOTS.release)
+    return resp
+
+
 # =========================
 # D) UI pilih distributor -> relay ke supplier terkait
 # =========================
@@ -362,7 +471,7 @@ def choose_distributor(id_order: int):
     if not id_distributor:
         return jsonify({"error": "id_distributor wajib"}), 400
 
-    draft = ORDER_DRAFTS.get(id_order) or {}
+    draft = DRAFTS.get(id_order) or {}
     id_supplier = draft.get("id_supplier") or payload.get("id_supplier")
     if not id_supplier:
         return jsonify({"error": "id_supplier tidak diketahui (tidak ada di draft & tidak dikirim di body)"}), 400
@@ -374,21 +483,24 @@ def choose_distributor(id_order: int):
 
     upstream_payload = cfg["choose_payload"](id_order, id_distributor)
     try:
-        r = requests.post(cfg["choose_distributor_url"], json=upstream_payload, timeout=15)
+        r = http.post(cfg["choose_distributor_url"], json=upstream_payload, timeout=15)
         r.raise_for_status()
         try:
             data = r.json()
         except ValueError:
             data = {"message": "OK"}
+    except CircuitOpenError as e:
+        return jsonify({"error": "supplier_unavailable", "detail": str(e)}), 503
     except requests.exceptions.RequestException as e:
         return jsonify({"error": "upstream_error", "detail": str(e)}), 502
 
-    # === simpan pilihan distributor
-    d = ORDER_DRAFTS.setdefault(id_order, {})
-    d["chosen_distributor"] = int(id_distributor)
+    def apply(d):
+        # === simpan pilihan distributor
+        d["chosen_distributor"] = int(id_distributor)
+        # === BARU: jika response sudah mengandung resi/total/eta → simpan ke draft
+        _merge_resi_into_draft(d, data)
 
-    # === BARU: jika response sudah mengandung resi/total/eta → simpan ke draft
-    _merge_resi_into_draft(id_order, data)
+    DRAFTS.update(id_order, apply)
 
     return jsonify({"status": "success", "upstream": data}), 200
 
@@ -407,11 +519,12 @@ def receive_resi_from_supplier():
     if not id_order or not no_resi:
         return jsonify({"error": "Data tidak lengkap (id_order/no_resi)"}), 400
 
-    oid = int(id_order)
-    ORDER_DRAFTS.setdefault(oid, {})
-    ORDER_DRAFTS[oid]["no_resi"] = no_resi
-    ORDER_DRAFTS[oid]["eta_delivery_date"] = data.get("eta_delivery_date")
-    ORDER_DRAFTS[oid]["total_pembayaran"] = data.get("total_pembayaran")
+    def apply(d):
+        d["no_resi"] = no_resi
+        d["eta_delivery_date"] = data.get("eta_delivery_date")
+        d["total_pembayaran"] = data.get("total_pembayaran")
+
+    DRAFTS.update(int(id_order), apply)
 
     print(f"🧾 Order {id_order} - No Resi: {no_resi}")
     return jsonify({"message": "Resi diterima", **data}), 200
@@ -0,0 +1,52 @@
+# pagination.py
+# Helper keyset (cursor) pagination untuk query text() mentah.
+# Cursor = nilai kolom urut dari baris terakhir halaman sebelumnya, di-encode
+# base64 supaya opaque bagi client. Query halaman ke-N sama murahnya dengan
+# halaman pertama karena DB langsung seek lewat index, tanpa OFFSET.
+import base64
+import json
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Raise ValueError kalau cursor rusak / jumlah kolom tidak cocok."""
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + pad).decode("utf-8"))
+    except Exception:
+        raise ValueError("cursor tidak valid")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("cursor tidak valid")
+    return values
+
+
+def parse_limit(raw, default: int = DEFAULT_LIMIT, maximum: int = MAX_LIMIT) -> int:
+    try:
+        n = int(raw) if raw not in (None, "") else default
+    except (TypeError, ValueError):
+        raise ValueError("limit harus angka")
+    return max(1, min(n, maximum))
+
+
+def keyset_clause(columns, values, descending: bool = False, prefix: str = "c"):
+    """
+    Bangun kondisi "setelah cursor" untuk ORDER BY columns (semua ASC / semua DESC).
+      (a > :c0) OR (a = :c0 AND b > :c1) OR ...
+    Ditulis dalam bentuk OR berantai (bukan row constructor) supaya MySQL
+    tetap pakai index komposit.
+    Return (sql, params).
+    """
+    op = "<" if descending else ">"
+    params = {f"{prefix}{i}": v for i, v in enumerate(values)}
+    ors = []
+    for i, col in enumerate(columns):
+        eqs = [f"{columns[j]} = :{prefix}{j}" for j in range(i)]
+        ors.append("(" + " AND ".join(eqs + [f"{col} {op} :{prefix}{i}"]) + ")")
+    return "(" + " OR ".join(ors) + ")", params
@@ -0,0 +1,98 @@
+# passwords.py
+# Hash & verifikasi password di pool worker terpisah (bukan di thread request).
+#
+# scrypt/pbkdf2 sengaja mahal (puluhan ms CPU per hash). Saat ganti shift
+# semua kasir login bersamaan -> tanpa batas, thread request POS ikut
+# kehabisan CPU. Di sini:
+#   - PASSWORD_HASH_WORKERS (default 2): hash yang jalan paralel (hashlib
+#     melepas GIL, jadi sisa core tetap untuk request lain)
+#   - PASSWORD_HASH_QUEUE (default 32): hash yang boleh antre; lebih dari itu
+#     -> HasherBusy (login dijawab 503 + Retry-After, bukan menumpuk thread)
+#   - PASSWORD_HASH_TIMEOUT (detik, default 10): batas tunggu satu hash
+#   - PASSWORD_HASH_METHOD: format method werkzeug, mis. "scrypt:32768:8:1"
+#     atau "pbkdf2:sha256:600000". Hash lama dengan method/cost berbeda
+#     di-hash ulang otomatis saat user berhasil login (needs_rehash).
+#
+# Observer (metrics.py) menerima (op, outcome, wait_s, hash_s) untuk setiap hash.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+
+
+class HasherBusy(RuntimeError):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, method: str = HASH_METHOD, workers: int = HASH_WORKERS,
+                 queue: int = HASH_QUEUE, timeout: float = HASH_TIMEOUT):
+        self.method = method
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._prefix = None  # method lengkap (dengan parameter default werkzeug), dihitung sekali
+        self._observers = []
+
+    def observe(self, fn):
+        """fn(op, outcome, wait_seconds, hash_seconds) dipanggil setiap hash selesai/ditolak."""
+        if fn not in self._observers:
+            self._observers.append(fn)
+
+    def _notify(self, op, outcome, wait_s, hash_s):
+        for fn in self._observers:
+            try:
+                fn(op, outcome, wait_s, hash_s)
+            except Exception as e:
+                print("[passwords] observer gagal:", e)
+
+    def _run(self, op, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._notify(op, "busy", 0.0, 0.0)
+            raise HasherBusy("terlalu banyak login bersamaan")
+        queued = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                # slot dilepas setelah hash benar-benar selesai (juga bila pemanggil sudah timeout)
+                self._slots.release()
+                self._notify(op, "ok", started - queued, time.perf_counter() - started)
+
+        try:
+            future = self._pool.submit(job)
+        except Exception:
+            self._slots.release()
+            raise
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self._notify(op, "timeout", time.perf_counter() - queued, 0.0)
+            raise HasherBusy("hash password terlalu lama")
+
+    # ---------- API ----------
+    def hash(self, password: str) -> str:
+        return self._run("hash", generate_password_hash, password, self.method)
+
+    def verify(self, stored: str, password: str) -> bool:
+        return self._run("verify", check_password_hash, stored, password)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """True bila hash tersimpan memakai method/cost lain dari PASSWORD_HASH_METHOD."""
+        if self._prefix is None:
+            # "scrypt" -> "scrypt:32768:8:1": parameter default diisi werkzeug yang terpasang
+            self._prefix = generate_password_hash("", self.method).split("$", 1)[0]
+        return stored.split("$", 1)[0] != self._prefix
+
+
+# instance bersama (dipakai login/register di app.py)
+HASHER = PasswordHasher()
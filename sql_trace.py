@@ -0,0 +1,175 @@
+# sql_trace.py
+# Instrumentasi SQL per request lewat event Engine SQLAlchemy.
+#
+#  - setiap statement dicatat ke request yang sedang jalan (flask.g):
+#    jumlah statement, total waktu DB, statement paling lambat
+#  - statement dinormalisasi jadi "bentuk" (angka/string/placeholder -> ?,
+#    daftar IN (...) & VALUES (...),(...) diringkas). Bentuk yang sama muncul
+#    >= SQL_NPLUS1_THRESHOLD kali dalam satu request ditandai sebagai N+1
+#  - agregat per endpoint + daftar request N+1 terakhir: GET /__sql__
+#  - response diberi header X-SQL-Count & X-SQL-Time-ms
+#
+# Query dari thread background (tanpa request context) tidak dihitung.
+# Matikan dengan SQL_TRACE=0.
+import collections
+import functools
+import os
+import re
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_TRACE_ENABLED = os.getenv("SQL_TRACE", "1") != "0"
+NPLUS1_THRESHOLD = int(os.getenv("SQL_NPLUS1_THRESHOLD", "5"))
+
+_WS_RE = re.compile(r"\s+")
+_PARAM_RE = re.compile(r"%\([^)]*\)s|%s|\?|:\w+")
+_STR_RE = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUM_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS_RE = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize(statement: str) -> str:
+    """Bentuk statement tanpa nilai: dipakai untuk mengelompokkan & deteksi N+1."""
+    s = _WS_RE.sub(" ", statement).strip()
+    s = _STR_RE.sub("?", s)
+    s = _PARAM_RE.sub("?", s)
+    s = _NUM_RE.sub("?", s)
+    s = _LIST_RE.sub("(?)", s)
+    s = _ROWS_RE.sub("(?)", s)
+    return s
+
+
+class SqlTrace:
+    def __init__(self, threshold: int = NPLUS1_THRESHOLD, keep_flagged: int = 50):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._endpoints = {}  # endpoint -> agregat
+        self._flagged = collections.deque(maxlen=keep_flagged)
+        self._installed = False
+
+    # ---------- hook ----------
+    def init_app(self, app):
+        if not SQL_TRACE_ENABLED:
+            return
+        if not self._installed:
+            # dipasang di kelas Engine -> berlaku untuk semua engine (termasuk bind lain)
+            event.listen(Engine, "before_cursor_execute", self._before)
+            event.listen(Engine, "after_cursor_execute", self._after)
+            # statement yang raise tidak sampai after_cursor_execute -> entri waktunya dilepas di sini
+            event.listen(Engine, "handle_error", self._error)
+            self._installed = True
+        app.before_request(self._start)
+        app.after_request(self._headers)
+        app.teardown_request(self._finish)
+
+    @staticmethod
+    def _start():
+        g._sql = {"n": 0, "ms": 0.0, "shapes": collections.Counter(), "slowest": (0.0, None)}
+
+    @staticmethod
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_sql_t0", []).append((statement, time.perf_counter()))
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_sql_t0")
+        if not stack:
+            return
+        self._record(statement, stack.pop()[1])
+
+    def _error(self, ctx):
+        conn = ctx.connection
+        stack = conn.info.get("_sql_t0") if conn is not None else None
+        # hanya kalau entri teratas memang milik statement yang gagal (bukan error saat connect)
+        if stack and stack[-1][0] == ctx.statement:
+            self._record(ctx.statement, stack.pop()[1])
+
+    @staticmethod
+    def _record(statement, t0):
+        ms = (time.perf_counter() - t0) * 1000
+        if not has_request_context():
+            return
+        cur = g.get("_sql")
+        if cur is None:
+            return
+        cur["n"] += 1
+        cur["ms"] += ms
+        cur["shapes"][normalize(statement)] += 1
+        if ms > cur["slowest"][0]:
+            cur["slowest"] = (ms, statement)
+
+    @staticmethod
+    def _headers(resp):
+        cur = g.get("_sql")
+        if cur is not None:
+            resp.headers["X-SQL-Count"] = str(cur["n"])
+            resp.headers["X-SQL-Time-ms"] = f"{cur['ms']:.1f}"
+        return resp
+
+    def _finish(self, exc=None):
+        cur = g.pop("_sql", None)
+        if cur is None or not cur["n"]:
+            return
+        endpoint = request.endpoint or "<unmatched>"
+        repeated = [(shape, n) for shape, n in cur["shapes"].items() if n >= self.threshold]
+        slow_ms, slow_sql = cur["slowest"]
+        with self._lock:
+            agg = self._endpoints.get(endpoint)
+            if agg is None:
+                agg = self._endpoints[endpoint] = {
+                    "requests": 0, "statements": 0, "db_ms": 0.0,
+                    "max_statements": 0, "nplus1": 0, "slowest_ms": 0.0, "slowest_sql": None,
+                }
+            agg["requests"] += 1
+            agg["statements"] += cur["n"]
+            agg["db_ms"] += cur["ms"]
+            agg["max_statements"] = max(agg["max_statements"], cur["n"])
+            if slow_ms > agg["slowest_ms"]:
+                agg["slowest_ms"] = slow_ms
+                agg["slowest_sql"] = normalize(slow_sql)
+            if repeated:
+                agg["nplus1"] += 1
+                for shape, n in repeated:
+                    self._flagged.append({
+                        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "endpoint": endpoint,
+                        "path": request.path,
+                        "count": n,
+                        "shape": shape[:300],
+                    })
+        for shape, n in repeated:
+            print(f"[sql] N+1? {endpoint} menjalankan bentuk yang sama {n}x: {shape[:120]}")
+
+    # ---------- laporan ----------
+    def snapshot(self) -> dict:
+        with self._lock:
+            endpoints = {}
+            for name, a in self._endpoints.items():
+                req = a["requests"] or 1
+                endpoints[name] = {
+                    **a,
+                    "db_ms": round(a["db_ms"], 1),
+                    "slowest_ms": round(a["slowest_ms"], 1),
+                    "avg_statements": round(a["statements"] / req, 1),
+                    "avg_db_ms": round(a["db_ms"] / req, 2),
+                }
+            return {
+                "enabled": SQL_TRACE_ENABLED,
+                "nplus1_threshold": self.threshold,
+                "endpoints": dict(sorted(endpoints.items(), key=lambda kv: -kv[1]["db_ms"])),
+                "flagged": list(self._flagged),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._flagged.clear()
+
+
+# instance bersama (dipasang di create_app)
+SQL_TRACE = SqlTrace()
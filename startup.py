@@ -0,0 +1,70 @@
+# startup.py
+# Laporan waktu startup per fase (lihat GET /__startup__):
+#   import          : import modul app.py (Flask, SQLAlchemy, modul pendukung)
+#   config / blueprints.<nama> / routes : bagian-bagian create_app()
+#   create_app      : total create_app()
+#   first_db_connect: lama koneksi DB pertama (terjadi saat request pertama,
+#                     bukan saat boot -> worker siap tanpa menunggu MySQL)
+# Satu baris ringkasan dicetak saat create_app selesai.
+import os
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROCESS_T0 = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self):
+        self.phases = {}  # nama -> ms (urutan = urutan dicatat)
+        self.first_db_connect = None
+        self._connect_t0 = None
+        self._hooked = False
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - t0) * 1000, 2)
+
+    def mark(self, name: str, since: float):
+        self.phases[name] = round((time.perf_counter() - since) * 1000, 2)
+
+    # ---------- koneksi DB pertama ----------
+    def hook_db(self):
+        if self._hooked:
+            return
+        # do_connect (sebelum connect) + first_connect (setelah koneksi pertama pool)
+        event.listen(Engine, "do_connect", self._before_connect)
+        event.listen(Engine, "first_connect", self._after_first_connect)
+        self._hooked = True
+
+    def _before_connect(self, dialect, conn_rec, cargs, cparams):
+        if self.first_db_connect is None and self._connect_t0 is None:
+            self._connect_t0 = time.perf_counter()
+
+    def _after_first_connect(self, dbapi_connection, connection_record):
+        if self.first_db_connect is None and self._connect_t0 is not None:
+            self.first_db_connect = {
+                "ms": round((time.perf_counter() - self._connect_t0) * 1000, 2),
+                "after_boot_ms": round((self._connect_t0 - PROCESS_T0) * 1000, 2),
+            }
+
+    def report(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "phases_ms": dict(self.phases),
+            "first_db_connect": self.first_db_connect,
+        }
+
+    def summary(self) -> str:
+        top = " ".join(f"{k}={v:.0f}ms" for k, v in self.phases.items() if not k.startswith("blueprints."))
+        return f"[startup] pid={os.getpid()} {top}"
+
+
+# instance bersama (dipakai create_app)
+STARTUP = StartupTimer()
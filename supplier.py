@@ -2,6 +2,9 @@
 import requests
 from flask import Blueprint, jsonify
 
+from catalog_cache import CatalogCache
+from http_client import CLIENT as http
+
 supplier_bp = Blueprint("supplier", __name__)
 
 SUPPLIER_URL = "https://intervascular-harmony-unministrant.ngrok-free.dev/api/retail/products"
@@ -43,18 +46,29 @@ def _extract_items(raw):
                     return vv
     return []
 
+def _fetch_products():
+    r = http.get(SUPPLIER_URL, timeout=8)
+    r.raise_for_status()
+    raw = r.json()
+    items = _extract_items(raw)
+    return [_normalize_item(it or {}) for it in items]
+
+PRODUCTS_CACHE = CatalogCache("supplier", _fetch_products)
+
 @supplier_bp.get("/products")
 def products_proxy():
     try:
-        r = requests.get(SUPPLIER_URL, timeout=8)
-        r.raise_for_status()
-        raw = r.json()
-        items = _extract_items(raw)
-        normalized = [_normalize_item(it or {}) for it in items]
-        return jsonify(normalized)
+        normalized, cache_status = PRODUCTS_CACHE.get()
+        resp = jsonify(normalized)
+        resp.headers["X-Cache"] = cache_status
+        return resp
     except requests.exceptions.RequestException as e:
         return jsonify({"error": "upstream_error", "detail": str(e)}), 502
     except ValueError as e:
         return jsonify({"error": "invalid_json_from_upstream", "detail": str(e)}), 502
     except Exception as e:
         return jsonify({"error": "unknown_proxy_error", "detail": str(e)}), 500
+
+@supplier_bp.get("/products/cache")
+def products_cache_stats():
+    return jsonify(PRODUCTS_CACHE.stats())
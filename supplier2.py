@@ -2,6 +2,9 @@
 import requests
 from flask import Blueprint, jsonify
 
+from catalog_cache import CatalogCache
+from http_client import CLIENT as http
+
 supplier2_bp = Blueprint("supplier2", __name__)
 
 SUPPLIER2_URL = "https://gamophyllous-margit-slipperily.ngrok-free.dev/api/products"
@@ -24,20 +27,31 @@ def _normalize_item(x: dict) -> dict:
         "_source":      "supplier2",
     }
 
+def _fetch_products():
+    r = http.get(SUPPLIER2_URL, timeout=8)
+    r.raise_for_status()
+    raw = r.json()
+    items = raw if isinstance(raw, list) else (raw.get("data") or raw.get("items") or raw.get("result") or [])
+    if not isinstance(items, list):
+        items = []
+    return [_normalize_item(it or {}) for it in items]
+
+PRODUCTS_CACHE = CatalogCache("supplier2", _fetch_products)
+
 @supplier2_bp.get("/products")
 def products_proxy():
     try:
-        r = requests.get(SUPPLIER2_URL, timeout=8)
-        r.raise_for_status()
-        raw = r.json()
-        items = raw if isinstance(raw, list) else (raw.get("data") or raw.get("items") or raw.get("result") or [])
-        if not isinstance(items, list):
-            items = []
-        normalized = [_normalize_item(it or {}) for it in items]
-        return jsonify(normalized)
+        normalized, cache_status = PRODUCTS_CACHE.get()
+        resp = jsonify(normalized)
+        resp.headers["X-Cache"] = cache_status
+        return resp
     except requests.exceptions.RequestException as e:
         return jsonify({"error": "upstream_error", "detail": str(e)}), 502
     except ValueError as e:
         return jsonify({"error": "invalid_json_from_upstream", "detail": str(e)}), 502
     except Exception as e:
         return jsonify({"error": "unknown_proxy_error", "detail": str(e)}), 500
+
+@supplier2_bp.get("/products/cache")
+def products_cache_stats():
+    return jsonify(PRODUCTS_CACHE.stats())
@@ -8,9 +8,15 @@ if "app" not in _sys.modules and "__main__" in _sys.modules:
     _sys.modules["app"] = _sys.modules["__main__"]
 # -----------------------------------------------------------------------------
 
+import math
+
 from flask import Blueprint, jsonify, request
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from app import db  # menggunakan instance SQLAlchemy dari app.py
+from gudang_stats import STATS
+from db_routing import read_only
+from http_cache import conditional, watermark
+from json_fast import rows_payload
 
 # NOTE:
 # - File ini hanya menangani API POS (tanpa UI route) untuk menghindari
@@ -23,13 +29,60 @@ pos_bp = Blueprint("pos", __name__)
 TABLE_BARANG = "barang"
 
 
+# input (case-insensitive) -> nilai yang disimpan di transaksi.metode_bayar
+METODE_BAYAR = {"CASH": "cash", "QRIS": "qris", "CARD": "card"}
+
+
 def _map_metode(v: str) -> str:
     v = (v or "").strip().upper()
-    return {"CASH": "cash", "QRIS": "qris", "CARD": "card"}.get(v, "cash")
+    return METODE_BAYAR.get(v, "cash")
+
+
+def _parse_harga(raw):
+    """harga opsional dari body: None, atau angka finite >= 0. Raise ValueError."""
+    if raw is None:
+        return None
+    try:
+        harga = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError("harga tidak valid")
+    if not math.isfinite(harga) or harga < 0:
+        raise ValueError("harga tidak valid")
+    return harga
+
+
+def _apply_total_delta(trx_id, delta):
+    """
+    Tambah delta ke subtotal header (dipanggil di transaksi yang sama dengan
+    perubahan keranjang). MySQL mengevaluasi SET dari kiri ke kanan, jadi ppn
+    dan total_harga dihitung dari subtotal yang BARU dalam statement yang sama.
+    """
+    if not delta:
+        return
+    db.session.execute(
+        text("""
+            UPDATE transaksi
+            SET subtotal    = subtotal + :d,
+                ppn         = ROUND(subtotal * 0.10),
+                total_harga = subtotal + ppn
+            WHERE id_transaksi = :id AND status = 'OPEN'
+        """),
+        {"d": delta, "id": trx_id}
+    )
+
+
+def _calc(header) -> dict:
+    return {
+        "subtotal": float(header["subtotal"] or 0),
+        "ppn": float(header["ppn"] or 0),
+        "total": float(header["total_harga"] or 0),
+    }
 
 
 # ===================== API: LIST TRANSAKSI (BARU) =====================
 @pos_bp.get("/api/pos")
+@read_only
+@conditional(watermark("transaksi"))
 def pos_list():
     """
     Query params (opsional):
@@ -52,14 +105,14 @@ def pos_list():
 
     where_sql = ("WHERE " + " AND ".join(conds)) if conds else ""
     rows = db.session.execute(text(f"""
-        SELECT id_transaksi, customer_id, total_harga, metode_bayar, status, tanggal
+        SELECT id_transaksi, customer_id, subtotal, ppn, total_harga, metode_bayar, status, tanggal
         FROM transaksi
         {where_sql}
         ORDER BY tanggal DESC, id_transaksi DESC
         LIMIT :limit
     """), params).mappings().all()
 
-    return jsonify({"items": [dict(r) for r in rows]}), 200
+    return jsonify(rows_payload(rows)), 200
 
 
 # ===================== API: BUKA TRANSAKSI =====================
@@ -91,7 +144,7 @@ def pos_open():
 def pos_get(trx_id):
     header = db.session.execute(
         text("""
-            SELECT id_transaksi, customer_id, total_harga, metode_bayar, status, tanggal
+            SELECT id_transaksi, customer_id, subtotal, ppn, total_harga, metode_bayar, status, tanggal
             FROM transaksi
             WHERE id_transaksi = :id
         """),
@@ -117,15 +170,11 @@ def pos_get(trx_id):
         {"id": trx_id}
     ).mappings().all()
 
-    items = [dict(r) for r in rows]
-    subtotal = sum(int(i["qty"]) * float(i["harga"]) for i in items)
-    ppn = int(round(subtotal * 0.10))
-    total = subtotal + ppn
-
+    # total sudah dijaga di header oleh add/update item -> tidak dihitung ulang
     return jsonify({
         "header": dict(header),
-        "items": items,
-        "calc": {"subtotal": subtotal, "ppn": ppn, "total": total}
+        "items": [dict(r) for r in rows],
+        "calc": _calc(header)
     }), 200
 
 
@@ -137,13 +186,63 @@ def pos_add_item(trx_id):
       { "sku": "P001", "qty": 2, "harga": 12000 }  # harga optional (default harga_jual)
     """
     data = request.get_json(silent=True) or {}
-    sku = (data.get("sku") or "").strip()
-    qty = int(data.get("qty") or 0)
-    harga = data.get("harga")  # None => harga_jual
-
+    sku = str(data.get("sku") or "").strip()
+    try:
+        qty = int(data.get("qty") or 0)
+    except (TypeError, ValueError):
+        qty = 0
     if not sku or qty <= 0:
         return jsonify({"error": "sku/qty tidak valid"}), 400
+    try:
+        harga = _parse_harga(data.get("harga"))  # None => harga_jual
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    params = {"trx": trx_id, "sku": sku, "q": qty, "h": harga}
+
+    # 1) Header: validasi OPEN + SKU ada, kunci baris header, dan tambah subtotal
+    #    dengan harga baris yang berlaku (harga baris lama > harga request > harga_jual)
+    res = db.session.execute(
+        text(f"""
+            UPDATE transaksi
+            SET subtotal    = subtotal + :q * COALESCE(
+                                  (SELECT harga_satuan FROM keranjang
+                                   WHERE id_transaksi = :trx AND id_barang = :sku),
+                                  :h,
+                                  (SELECT harga_jual FROM {TABLE_BARANG} WHERE id_barang = :sku),
+                                  0),
+                ppn         = ROUND(subtotal * 0.10),
+                total_harga = subtotal + ppn
+            WHERE id_transaksi = :trx AND status = 'OPEN'
+              AND EXISTS (SELECT 1 FROM {TABLE_BARANG} WHERE id_barang = :sku)
+        """),
+        params
+    )
+    if res.rowcount == 0:
+        db.session.rollback()
+        return _add_item_error(trx_id, [sku])
+
+    # 2) UPSERT baris keranjang (UNIQUE id_transaksi+id_barang); hanya masuk kalau
+    #    transaksi OPEN. Baris lama: qty ditambah, harga_satuan tetap.
+    db.session.execute(
+        text(f"""
+            INSERT INTO keranjang (id_transaksi, id_barang, jumlah, harga_satuan, total_harga)
+            SELECT t.id_transaksi, b.id_barang, :q, COALESCE(:h, b.harga_jual, 0), :q * COALESCE(:h, b.harga_jual, 0)
+            FROM transaksi t
+            JOIN {TABLE_BARANG} b ON b.id_barang = :sku
+            WHERE t.id_transaksi = :trx AND t.status = 'OPEN'
+            ON DUPLICATE KEY UPDATE
+                jumlah      = jumlah + VALUES(jumlah),
+                total_harga = jumlah * harga_satuan
+        """),
+        params
+    )
+    db.session.commit()
+    return jsonify({"ok": True}), 200
+
 
+def _add_item_error(trx_id, skus):
+    """Jalur gagal saja: cari tahu kenapa tambah item ditolak."""
     st = db.session.execute(
         text("SELECT status FROM transaksi WHERE id_transaksi=:id"),
         {"id": trx_id}
@@ -152,46 +251,102 @@ def pos_add_item(trx_id):
         return jsonify({"error": "transaksi tidak ditemukan"}), 404
     if st != "OPEN":
         return jsonify({"error": "transaksi sudah tidak OPEN"}), 409
+    found = set(db.session.execute(
+        text(f"SELECT id_barang FROM {TABLE_BARANG} WHERE id_barang IN :skus")
+        .bindparams(bindparam("skus", expanding=True)),
+        {"skus": list(skus)}
+    ).scalars())
+    return jsonify({"error": "SKU tidak ditemukan", "skus": [s for s in skus if s not in found]}), 404
 
-    row = db.session.execute(
-        text(f"SELECT harga_jual FROM {TABLE_BARANG} WHERE id_barang=:sku"),
-        {"sku": sku}
-    ).mappings().first()
-    if not row:
-        return jsonify({"error": "SKU tidak ditemukan"}), 404
-
-    hj = float(harga if harga is not None else row["harga_jual"] or 0)
 
-    existing = db.session.execute(
-        text("""
-            SELECT id_keranjang, jumlah
-            FROM keranjang
-            WHERE id_transaksi=:trx AND id_barang=:sku
-        """),
-        {"trx": trx_id, "sku": sku}
-    ).mappings().first()
+# ===================== API: TAMBAH BANYAK ITEM (SCAN BATCH) =====================
+@pos_bp.post("/api/pos/<int:trx_id>/items:batch")
+def pos_add_items_batch(trx_id):
+    """
+    Body JSON:
+      { "items": [ { "sku": "P001", "qty": 2, "harga": 12000 }, ... ] }
+    Semua scan diterapkan dalam SATU transaksi DB (semua masuk atau tidak sama
+    sekali). SKU yang sama digabung; jumlah query tetap berapa pun banyak item.
+    """
+    data = request.get_json(silent=True) or {}
+    scans = data.get("items") or []
+    if not isinstance(scans, list) or not scans:
+        return jsonify({"error": "items wajib (list)"}), 400
+
+    basket = {}  # sku -> {"q": total qty, "h": harga terakhir yang dikirim}
+    for it in scans:
+        if not isinstance(it, dict):
+            return jsonify({"error": "item harus object {sku, qty, harga}", "item": it}), 400
+        sku = str(it.get("sku") or "").strip()
+        try:
+            qty = int(it.get("qty") or 0)
+        except (TypeError, ValueError):
+            qty = 0
+        if not sku or qty <= 0:
+            return jsonify({"error": "sku/qty tidak valid", "item": it}), 400
+        try:
+            harga = _parse_harga(it.get("harga"))
+        except ValueError as e:
+            return jsonify({"error": str(e), "item": it}), 400
+        line = basket.setdefault(sku, {"q": 0, "h": None})
+        line["q"] += qty
+        if harga is not None:
+            line["h"] = harga
+
+    skus = sorted(basket)
+    try:
+        st = db.session.execute(
+            text("SELECT status FROM transaksi WHERE id_transaksi=:id FOR UPDATE"),
+            {"id": trx_id}
+        ).scalar()
+        if st != "OPEN":
+            db.session.rollback()
+            return _add_item_error(trx_id, skus)
+
+        # harga semua SKU + harga baris yang sudah ada, satu query
+        prices = {
+            r["sku"]: r
+            for r in db.session.execute(
+                text(f"""
+                    SELECT b.id_barang AS sku, b.harga_jual, k.harga_satuan
+                    FROM {TABLE_BARANG} b
+                    LEFT JOIN keranjang k ON k.id_transaksi = :trx AND k.id_barang = b.id_barang
+                    WHERE b.id_barang IN :skus
+                """).bindparams(bindparam("skus", expanding=True)),
+                {"trx": trx_id, "skus": skus}
+            ).mappings()
+        }
+        missing = [s for s in skus if s not in prices]
+        if missing:
+            db.session.rollback()
+            return jsonify({"error": "SKU tidak ditemukan", "skus": missing}), 404
+
+        values, params, delta = [], {"trx": trx_id}, 0.0
+        for i, sku in enumerate(skus):
+            p, line = prices[sku], basket[sku]
+            h = line["h"] if line["h"] is not None else float(p["harga_jual"] or 0)
+            values.append(f"(:trx, :s{i}, :q{i}, :h{i}, :q{i} * :h{i})")
+            params.update({f"s{i}": sku, f"q{i}": line["q"], f"h{i}": h})
+            # baris yang sudah ada tetap memakai harga_satuan lamanya
+            delta += line["q"] * (float(p["harga_satuan"]) if p["harga_satuan"] is not None else h)
 
-    if existing:
-        new_qty = int(existing["jumlah"]) + qty
-        db.session.execute(
-            text("""
-                UPDATE keranjang
-                SET jumlah=:q, total_harga=:q*harga_satuan
-                WHERE id_keranjang=:idk
-            """),
-            {"q": new_qty, "idk": existing["id_keranjang"]}
-        )
-    else:
         db.session.execute(
-            text("""
+            text(f"""
                 INSERT INTO keranjang (id_transaksi, id_barang, jumlah, harga_satuan, total_harga)
-                VALUES (:trx, :sku, :q, :h, :q*:h)
+                VALUES {", ".join(values)}
+                ON DUPLICATE KEY UPDATE
+                    jumlah      = jumlah + VALUES(jumlah),
+                    total_harga = jumlah * harga_satuan
             """),
-            {"trx": trx_id, "sku": sku, "q": qty, "h": hj}
+            params
         )
+        _apply_total_delta(trx_id, delta)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "gagal_tambah_item", "detail": str(e)}), 500
 
-    db.session.commit()
-    return jsonify({"ok": True}), 200
+    return jsonify({"ok": True, "lines": len(skus), "scans": len(scans)}), 200
 
 
 # ===================== API: UPDATE/HAPUS ITEM =====================
@@ -205,14 +360,28 @@ def pos_update_item(trx_id, sku):
     qty = int(data.get("qty") or 0)
 
     st = db.session.execute(
-        text("SELECT status FROM transaksi WHERE id_transaksi=:id"),
+        text("SELECT status FROM transaksi WHERE id_transaksi=:id FOR UPDATE"),
         {"id": trx_id}
     ).scalar()
     if not st:
+        db.session.rollback()
         return jsonify({"error": "transaksi tidak ditemukan"}), 404
     if st != "OPEN":
+        db.session.rollback()
         return jsonify({"error": "transaksi sudah tidak OPEN"}), 409
 
+    # nilai baris sebelum diubah -> selisih untuk subtotal header
+    lines = db.session.execute(
+        text("""
+            SELECT jumlah, harga_satuan
+            FROM keranjang
+            WHERE id_transaksi=:trx AND id_barang=:sku
+        """),
+        {"trx": trx_id, "sku": sku}
+    ).all()
+    old_total = sum(int(j) * float(h or 0) for j, h in lines)
+    new_total = 0 if qty <= 0 else sum(qty * float(h or 0) for _, h in lines)
+
     if qty <= 0:
         db.session.execute(
             text("""
@@ -231,6 +400,7 @@ def pos_update_item(trx_id, sku):
             {"q": qty, "trx": trx_id, "sku": sku}
         )
 
+    _apply_total_delta(trx_id, new_total - old_total)
     db.session.commit()
     return jsonify({"ok": True}), 200
 
@@ -241,85 +411,114 @@ def pos_pay(trx_id):
     """
     Body JSON:
       { "metode": "CASH|QRIS|CARD", "bayar": 100000 }
-    - Validasi stok
-    - Hitung PPN 10%
-    - Kurangi stok barang
+    - Kunci header & baris stok (urut id_barang), validasi stok
+    - Subtotal/PPN/total dibaca dari header (dijaga oleh add/update item)
+    - Kurangi stok semua barang dalam satu UPDATE bersyarat (anti oversell)
     - Update transaksi jadi PAID + simpan bayar/kembali
+    Jumlah query tetap, tidak bertambah dengan jumlah baris keranjang.
     """
     data = request.get_json(silent=True) or {}
     metode = _map_metode(data.get("metode") or "CASH")
     bayar = float(data.get("bayar") or 0)
 
-    st = db.session.execute(
-        text("SELECT status FROM transaksi WHERE id_transaksi=:id"),
-        {"id": trx_id}
-    ).scalar()
-    if not st:
-        return jsonify({"error": "transaksi tidak ditemukan"}), 404
-    if st != "OPEN":
-        return jsonify({"error": "transaksi sudah tidak OPEN"}), 409
-
-    items = db.session.execute(
-        text(f"""
-            SELECT
-                k.id_barang AS sku,
-                k.jumlah    AS qty,
-                k.harga_satuan AS harga,
-                b.quantity  AS stok
-            FROM keranjang k
-            JOIN {TABLE_BARANG} b ON b.id_barang = k.id_barang
-            WHERE k.id_transaksi = :id
-        """),
-        {"id": trx_id}
-    ).mappings().all()
-    if not items:
-        return jsonify({"error": "keranjang kosong"}), 400
-
-    kurang = []
-    subtotal = 0
-    for it in items:
-        qty = int(it["qty"])
-        subtotal += qty * float(it["harga"])
-        if int(it["stok"] or 0) < qty:
-            kurang.append({"sku": it["sku"], "stok": int(it["stok"] or 0), "butuh": qty})
-    if kurang:
-        return jsonify({"error": "stok_kurang", "detail": kurang}), 409
-
-    ppn = int(round(subtotal * 0.10))
-    total = subtotal + ppn
-    if bayar < total:
-        return jsonify({"error": "bayar_kurang", "total": total}), 400
-    kembali = bayar - total
-
     try:
-        # Kurangi stok gudang
-        for it in items:
-            db.session.execute(
-                text(f"""
-                    UPDATE {TABLE_BARANG}
-                    SET quantity = quantity - :q, updated_at = NOW()
-                    WHERE id_barang = :sku
-                """),
-                {"q": int(it["qty"]), "sku": it["sku"]}
-            )
+        # Kunci header: dua kasir tidak bisa membayar transaksi yang sama
+        header = db.session.execute(
+            text("""
+                SELECT status, subtotal, ppn, total_harga
+                FROM transaksi WHERE id_transaksi=:id FOR UPDATE
+            """),
+            {"id": trx_id}
+        ).mappings().first()
+        if not header:
+            db.session.rollback()
+            return jsonify({"error": "transaksi tidak ditemukan"}), 404
+        if header["status"] != "OPEN":
+            db.session.rollback()
+            return jsonify({"error": "transaksi sudah tidak OPEN"}), 409
+
+        lines = db.session.execute(
+            text("""
+                SELECT id_barang AS sku, SUM(jumlah) AS qty
+                FROM keranjang
+                WHERE id_transaksi = :id
+                GROUP BY id_barang
+                ORDER BY id_barang
+            """),
+            {"id": trx_id}
+        ).mappings().all()
+        if not lines:
+            db.session.rollback()
+            return jsonify({"error": "keranjang kosong"}), 400
+
+        # Kunci baris stok dengan urutan tetap (PK) -> tidak ada deadlock antar kasir
+        stok = dict(db.session.execute(
+            text(f"""
+                SELECT id_barang, quantity
+                FROM {TABLE_BARANG}
+                WHERE id_barang IN :skus
+                ORDER BY id_barang
+                FOR UPDATE
+            """).bindparams(bindparam("skus", expanding=True)),
+            {"skus": [ln["sku"] for ln in lines]}
+        ).all())
+
+        kurang = []
+        for ln in lines:
+            qty = int(ln["qty"])
+            ada = int(stok.get(ln["sku"]) or 0)
+            if ada < qty:
+                kurang.append({"sku": ln["sku"], "stok": ada, "butuh": qty})
+        if kurang:
+            db.session.rollback()
+            return jsonify({"error": "stok_kurang", "detail": kurang}), 409
+
+        calc = _calc(header)
+        total = calc["total"]
+        if bayar < total:
+            db.session.rollback()
+            return jsonify({"error": "bayar_kurang", "total": total}), 400
+        kembali = bayar - total
+
+        # Kurangi stok semua baris dalam SATU statement; kondisi quantity >= q
+        # tetap dipasang sebagai pagar terakhir supaya stok tidak pernah negatif
+        res = db.session.execute(
+            text(f"""
+                UPDATE {TABLE_BARANG} b
+                JOIN (
+                    SELECT id_barang, SUM(jumlah) AS q
+                    FROM keranjang
+                    WHERE id_transaksi = :id
+                    GROUP BY id_barang
+                ) k ON k.id_barang = b.id_barang
+                SET b.quantity = b.quantity - k.q, b.updated_at = NOW()
+                WHERE b.quantity >= k.q
+            """),
+            {"id": trx_id}
+        )
+        if res.rowcount != len(lines):
+            db.session.rollback()
+            return jsonify({"error": "stok_kurang", "detail": "stok berubah saat checkout, coba lagi"}), 409
 
         # Update header transaksi
         db.session.execute(
             text("""
                 UPDATE transaksi
-                SET total_harga=:total, metode_bayar=:met, status='PAID',
+                SET metode_bayar=:met, status='PAID',
                     bayar=:bayar, kembali=:kembali
                 WHERE id_transaksi=:id
             """),
-            {"total": total, "met": metode, "bayar": bayar, "kembali": kembali, "id": trx_id}
+            {"met": metode, "bayar": bayar, "kembali": kembali, "id": trx_id}
         )
 
         db.session.commit()
+        for ln in lines:
+            STATS.apply_delta(ln["sku"], -int(ln["qty"]))
         return jsonify({
             "ok": True,
             "id_transaksi": trx_id,
-            "subtotal": subtotal,
-            "ppn": ppn,
+            "subtotal": calc["subtotal"],
+            "ppn": calc["ppn"],
             "total": total,
             "kembali": kembali
         }), 200